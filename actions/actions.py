@@ -1,24 +1,296 @@
-import pandas as pd
+from __future__ import annotations
+
+import functools
+import logging
 import random
-from typing import Any, Text, Dict, List
+import time
+from typing import Any, Text, Dict, List, Tuple
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 import os
+import re
 from datetime import datetime
-import requests
+
+from rasa_sdk.events import SlotSet
+
+from .attribute_index import AttributeIndex
+from .catalog import catalog_store
+from .lazy import lazy_module
+from .metrics import admin_routes, registry
+from .outfits import OutfitEngine
+from .phrases import PhraseMatcher
+from .price_index import PriceIndex, describe_range, parse_budget
+from .profiling import profiler
+from .ranking import TRENDING_WEIGHTS, Ranker
+from .rendering import RECOMMENDATION_CARD, TRENDING_CARD, CardRenderer
+from .response_cache import LRUCache, slot_key
+from .similarity import SimilarityIndex
+from .text_search import TextIndex
+from .vocabulary import VocabularyResolver
+
+# pandas and numpy load with the catalog, not when the action server imports this module
+np = lazy_module('numpy', 'np', globals())
+pd = lazy_module('pandas', 'pd', globals())
+
+logger = logging.getLogger(__name__)
+
+# Load the catalog and build its indexes while this module is imported, so
+# the action server's health check only passes once actions are fast. Off
+# unless a launcher (``actions.server``, ``actions.prefork``) turns it on:
+# otherwise everything loads on the first action.
+FASHION_WARMUP = os.getenv('FASHION_WARMUP', '0') != '0'
+
+# Ranked candidates per normalized slot state, dropped whenever the catalog reloads
+candidate_cache = LRUCache()
+catalog_store.on_reload(candidate_cache.clear)
+
+
+def build_trending_ranker(frame: pd.DataFrame) -> Ranker:
+    return Ranker(frame, TRENDING_WEIGHTS)
+
+
+def build_outfit_engine(frame: pd.DataFrame) -> OutfitEngine:
+    return OutfitEngine(frame, catalog_store.derived('ranker', Ranker).scores)
+
+
+def build_text_index(frame: pd.DataFrame) -> TextIndex:
+    return TextIndex.from_catalog(frame, catalog_store.text)
+
+
+def build_similarity_index(frame: pd.DataFrame) -> SimilarityIndex:
+    return SimilarityIndex.load_or_build(frame)
+
+
+# Structures the actions derive from the catalog, by the name they are cached under
+DERIVED_STRUCTURES = {
+    'attribute_index': AttributeIndex,
+    'price_index': PriceIndex,
+    'card_renderer': CardRenderer,
+    'ranker': Ranker,
+    'trending_ranker': build_trending_ranker,
+    'outfit_engine': build_outfit_engine,
+    'vocabulary': VocabularyResolver,
+    'text_index': build_text_index,
+    'similarity': build_similarity_index,
+}
+
+
+def catalog_structures(*names: Text) -> Tuple[Any, ...]:
+    """The catalog frame, its version and the named ``DERIVED_STRUCTURES``, all of that version.
+
+    The frame and structures are None when the catalog is unavailable.
+    """
+    frame, version, structures = catalog_store.resolve({name: DERIVED_STRUCTURES[name] for name in names})
+    return (frame, version) + tuple(structures.get(name) for name in names)
+
+
+def warm_up() -> bool:
+    """Load the catalog and build every derived structure; False if the catalog is unavailable"""
+    start = time.perf_counter()
+    frame, _, _ = catalog_store.resolve(DERIVED_STRUCTURES)
+    if frame is None:
+        logger.warning("Catalog unavailable; skipping warm-up")
+        return False
+    logger.info(f"Actions warmed up in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return True
+
+action_seconds = registry.histogram('fashion_action_seconds', "Time spent in Action.run", ('action',))
+stage_seconds = registry.histogram(
+    'fashion_action_stage_seconds', "Time spent per stage of Action.run (catalog, filtering, ranking, rendering)",
+    ('action', 'stage'))
+action_errors = registry.counter(
+    'fashion_action_errors_total', "Action runs that replied with an error message", ('action', 'reason'))
+action_fallbacks = registry.counter(
+    'fashion_action_fallbacks_total', "Replies that fell back to generic content", ('action', 'reason'))
+registry.counter_function('fashion_candidate_cache_hits_total', "Candidate cache hits",
+                          lambda: candidate_cache.hits)
+registry.counter_function('fashion_candidate_cache_misses_total', "Candidate cache misses",
+                          lambda: candidate_cache.misses)
+registry.counter_function('fashion_candidate_cache_evictions_total', "Candidate cache entries evicted when full",
+                          lambda: candidate_cache.evictions)
+registry.counter_function('fashion_candidate_cache_expirations_total',
+                          "Candidate cache entries dropped after the TTL",
+                          lambda: candidate_cache.expirations)
+registry.counter_function('fashion_candidate_cache_invalidations_total',
+                          "Times the candidate cache was emptied by a catalog reload",
+                          lambda: candidate_cache.invalidations)
+registry.gauge_function('fashion_candidate_cache_entries', "Slot states with cached candidates",
+                        lambda: len(candidate_cache))
+search_seconds = registry.histogram('fashion_search_seconds', "Time to answer a catalog text search", ('source',))
+
+# Most products one search returns
+SEARCH_MAX_RESULTS = 50
+
+# Fields of each product in search results
+SEARCH_RESULT_COLUMNS = ['product_id', 'product_name', 'category', 'gender', 'color', 'price', 'brand',
+                         'average_rating']
+
+
+def search_products(method: Text, body: Dict[Text, Any]) -> Tuple[int, Dict[Text, Any]]:
+    """``GET /search?q=linen+shorts&k=10`` on the metrics port: the products best matching ``q``"""
+    query = str(body.get('q') or '').strip()
+    if not query:
+        return 400, {'status': 'error', 'message': 'Expected a "q" parameter.'}
+    try:
+        k = min(max(int(body.get('k') or 10), 1), SEARCH_MAX_RESULTS)
+    except ValueError:
+        return 400, {'status': 'error', 'message': '"k" must be a number.'}
+
+    start = time.perf_counter()
+    with search_seconds.time(source='endpoint'):
+        df, version, text_index = catalog_structures('text_index')
+        if df is None:
+            return 503, {'status': 'error', 'message': 'Catalog unavailable.'}
+        rows, scores = text_index.search(query, k)
+        columns = [column for column in SEARCH_RESULT_COLUMNS if column in df.columns]
+        results = df.iloc[rows][columns].to_dict('records')
+    for result, score in zip(results, scores):
+        # The compiled catalog stores float32; round away its binary noise
+        result.update({column: round(value, 2) for column, value in result.items() if isinstance(value, float)})
+        result['score'] = round(float(score), 3)
+    return 200, {
+        'status': 'success',
+        'query': query,
+        'terms': text_index.terms(query),
+        'catalog_version': version,
+        'count': len(results),
+        'search_ms': round((time.perf_counter() - start) * 1000, 2),
+        'results': results,
+    }
+
+
+admin_routes['/search'] = search_products
+
+if FASHION_WARMUP:
+    warm_up()
+
+
+def instrumented(run):
+    """Time an action's ``run``, count exceptions that escape it and profile sampled runs"""
+    @functools.wraps(run)
+    def wrapper(self, dispatcher, tracker, domain):
+        slots = tracker.current_slot_values()
+        with action_seconds.time(action=self.name()), profiler.maybe_profile(self.name(), slots):
+            try:
+                return run(self, dispatcher, tracker, domain)
+            except Exception:
+                action_errors.inc(action=self.name(), reason='exception')
+                raise
+    return wrapper
+
+# Weight of category/color variety against score when picking items
+RECOMMENDATION_DIVERSITY = 0.3
+
+# Candidates cached per slot state; each reply shows a random few of them
+CANDIDATE_POOL_SIZE = 9
+RECOMMENDATION_COUNT = 3
+
+# Similar products named under a recommendation, and shown when asked for more like one
+SIMILAR_PREVIEW_COUNT = 2
+SIMILAR_ITEMS_COUNT = 3
+
+PRODUCT_NUMBER = re.compile(r'\b\d+\b')
+
+
+def shown_products(cards: CardRenderer, rows) -> Dict[Text, Any]:
+    """Remember the products of a reply, so the user can ask for more like one of them"""
+    return SlotSet("shown_products", [cards.record(row)['product_id'] for row in rows])
+
+
+def more_like(cards: CardRenderer, similarity: SimilarityIndex, row: int) -> Text:
+    """One line naming the products most like the one at ``row``"""
+    similar, _ = similarity.similar_items(cards.record(row)['product_id'], SIMILAR_PREVIEW_COUNT)
+    if not len(similar):
+        return ''
+    names = ', '.join('{product_name} (#{product_id})'.format_map(cards.record(other)) for other in similar)
+    return f"👀 **More like {cards.record(row)['product_name']}:** {names}\n\n"
+
+# Style advice by the body type, age group and preference a user gives
+BODY_TYPE_ADVICE = {
+    'hourglass': "For your hourglass figure, emphasize your waist with fitted pieces and belted styles. Wrap dresses and high-waisted bottoms will flatter your curves beautifully.",
+    'petite': "As a petite person, opt for high-waisted items and monochrome looks to create length. Avoid overwhelming prints and choose fitted silhouettes.",
+    'plus size': "Choose structured pieces and dark colors for a flattering look. V-neck styles and well-fitted clothing will highlight your best features.",
+    'rectangular': "Add definition with layered pieces and textured fabrics. Belts and structured pieces will help create curves and shape.",
+    'tall': "Experiment with horizontal lines and layered looks. You can pull off bold patterns and oversized pieces beautifully.",
+    'slim': "Add volume with layered pieces and textured fabrics. Don't be afraid to experiment with different silhouettes and patterns.",
+    'curves': "Highlight your waist with fitted pieces and v-neck styles. Structured pieces will help define your shape elegantly.",
+    'athletic': "Embrace fitted silhouettes and structured pieces. You can rock tailored looks and add softness with flowy pieces.",
+    'apple': "Draw attention upward with v-neck styles and structured pieces. Choose darker colors for the midsection and lighter colors up top.",
+    'pear': "Balance your proportions with v-neck tops and structured pieces. Choose darker colors for bottoms and lighter colors for tops.",
+    'inverted triangle': "Add volume to your lower half with textured fabrics and patterns. Choose structured pieces for the upper body.",
+    'diamond': "Create definition with structured pieces and v-neck styles. Focus on highlighting your waist and shoulders.",
+    'oval': "Add structure with fitted pieces and v-neck styles. Choose pieces that create definition and shape.",
+    'triangle': "Balance with v-neck styles and structured pieces. Add volume to your upper half with interesting details.",
+    'rectangle': "Create curves with layered pieces and belted styles. Add definition with structured pieces and interesting textures.",
+    'curvy': "Embrace your shape with fitted pieces and v-neck styles. Choose structured pieces that highlight your curves beautifully.",
+    'short': "Create length with high-waisted items and vertical lines. Choose fitted silhouettes and avoid overwhelming pieces.",
+    'medium': "Experiment with different silhouettes and layered looks. You have the flexibility to try various styles and trends."
+}
+
+AGE_ADVICE = {
+    'teens': "Have fun with trends while staying comfortable and age-appropriate. Experiment with colors and styles to find your personal style.",
+    'twenties': "Mix trendy pieces with classic staples for a balanced wardrobe. Invest in quality basics that will last.",
+    'thirties': "Invest in quality pieces that reflect your growing sophistication. Build a wardrobe that's both professional and stylish.",
+    'forties': "Focus on elegant, well-fitted pieces that make you feel confident. Choose timeless styles with modern touches.",
+    'fifties': "Choose classic styles with modern touches for timeless elegance. Prioritize comfort without sacrificing style.",
+    'sixties': "Prioritize comfort and elegance with well-crafted pieces. Choose sophisticated styles that reflect your confidence.",
+    'young': "Experiment with trends while building a foundation of classics. Don't be afraid to try new styles.",
+    'middle aged': "Balance sophistication with comfort in your style choices. Choose pieces that reflect your experience and confidence.",
+    'senior': "Choose elegant, comfortable pieces that reflect your confidence. Focus on quality and timeless style.",
+    'professional': "Build a wardrobe of sophisticated, versatile pieces. Choose items that work for both office and casual settings.",
+    'student': "Mix affordable trends with practical, comfortable pieces. Focus on versatile items that work for various occasions.",
+    'parent': "Choose practical, comfortable pieces that still make you feel stylish. Look for easy-care fabrics and versatile styles.",
+    'grandparent': "Embrace elegant, comfortable styles that reflect your wisdom. Choose pieces that make you feel confident and beautiful."
+}
+
+PREFERENCE_ADVICE = {
+    'comfortable': "Prioritize comfort without sacrificing style. Look for stretch fabrics, relaxed fits, and breathable materials.",
+    'stylish': "Focus on well-fitted pieces and current trends that suit your personality. Don't be afraid to make bold choices.",
+    'elegant': "Choose sophisticated pieces with clean lines and quality fabrics. Focus on timeless styles and refined details.",
+    'casual': "Build a wardrobe of comfortable, versatile pieces for everyday wear. Choose items that are easy to mix and match.",
+    'sophisticated': "Invest in quality pieces with refined details and classic silhouettes. Focus on understated elegance.",
+    'trendy': "Stay current with fashion trends while maintaining your personal style. Mix trendy pieces with classic staples.",
+    'modest': "Choose pieces with appropriate coverage while staying stylish. Look for elegant, sophisticated styles.",
+    'bold': "Embrace vibrant colors and statement pieces that express your personality. Don't be afraid to stand out.",
+    'neutral': "Build a cohesive wardrobe with neutral tones and versatile pieces. Focus on mix-and-match potential.",
+    'loose': "Choose relaxed fits that provide comfort and a modern silhouette. Embrace the oversized trend thoughtfully.",
+    'fitted': "Opt for well-tailored pieces that flatter your figure. Focus on proper fit and structured silhouettes.",
+    'oversized': "Embrace the relaxed trend with intentionally oversized pieces. Balance with fitted items for proportion.",
+    'minimalist': "Focus on clean lines, quality fabrics, and essential pieces. Keep your wardrobe simple and versatile.",
+    'detailed': "Choose pieces with interesting details and textures. Look for unique elements that add personality.",
+    'simple': "Keep your style clean and uncomplicated with essential pieces. Focus on quality over quantity."
+}
+
+# Phrases of the latest message the actions react to, by feature; earlier entries of a table win
+MESSAGE_PHRASES = {
+    'dress_type': {f'{dress_type} {noun}': dress_type
+                   for dress_type in ('party', 'casual', 'formal', 'evening', 'summer', 'cocktail', 'wedding')
+                   for noun in ('dress', 'dresses')},
+    'category': {
+        'dress': 'dress', 'dresses': 'dress',
+        'top': 'top', 'tops': 'top',
+        'pant': 'pant', 'pants': 'pant',
+        'shoe': 'shoe', 'shoes': 'shoe',
+    },
+    'ordinal': {'first': 0, '1st': 0, 'second': 1, '2nd': 1, 'third': 2, '3rd': 2, 'last': -1},
+}
+message_phrases = PhraseMatcher(MESSAGE_PHRASES)
 
 class ActionGiveRecommendation(Action):
     def name(self) -> Text:
         return "action_give_recommendation"
 
+    @instrumented
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            if os.path.exists("data/fashion_comprehensive_dataset_large.csv"):
-                df = pd.read_csv("data/fashion_comprehensive_dataset_large.csv")
-            else:
+            with stage_seconds.time(action=self.name(), stage='catalog'):
+                df, version, index, cards, ranker, vocabulary, prices, similarity = catalog_structures(
+                    'attribute_index', 'card_renderer', 'ranker', 'vocabulary', 'price_index', 'similarity')
+            if df is None:
+                action_errors.inc(action=self.name(), reason='catalog_unavailable')
                 dispatcher.utter_message(text="I'm sorry, I can't access the fashion database right now.")
                 return []
 
@@ -36,65 +308,32 @@ class ActionGiveRecommendation(Action):
             event = tracker.get_slot("event")
             preference = tracker.get_slot("preference")
 
-            # Check if this is a basic dress request without much context
+            # Find the dress type and category the latest message asks for in one scan
             last_message = tracker.latest_message.get('text', '').lower()
-            is_basic_request = any(word in last_message for word in ['dress', 'dresses', 'top', 'tops', 'pant', 'pants', 'shoe', 'shoes'])
-            
-            # Check for specific requests like "party dresses", "casual dresses", etc.
-            specific_dress_request = False
-            dress_type = None
-            
-            if 'party dress' in last_message or 'party dresses' in last_message:
-                specific_dress_request = True
-                dress_type = 'party'
-            elif 'casual dress' in last_message or 'casual dresses' in last_message:
-                specific_dress_request = True
-                dress_type = 'casual'
-            elif 'formal dress' in last_message or 'formal dresses' in last_message:
-                specific_dress_request = True
-                dress_type = 'formal'
-            elif 'evening dress' in last_message or 'evening dresses' in last_message:
-                specific_dress_request = True
-                dress_type = 'evening'
-            elif 'summer dress' in last_message or 'summer dresses' in last_message:
-                specific_dress_request = True
-                dress_type = 'summer'
-            elif 'cocktail dress' in last_message or 'cocktail dresses' in last_message:
-                specific_dress_request = True
-                dress_type = 'cocktail'
-            elif 'wedding dress' in last_message or 'wedding dresses' in last_message:
-                specific_dress_request = True
-                dress_type = 'wedding'
-            
+            features = message_phrases.scan(last_message)
+            categories = features.get('category', [])
+            is_basic_request = bool(categories)
+
+            # A price the message names ("dresses under 200") wins over the budget slot
+            price_range = parse_budget(last_message, loose=False) or parse_budget(budget)
+
+            # Specific requests like "party dresses", "casual dresses", etc.
+            dress_type = features.get('dress_type', [None])[0]
+            specific_dress_request = dress_type is not None
+
             # If it's a specific dress request, provide direct recommendations
             if specific_dress_request and dress_type:
-                # Filter for the specific dress type
-                dress_recommendations = df[df['category'].str.contains('dress', case=False, na=False)]
-                dress_recommendations = dress_recommendations[dress_recommendations['occasion'].str.contains(dress_type, case=False, na=False)]
-                
-                if dress_recommendations.empty:
-                    # Fallback to general dress recommendations
-                    dress_recommendations = df[df['category'].str.contains('dress', case=False, na=False)]
-                
-                # Get top 3 recommendations
-                recommendations = dress_recommendations.sample(min(3, len(dress_recommendations)))
+                candidates = candidate_cache.get_or_compute(
+                    (version, 'dress', dress_type),
+                    lambda: self.get_dress_candidates(dress_type, index, ranker))
+                recommendations = self.pick_recommendations(candidates)
                 
                 response = f"🎉 **{dress_type.upper()} DRESS RECOMMENDATIONS** 🎉\n\n"
                 response += f"Here are some fabulous {dress_type} dresses perfect for your occasion:\n\n"
-                
-                for idx, item in recommendations.iterrows():
-                    rating = float(item.get('average_rating', 4.0))
-                    durability = float(item.get('durability_rating', 3.5))
-                    comfort = float(item.get('comfort_rating', 4.0))
-                    value_score = (rating + durability + comfort) / 3
-                    
-                    response += f"**{item['product_name']}** - {item['category'].title()}\n"
-                    response += f"🎨 **Style:** {item['pattern']} | **Color:** {item['color']}\n"
-                    response += f"⭐ **Value Score:** {value_score:.1f}/5.0 | **Rating:** {rating:.1f}/5.0\n"
-                    response += f"💰 **Price:** ${item['price']:.2f} | **Brand:** {item['brand']}\n"
-                    response += f"🌍 **Perfect for:** {item['season']} | **Occasion:** {item['occasion']}\n"
-                    response += f"🧵 **Material:** {item['material']} | **Fit:** {item.get('fit_type', 'Regular')}\n"
-                    response += f"💡 **Styling Tip:** {item.get('styling_tips', 'Pair with complementary accessories for a complete look')}\n\n"
+                with stage_seconds.time(action=self.name(), stage='rendering'):
+                    response += cards.render(RECOMMENDATION_CARD, recommendations)
+                    if len(recommendations):
+                        response += more_like(cards, similarity, recommendations[0])
                 
                 response += f"**💎 {dress_type.upper()} DRESS STYLING TIPS:**\n"
                 if dress_type == 'party':
@@ -140,11 +379,11 @@ class ActionGiveRecommendation(Action):
                 response += "• Handle with care to preserve delicate details\n\n"
                 
                 dispatcher.utter_message(text=response)
-                return []
+                return [shown_products(cards, recommendations)]
             
             # If it's a basic request without context, ask follow-up questions
-            if is_basic_request and not (occasion or style or color or budget):
-                if 'dress' in last_message or 'dresses' in last_message:
+            if is_basic_request and not (occasion or style or color or price_range):
+                if categories[0] == 'dress':
                     response = "👗 **DRESS RECOMMENDATIONS** 👗\n\n"
                     response += "I'd love to help you find the perfect dress! To give you the best recommendations, I need to know:\n\n"
                     response += "**🎯 What type of dress are you looking for?**\n"
@@ -179,7 +418,7 @@ class ActionGiveRecommendation(Action):
                     dispatcher.utter_message(text=response)
                     return []
                 
-                elif 'top' in last_message or 'tops' in last_message:
+                elif categories[0] == 'top':
                     response = "👕 **TOP RECOMMENDATIONS** 👕\n\n"
                     response += "Great choice! Let me help you find the perfect top. I need to know:\n\n"
                     response += "**🎯 What type of top?**\n"
@@ -212,7 +451,7 @@ class ActionGiveRecommendation(Action):
                     dispatcher.utter_message(text=response)
                     return []
                 
-                elif 'pant' in last_message or 'pants' in last_message:
+                elif categories[0] == 'pant':
                     response = "👖 **PANTS RECOMMENDATIONS** 👖\n\n"
                     response += "Perfect! Let me find you the ideal pants. I need to know:\n\n"
                     response += "**🎯 What type of pants?**\n"
@@ -245,7 +484,7 @@ class ActionGiveRecommendation(Action):
                     dispatcher.utter_message(text=response)
                     return []
                 
-                elif 'shoe' in last_message or 'shoes' in last_message:
+                elif categories[0] == 'shoe':
                     response = "👟 **SHOES RECOMMENDATIONS** 👟\n\n"
                     response += "Excellent! Let me help you find the perfect shoes. I need to know:\n\n"
                     response += "**🎯 What type of shoes?**\n"
@@ -278,8 +517,15 @@ class ActionGiveRecommendation(Action):
                     dispatcher.utter_message(text=response)
                     return []
 
+            # A basic request that skipped the questions because it names a price ("dresses under 100")
+            # keeps to the category it names
+            if is_basic_request and not category and not (occasion or style or color):
+                category = categories[0]
+
             # Build personalized recommendation message
             personalization = []
+            if price_range:
+                personalization.append(f"budget ({describe_range(price_range)})")
             if body_type:
                 personalization.append(f"body type ({body_type})")
             if age_group:
@@ -291,70 +537,25 @@ class ActionGiveRecommendation(Action):
             if preference:
                 personalization.append(f"preference ({preference})")
 
-            # Filter data based on preferences
-            filtered_df = df.copy()
-            
-            if category:
-                filtered_df = filtered_df[filtered_df['category'].str.contains(category, case=False, na=False)]
-            
-            if gender:
-                filtered_df = filtered_df[filtered_df['gender'].str.contains(gender, case=False, na=False)]
-            
-            if color:
-                filtered_df = filtered_df[filtered_df['color'].str.contains(color, case=False, na=False)]
-            
-            if occasion:
-                filtered_df = filtered_df[filtered_df['occasion'].str.contains(occasion, case=False, na=False)]
-            
-            if style:
-                filtered_df = filtered_df[filtered_df['style_preference'].str.contains(style, case=False, na=False)]
-            
-            if budget:
-                # Enhanced budget filtering
-                try:
-                    price_series = pd.to_numeric(filtered_df['price'], errors='coerce')
-                    if 'budget-friendly' in budget.lower() or 'low' in budget.lower():
-                        filtered_df = filtered_df[price_series <= 150]
-                    elif 'mid-range' in budget.lower() or 'medium' in budget.lower():
-                        filtered_df = filtered_df[(price_series > 150) & (price_series <= 400)]
-                    elif 'premium' in budget.lower():
-                        filtered_df = filtered_df[(price_series > 400) & (price_series <= 800)]
-                    elif 'luxury' in budget.lower() or 'high' in budget.lower():
-                        filtered_df = filtered_df[price_series > 800]
-                    else:
-                        # Fallback to string matching
-                        filtered_df = filtered_df[filtered_df['price'].astype(str).str.contains(budget, case=False, na=False)]
-                except:
-                    # Fallback to original string matching
-                    filtered_df = filtered_df[filtered_df['price'].astype(str).str.contains(budget, case=False, na=False)]
-            
-            if season:
-                filtered_df = filtered_df[filtered_df['Season'].str.contains(season, case=False, na=False)]
-
-            # Personalized recommendations based on body type
-            if body_type:
-                body_type_recommendations = self.get_body_type_recommendations(body_type, filtered_df)
-                if body_type_recommendations:
-                    filtered_df = body_type_recommendations
-
-            # Age-appropriate recommendations
-            if age_group:
-                age_recommendations = self.get_age_recommendations(age_group, filtered_df)
-                if age_recommendations:
-                    filtered_df = age_recommendations
-
-            # Weather-appropriate recommendations
-            if weather:
-                weather_recommendations = self.get_weather_recommendations(weather, filtered_df)
-                if weather_recommendations:
-                    filtered_df = weather_recommendations
-
-            if filtered_df.empty:
+            filters = {
+                'category': category,
+                'gender': gender,
+                'color': color,
+                'occasion': occasion,
+                'style_type': style,
+                'season': season,
+                'budget': price_range,
+                'body_type': body_type,
+                'age_group': age_group,
+                'weather': weather,
+            }
+            found, candidates = candidate_cache.get_or_compute(
+                (version, 'slots', slot_key(filters)),
+                lambda: self.get_candidates(filters, index, prices, vocabulary, ranker))
+            if not found:
+                action_fallbacks.inc(action=self.name(), reason='no_match')
                 dispatcher.utter_message(text="I couldn't find any items matching your preferences. Let me suggest some general recommendations.")
-                # Get random recommendations
-                recommendations = df.sample(min(3, len(df)))
-            else:
-                recommendations = filtered_df.sample(min(3, len(filtered_df)))
+            recommendations = self.pick_recommendations(candidates)
 
             # Build enhanced personalized response
             if personalization:
@@ -364,20 +565,10 @@ class ActionGiveRecommendation(Action):
                 response = "🎯 **FASHION RECOMMENDATIONS** 🎯\n\n"
                 response += "Here are some amazing fashion recommendations for you:\n\n"
             
-            for idx, item in recommendations.iterrows():
-                # Calculate value score
-                rating = float(item.get('average_rating', 4.0))
-                durability = float(item.get('durability_rating', 3.5))
-                comfort = float(item.get('comfort_rating', 4.0))
-                value_score = (rating + durability + comfort) / 3
-                
-                response += f"**{item['product_name']}** - {item['category'].title()}\n"
-                response += f"🎨 **Style:** {item['pattern']} | **Color:** {item['color']}\n"
-                response += f"⭐ **Value Score:** {value_score:.1f}/5.0 | **Rating:** {rating:.1f}/5.0\n"
-                response += f"💰 **Price:** ${item['price']:.2f} | **Brand:** {item['brand']}\n"
-                response += f"🌍 **Perfect for:** {item['season']} | **Occasion:** {item['occasion']}\n"
-                response += f"🧵 **Material:** {item['material']} | **Fit:** {item.get('fit_type', 'Regular')}\n"
-                response += f"💡 **Styling Tip:** {item.get('styling_tips', 'Pair with complementary accessories for a complete look')}\n\n"
+            with stage_seconds.time(action=self.name(), stage='rendering'):
+                response += cards.render(RECOMMENDATION_CARD, recommendations)
+                if len(recommendations):
+                    response += more_like(cards, similarity, recommendations[0])
 
             # Add comprehensive styling insights
             response += "**💎 STYLING INSIGHTS:**\n"
@@ -399,13 +590,66 @@ class ActionGiveRecommendation(Action):
             response += "• Regular maintenance extends garment life\n\n"
 
             dispatcher.utter_message(text=response)
+            return [shown_products(cards, recommendations)]
 
         except Exception as e:
+            action_errors.inc(action=self.name(), reason='exception')
             dispatcher.utter_message(text=f"I encountered an error while processing your request: {str(e)}")
 
         return []
 
-    def get_body_type_recommendations(self, body_type: str, df: pd.DataFrame) -> pd.DataFrame:
+    def get_dress_candidates(self, dress_type: str, index: AttributeIndex, ranker: Ranker) -> np.ndarray:
+        """Best-ranked dresses for the occasion, or any dresses if none match"""
+        with stage_seconds.time(action=self.name(), stage='filtering'):
+            dress_rows = index.match('category', 'dress')
+            matched_rows = dress_rows & index.match('occasion', dress_type)
+        with stage_seconds.time(action=self.name(), stage='ranking'):
+            return ranker.top_k(index.rows(matched_rows or dress_rows), CANDIDATE_POOL_SIZE,
+                                diversity=RECOMMENDATION_DIVERSITY)
+
+    def get_candidates(self, filters: Dict[Text, Any], index: AttributeIndex, prices: PriceIndex,
+                       vocabulary: VocabularyResolver, ranker: Ranker) -> Tuple[bool, np.ndarray]:
+        """Best-ranked rows matching the slot filters.
+
+        Returns whether anything matched together with the candidates; when
+        nothing does the candidates come from the whole catalog.
+        """
+        filtering_started = time.perf_counter()
+        # Filter data based on preferences by intersecting the bitmaps of the catalog values they resolve to
+        rows = vocabulary.select(index, {column: filters[column] for column in
+                                         ('category', 'gender', 'color', 'occasion', 'style_type', 'season')})
+
+        # Keep the rows priced within the budget range, a bisection of the catalog's sorted prices
+        if filters['budget'] and rows:
+            rows &= prices.bitmap(*filters['budget'])
+
+        # Personalized recommendations based on body type
+        if filters['body_type']:
+            rows = self.get_body_type_recommendations(filters['body_type'], index, rows)
+
+        # Age-appropriate recommendations
+        if filters['age_group']:
+            rows = self.get_age_recommendations(filters['age_group'], index, rows)
+
+        # Weather-appropriate recommendations
+        if filters['weather']:
+            rows = self.get_weather_recommendations(filters['weather'], index, rows)
+
+        stage_seconds.observe(time.perf_counter() - filtering_started, action=self.name(), stage='filtering')
+
+        with stage_seconds.time(action=self.name(), stage='ranking'):
+            if not rows:
+                # Fall back to the best-ranked items of the whole catalog
+                return False, ranker.top_k(None, CANDIDATE_POOL_SIZE, diversity=RECOMMENDATION_DIVERSITY)
+            return True, ranker.top_k(index.rows(rows), CANDIDATE_POOL_SIZE, diversity=RECOMMENDATION_DIVERSITY)
+
+    def pick_recommendations(self, candidates: np.ndarray) -> np.ndarray:
+        """Pick a random few candidates so repeated requests get varied replies"""
+        count = min(RECOMMENDATION_COUNT, len(candidates))
+        chosen = sorted(random.sample(range(len(candidates)), count))
+        return candidates[chosen]
+
+    def get_body_type_recommendations(self, body_type: str, index: AttributeIndex, rows: int) -> int:
         """Get recommendations based on body type"""
         body_type_tips = {
             'hourglass': ['fitted', 'wrap', 'belted', 'structured'],
@@ -430,11 +674,11 @@ class ActionGiveRecommendation(Action):
         
         if body_type.lower() in body_type_tips:
             tips = body_type_tips[body_type.lower()]
-            filtered = df[df['pattern'].str.contains('|'.join(tips), case=False, na=False)]
-            return filtered if not filtered.empty else df
-        return df
+            filtered = rows & index.match_any('pattern', tips)
+            return filtered if filtered else rows
+        return rows
 
-    def get_age_recommendations(self, age_group: str, df: pd.DataFrame) -> pd.DataFrame:
+    def get_age_recommendations(self, age_group: str, index: AttributeIndex, rows: int) -> int:
         """Get age-appropriate recommendations"""
         age_appropriate_styles = {
             'teens': ['trendy', 'casual', 'fun', 'colorful'],
@@ -456,11 +700,11 @@ class ActionGiveRecommendation(Action):
         
         if age_group.lower() in age_appropriate_styles:
             styles = age_appropriate_styles[age_group.lower()]
-            filtered = df[df['pattern'].str.contains('|'.join(styles), case=False, na=False)]
-            return filtered if not filtered.empty else df
-        return df
+            filtered = rows & index.match_any('pattern', styles)
+            return filtered if filtered else rows
+        return rows
 
-    def get_weather_recommendations(self, weather: str, df: pd.DataFrame) -> pd.DataFrame:
+    def get_weather_recommendations(self, weather: str, index: AttributeIndex, rows: int) -> int:
         """Get weather-appropriate recommendations"""
         weather_appropriate = {
             'sunny': ['light', 'breathable', 'summer', 'casual'],
@@ -482,9 +726,9 @@ class ActionGiveRecommendation(Action):
         
         if weather.lower() in weather_appropriate:
             styles = weather_appropriate[weather.lower()]
-            filtered = df[df['pattern'].str.contains('|'.join(styles), case=False, na=False)]
-            return filtered if not filtered.empty else df
-        return df
+            filtered = rows & index.match_any('pattern', styles)
+            return filtered if filtered else rows
+        return rows
 
     def get_personalized_styling_tip(self, body_type: str, age_group: str, preference: str) -> str:
         """Get personalized styling tips"""
@@ -563,41 +807,28 @@ class ActionTrendingItems(Action):
     def name(self) -> Text:
         return "action_trending_items"
 
+    @instrumented
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            if os.path.exists("data/fashion_comprehensive_dataset_large.csv"):
-                df = pd.read_csv("data/fashion_comprehensive_dataset_large.csv")
-            else:
+            with stage_seconds.time(action=self.name(), stage='catalog'):
+                df, _, ranker, cards = catalog_structures('trending_ranker', 'card_renderer')
+            if df is None:
+                action_errors.inc(action=self.name(), reason='catalog_unavailable')
                 dispatcher.utter_message(text="I'm sorry, I can't access the fashion database right now.")
                 return []
 
-            # Get trending items with enhanced analysis
-            trending_items = df.sample(min(5, len(df)))
+            # Get trending items, re-ranked for variety with a seed that changes daily
+            with stage_seconds.time(action=self.name(), stage='ranking'):
+                trending_items = ranker.top_k(None, 5, diversity=RECOMMENDATION_DIVERSITY,
+                                              seed=datetime.now().date().toordinal())
             
             response = "🔥 **TRENDING FASHION ITEMS** 🔥\n\n"
             response += "Here are the hottest fashion items trending right now:\n\n"
-            
-            for idx, item in trending_items.iterrows():
-                # Calculate trend score based on ratings and trend level
-                try:
-                    trend_score = float(item.get('trend_level', 3.5))
-                except (ValueError, TypeError):
-                    trend_score = 3.5
-                try:
-                    rating = float(item.get('average_rating', 4.0))
-                except (ValueError, TypeError):
-                    rating = 4.0
-                overall_score = (trend_score + rating) / 2
-                
-                response += f"**{item['product_name']}** - {item['category'].title()}\n"
-                response += f"🎨 **Style:** {item['pattern']} | **Color:** {item['color']}\n"
-                response += f"⭐ **Trend Score:** {overall_score:.1f}/5.0 | **Rating:** {rating:.1f}/5.0\n"
-                response += f"💰 **Price:** ${item['price']:.2f} | **Brand:** {item['brand']}\n"
-                response += f"🌍 **Perfect for:** {item['season']} | **Occasion:** {item['occasion']}\n"
-                response += f"💡 **Styling Tip:** {item.get('styling_tips', 'Pair with complementary accessories for a complete look')}\n\n"
+            with stage_seconds.time(action=self.name(), stage='rendering'):
+                response += cards.render(TRENDING_CARD, trending_items)
 
             response += "**💎 TREND INSIGHTS:**\n"
             response += "• These items are currently dominating social media and fashion blogs\n"
@@ -606,59 +837,163 @@ class ActionTrendingItems(Action):
             response += "• Versatile enough to style multiple ways\n\n"
 
             dispatcher.utter_message(text=response)
+            return [shown_products(cards, trending_items)]
 
         except Exception as e:
+            action_errors.inc(action=self.name(), reason='exception')
             dispatcher.utter_message(text=f"I encountered an error while processing your request: {str(e)}")
 
         return []
 
+class ActionSearchProducts(Action):
+    def name(self) -> Text:
+        return "action_search_products"
+
+    @instrumented
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+
+        try:
+            with stage_seconds.time(action=self.name(), stage='catalog'):
+                df, _, index, vocabulary, text_index, cards = catalog_structures(
+                    'attribute_index', 'vocabulary', 'text_index', 'card_renderer')
+            if df is None:
+                action_errors.inc(action=self.name(), reason='catalog_unavailable')
+                dispatcher.utter_message(text="I'm sorry, I can't access the fashion database right now.")
+                return []
+
+            query = tracker.latest_message.get('text', '')
+
+            # Keep to the gender and category the user gave, unless nothing there matches
+            with stage_seconds.time(action=self.name(), stage='filtering'):
+                rows = vocabulary.select(index, {
+                    'gender': tracker.get_slot("gender"),
+                    'category': tracker.get_slot("clothing_category"),
+                })
+            with stage_seconds.time(action=self.name(), stage='ranking'), search_seconds.time(source='action'):
+                results, _ = text_index.search(query, RECOMMENDATION_COUNT,
+                                               index.mask(rows) if rows != index.all_rows else None)
+                if not len(results) and rows != index.all_rows:
+                    results, _ = text_index.search(query, RECOMMENDATION_COUNT)
+
+            if not len(results):
+                action_fallbacks.inc(action=self.name(), reason='no_match')
+                dispatcher.utter_message(text="I couldn't find anything matching that. Try describing the item, "
+                                              "its color, material or the occasion you need it for.")
+                return []
+
+            response = "🔎 **SEARCH RESULTS** 🔎\n\n"
+            response += "Here's what I found in our collection:\n\n"
+            with stage_seconds.time(action=self.name(), stage='rendering'):
+                response += cards.render(RECOMMENDATION_CARD, results)
+
+            dispatcher.utter_message(text=response)
+            return [shown_products(cards, results)]
+
+        except Exception as e:
+            action_errors.inc(action=self.name(), reason='exception')
+            dispatcher.utter_message(text=f"I encountered an error while processing your request: {str(e)}")
+
+        return []
+
+class ActionSimilarItems(Action):
+    def name(self) -> Text:
+        return "action_similar_items"
+
+    @instrumented
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+
+        try:
+            with stage_seconds.time(action=self.name(), stage='catalog'):
+                df, _, similarity, cards = catalog_structures('similarity', 'card_renderer')
+            if df is None:
+                action_errors.inc(action=self.name(), reason='catalog_unavailable')
+                dispatcher.utter_message(text="I'm sorry, I can't access the fashion database right now.")
+                return []
+
+            product_id = self.get_target_product(tracker, similarity)
+            if product_id is None:
+                action_fallbacks.inc(action=self.name(), reason='no_target')
+                dispatcher.utter_message(text="Which item would you like more like? Ask me for some recommendations "
+                                              "first, or give me a product number like #2001.")
+                return []
+
+            with stage_seconds.time(action=self.name(), stage='ranking'):
+                similar, _ = similarity.similar_items(product_id, SIMILAR_ITEMS_COUNT)
+
+            product = cards.record(similarity.row(product_id))
+            response = f"👀 **MORE LIKE {product['product_name'].upper()}** 👀\n\n"
+            response += "Here are the closest matches in our collection:\n\n"
+            with stage_seconds.time(action=self.name(), stage='rendering'):
+                response += cards.render(RECOMMENDATION_CARD, similar)
+
+            dispatcher.utter_message(text=response)
+            return [shown_products(cards, similar)]
+
+        except Exception as e:
+            action_errors.inc(action=self.name(), reason='exception')
+            dispatcher.utter_message(text=f"I encountered an error while processing your request: {str(e)}")
+
+        return []
+
+    def get_target_product(self, tracker: Tracker, similarity: SimilarityIndex):
+        """Id of the product the user means: one they name by number, else the one of the last reply
+        they point at ("the second one"), else the first one of the last reply"""
+        last_message = tracker.latest_message.get('text', '')
+        for number in PRODUCT_NUMBER.findall(last_message):
+            if similarity.row(int(number)) is not None:
+                return int(number)
+
+        shown = tracker.get_slot("shown_products") or []
+        if not shown:
+            return None
+        position = message_phrases.scan(last_message.lower()).get('ordinal', [0])[0]
+        if not -len(shown) <= position < len(shown):
+            position = 0
+        return shown[position] if similarity.row(shown[position]) is not None else None
+
 class ActionOutfitCombination(Action):
     def name(self) -> Text:
         return "action_outfit_combination"
 
+    @instrumented
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         try:
-            if os.path.exists("data/fashion_comprehensive_dataset_large.csv"):
-                df = pd.read_csv("data/fashion_comprehensive_dataset_large.csv")
-            else:
+            with stage_seconds.time(action=self.name(), stage='catalog'):
+                df, _, index, engine, cards, vocabulary = catalog_structures(
+                    'attribute_index', 'outfit_engine', 'card_renderer', 'vocabulary')
+            if df is None:
+                action_errors.inc(action=self.name(), reason='catalog_unavailable')
                 dispatcher.utter_message(text="I'm sorry, I can't access the fashion database right now.")
                 return []
 
-            # Get enhanced outfit combinations
-            tops = df[df['category'].str.contains('shirt|blouse|top', case=False, na=False)].sample(min(2, len(df)))
-            bottoms = df[df['category'].str.contains('jeans|shorts|skirt|pants', case=False, na=False)].sample(min(2, len(df)))
-            shoes = df[df['category'].str.contains('shoes|boots|sneakers', case=False, na=False)].sample(min(2, len(df)))
+            # Limit the pieces to the user's gender, occasion and season when known
+            with stage_seconds.time(action=self.name(), stage='filtering'):
+                rows = vocabulary.select(index, {
+                    'gender': tracker.get_slot("gender"),
+                    'occasion': tracker.get_slot("occasion"),
+                    'season': tracker.get_slot("season"),
+                })
+
+            # Get the best compatible outfit combinations
+            with stage_seconds.time(action=self.name(), stage='ranking'):
+                outfits = engine.best_outfits(2, index.mask(rows)) if rows != index.all_rows else []
+                if not outfits:
+                    if rows != index.all_rows:
+                        action_fallbacks.inc(action=self.name(), reason='no_match')
+                    outfits = engine.best_outfits(2)
 
             response = "👗 **STYLISH OUTFIT COMBINATIONS** 👗\n\n"
             response += "Here are some expertly curated outfit combinations for you:\n\n"
             
-            for i in range(min(len(tops), len(bottoms), len(shoes))):
-                # Calculate style score for each outfit
-                try:
-                    top_rating = float(tops.iloc[i].get('average_rating', 4.0))
-                except (ValueError, TypeError):
-                    top_rating = 4.0
-                try:
-                    bottom_rating = float(bottoms.iloc[i].get('average_rating', 4.0))
-                except (ValueError, TypeError):
-                    bottom_rating = 4.0
-                try:
-                    shoe_rating = float(shoes.iloc[i].get('average_rating', 4.0))
-                except (ValueError, TypeError):
-                    shoe_rating = 4.0
-                outfit_score = (top_rating + bottom_rating + shoe_rating) / 3
-                
-                response += f"**Outfit {i+1}** - Style Score: {outfit_score:.1f}/5.0 ⭐\n"
-                response += f"👕 **Top:** {tops.iloc[i]['product_name']} ({tops.iloc[i]['color']})\n"
-                response += f"   Brand: {tops.iloc[i]['brand']} | Price: ${tops.iloc[i]['price']:.2f}\n"
-                response += f"👖 **Bottom:** {bottoms.iloc[i]['product_name']} ({bottoms.iloc[i]['color']})\n"
-                response += f"   Brand: {bottoms.iloc[i]['brand']} | Price: ${bottoms.iloc[i]['price']:.2f}\n"
-                response += f"👟 **Shoes:** {shoes.iloc[i]['product_name']} ({shoes.iloc[i]['color']})\n"
-                response += f"   Brand: {shoes.iloc[i]['brand']} | Price: ${shoes.iloc[i]['price']:.2f}\n"
-                response += f"💡 **Styling Tip:** {tops.iloc[i].get('styling_tips', 'Perfect for a casual yet stylish look')}\n\n"
+            with stage_seconds.time(action=self.name(), stage='rendering'):
+                response += cards.render_outfits(outfits)
 
             response += "**💎 OUTFIT COORDINATION TIPS:**\n"
             response += "• Mix textures for visual interest\n"
@@ -676,6 +1011,7 @@ class ActionOutfitCombination(Action):
             dispatcher.utter_message(text=response)
 
         except Exception as e:
+            action_errors.inc(action=self.name(), reason='exception')
             dispatcher.utter_message(text=f"I encountered an error while processing your request: {str(e)}")
 
         return []
@@ -684,6 +1020,7 @@ class ActionStyleAdvice(Action):
     def name(self) -> Text:
         return "action_style_advice"
 
+    @instrumented
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -744,72 +1081,21 @@ class ActionStyleAdvice(Action):
 
     def get_body_type_advice(self, body_type: str) -> str:
         """Get body type specific advice"""
-        body_advice = {
-            'hourglass': "For your hourglass figure, emphasize your waist with fitted pieces and belted styles. Wrap dresses and high-waisted bottoms will flatter your curves beautifully.",
-            'petite': "As a petite person, opt for high-waisted items and monochrome looks to create length. Avoid overwhelming prints and choose fitted silhouettes.",
-            'plus size': "Choose structured pieces and dark colors for a flattering look. V-neck styles and well-fitted clothing will highlight your best features.",
-            'rectangular': "Add definition with layered pieces and textured fabrics. Belts and structured pieces will help create curves and shape.",
-            'tall': "Experiment with horizontal lines and layered looks. You can pull off bold patterns and oversized pieces beautifully.",
-            'slim': "Add volume with layered pieces and textured fabrics. Don't be afraid to experiment with different silhouettes and patterns.",
-            'curves': "Highlight your waist with fitted pieces and v-neck styles. Structured pieces will help define your shape elegantly.",
-            'athletic': "Embrace fitted silhouettes and structured pieces. You can rock tailored looks and add softness with flowy pieces.",
-            'apple': "Draw attention upward with v-neck styles and structured pieces. Choose darker colors for the midsection and lighter colors up top.",
-            'pear': "Balance your proportions with v-neck tops and structured pieces. Choose darker colors for bottoms and lighter colors for tops.",
-            'inverted triangle': "Add volume to your lower half with textured fabrics and patterns. Choose structured pieces for the upper body.",
-            'diamond': "Create definition with structured pieces and v-neck styles. Focus on highlighting your waist and shoulders.",
-            'oval': "Add structure with fitted pieces and v-neck styles. Choose pieces that create definition and shape.",
-            'triangle': "Balance with v-neck styles and structured pieces. Add volume to your upper half with interesting details.",
-            'rectangle': "Create curves with layered pieces and belted styles. Add definition with structured pieces and interesting textures.",
-            'curvy': "Embrace your shape with fitted pieces and v-neck styles. Choose structured pieces that highlight your curves beautifully.",
-            'short': "Create length with high-waisted items and vertical lines. Choose fitted silhouettes and avoid overwhelming pieces.",
-            'medium': "Experiment with different silhouettes and layered looks. You have the flexibility to try various styles and trends."
-        }
-        return body_advice.get(body_type.lower(), "Focus on pieces that make you feel confident and comfortable.")
+        return BODY_TYPE_ADVICE.get(body_type.lower(), "Focus on pieces that make you feel confident and comfortable.")
 
     def get_age_advice(self, age_group: str) -> str:
         """Get age-specific advice"""
-        age_advice = {
-            'teens': "Have fun with trends while staying comfortable and age-appropriate. Experiment with colors and styles to find your personal style.",
-            'twenties': "Mix trendy pieces with classic staples for a balanced wardrobe. Invest in quality basics that will last.",
-            'thirties': "Invest in quality pieces that reflect your growing sophistication. Build a wardrobe that's both professional and stylish.",
-            'forties': "Focus on elegant, well-fitted pieces that make you feel confident. Choose timeless styles with modern touches.",
-            'fifties': "Choose classic styles with modern touches for timeless elegance. Prioritize comfort without sacrificing style.",
-            'sixties': "Prioritize comfort and elegance with well-crafted pieces. Choose sophisticated styles that reflect your confidence.",
-            'young': "Experiment with trends while building a foundation of classics. Don't be afraid to try new styles.",
-            'middle aged': "Balance sophistication with comfort in your style choices. Choose pieces that reflect your experience and confidence.",
-            'senior': "Choose elegant, comfortable pieces that reflect your confidence. Focus on quality and timeless style.",
-            'professional': "Build a wardrobe of sophisticated, versatile pieces. Choose items that work for both office and casual settings.",
-            'student': "Mix affordable trends with practical, comfortable pieces. Focus on versatile items that work for various occasions.",
-            'parent': "Choose practical, comfortable pieces that still make you feel stylish. Look for easy-care fabrics and versatile styles.",
-            'grandparent': "Embrace elegant, comfortable styles that reflect your wisdom. Choose pieces that make you feel confident and beautiful."
-        }
-        return age_advice.get(age_group.lower(), "Choose pieces that reflect your personality and make you feel confident.")
+        return AGE_ADVICE.get(age_group.lower(), "Choose pieces that reflect your personality and make you feel confident.")
 
     def get_preference_advice(self, preference: str) -> str:
         """Get preference-based advice"""
-        preference_advice = {
-            'comfortable': "Prioritize comfort without sacrificing style. Look for stretch fabrics, relaxed fits, and breathable materials.",
-            'stylish': "Focus on well-fitted pieces and current trends that suit your personality. Don't be afraid to make bold choices.",
-            'elegant': "Choose sophisticated pieces with clean lines and quality fabrics. Focus on timeless styles and refined details.",
-            'casual': "Build a wardrobe of comfortable, versatile pieces for everyday wear. Choose items that are easy to mix and match.",
-            'sophisticated': "Invest in quality pieces with refined details and classic silhouettes. Focus on understated elegance.",
-            'trendy': "Stay current with fashion trends while maintaining your personal style. Mix trendy pieces with classic staples.",
-            'modest': "Choose pieces with appropriate coverage while staying stylish. Look for elegant, sophisticated styles.",
-            'bold': "Embrace vibrant colors and statement pieces that express your personality. Don't be afraid to stand out.",
-            'neutral': "Build a cohesive wardrobe with neutral tones and versatile pieces. Focus on mix-and-match potential.",
-            'loose': "Choose relaxed fits that provide comfort and a modern silhouette. Embrace the oversized trend thoughtfully.",
-            'fitted': "Opt for well-tailored pieces that flatter your figure. Focus on proper fit and structured silhouettes.",
-            'oversized': "Embrace the relaxed trend with intentionally oversized pieces. Balance with fitted items for proportion.",
-            'minimalist': "Focus on clean lines, quality fabrics, and essential pieces. Keep your wardrobe simple and versatile.",
-            'detailed': "Choose pieces with interesting details and textures. Look for unique elements that add personality.",
-            'simple': "Keep your style clean and uncomplicated with essential pieces. Focus on quality over quantity."
-        }
-        return preference_advice.get(preference.lower(), "Choose pieces that align with your personal style preferences.")
+        return PREFERENCE_ADVICE.get(preference.lower(), "Choose pieces that align with your personal style preferences.")
 
 class ActionSizeGuide(Action):
     def name(self) -> Text:
         return "action_size_guide"
 
+    @instrumented
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -856,6 +1142,7 @@ class ActionGeminiFallback(Action):
     def name(self) -> Text:
         return "action_gemini_fallback"
 
+    @instrumented
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -868,6 +1155,7 @@ class ActionGeminiFallback(Action):
             "Let me help you with fashion! You can ask me about clothing recommendations, trending items, or style advice."
         ]
         
+        action_fallbacks.inc(action=self.name(), reason='nlu')
         response = random.choice(fallback_responses)
         dispatcher.utter_message(text=response)
         
@@ -877,6 +1165,7 @@ class ActionDefaultFallback(Action):
     def name(self) -> Text:
         return "action_default_fallback"
 
+    @instrumented
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -889,6 +1178,7 @@ class ActionDefaultFallback(Action):
             "Let me help you with fashion! Ask me about clothes, style, or fashion trends."
         ]
         
+        action_fallbacks.inc(action=self.name(), reason='nlu')
         response = random.choice(fallback_responses)
         dispatcher.utter_message(text=response)
         
@@ -0,0 +1,138 @@
+"""
+Inverted attribute index over the fashion catalog.
+
+Every filterable column is indexed as lowercased value -> row bitmap, where
+a bitmap is a Python int with bit ``i`` set when catalog row ``i`` matches.
+Multi-slot filters become bitwise ANDs instead of repeated regex scans over
+the whole frame.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Text, Tuple
+
+from .lazy import lazy_module
+
+np = lazy_module('numpy', 'np', globals())
+pd = lazy_module('pandas', 'pd', globals())
+
+# Catalog columns the actions filter on
+FILTERABLE_COLUMNS = [
+    'category',
+    'gender',
+    'color',
+    'occasion',
+    'style_type',
+    'season',
+    'pattern',
+]
+
+
+def bitmap_from_mask(mask: np.ndarray) -> int:
+    """Convert a boolean row mask into a bitmap"""
+    packed = np.packbits(np.asarray(mask, dtype=bool), bitorder='little')
+    return int.from_bytes(packed.tobytes(), 'little')
+
+
+class AttributeIndex:
+    """Maps lowercased column values to bitmaps of the rows holding them"""
+
+    def __init__(self, frame: pd.DataFrame, columns: Iterable[Text] = FILTERABLE_COLUMNS):
+        self.size = len(frame)
+        self.all_rows = (1 << self.size) - 1
+        self._values = {}
+        self._matches = {}
+
+        for column in columns:
+            if column not in frame.columns:
+                continue
+            codes, uniques = pd.factorize(frame[column].astype(str).str.lower())
+            values = {}
+            for code, value in enumerate(uniques):
+                values[value] = bitmap_from_mask(codes == code)
+            self._values[column] = values
+
+    @classmethod
+    def from_packed(cls, size: int, packed: Dict[Text, Tuple[List[Text], np.ndarray]]) -> AttributeIndex:
+        """Rebuild an index from ``packed`` output, e.g. as stored in a compiled catalog"""
+        index = cls.__new__(cls)
+        index.size = size
+        index.all_rows = (1 << size) - 1
+        index._matches = {}
+        index._values = {column: {value: int.from_bytes(bitmap.tobytes(), 'little')
+                                  for value, bitmap in zip(values, bitmaps)}
+                         for column, (values, bitmaps) in packed.items()}
+        return index
+
+    def packed(self) -> Dict[Text, Tuple[List[Text], np.ndarray]]:
+        """Every column's values with their bitmaps as rows of a uint8 array, little-endian"""
+        width = (self.size + 7) // 8
+        packed = {}
+        for column, values in self._values.items():
+            bitmaps = np.zeros((len(values), width), dtype=np.uint8)
+            for position, rows in enumerate(values.values()):
+                bitmaps[position] = np.frombuffer(rows.to_bytes(width, 'little'), dtype=np.uint8)
+            packed[column] = (list(values), bitmaps)
+        return packed
+
+    def values(self, column: Text) -> List[Text]:
+        """Return the distinct lowercased values of a column"""
+        return list(self._values.get(column, {}))
+
+    def match(self, column: Text, text: Text) -> int:
+        """Rows whose column contains ``text``, ignoring case.
+
+        Equivalent to ``df[column].str.contains(text, case=False, na=False)``
+        for plain text, but only the column's distinct values are scanned and
+        the result is memoised per query.
+        """
+        key = (column, text.lower())
+        bitmap = self._matches.get(key)
+        if bitmap is None:
+            bitmap = 0
+            for value, rows in self._values.get(column, {}).items():
+                if key[1] in value:
+                    bitmap |= rows
+            self._matches[key] = bitmap
+        return bitmap
+
+    def exact(self, column: Text, values: Iterable[Text]) -> int:
+        """Rows whose lowercased column value is one of ``values``"""
+        column_values = self._values.get(column, {})
+        bitmap = 0
+        for value in values:
+            bitmap |= column_values.get(value, 0)
+        return bitmap
+
+    def match_any(self, column: Text, terms: Iterable[Text]) -> int:
+        """Rows whose column contains any of ``terms``"""
+        bitmap = 0
+        for term in terms:
+            bitmap |= self.match(column, term)
+        return bitmap
+
+    def select(self, filters: Dict[Text, Optional[Text]], rows: Optional[int] = None) -> int:
+        """Intersect the matches for every non-empty ``column: text`` filter"""
+        bitmap = self.all_rows if rows is None else rows
+        for column, text in filters.items():
+            if text:
+                bitmap &= self.match(column, text)
+                if not bitmap:
+                    break
+        return bitmap
+
+    def mask(self, bitmap: int) -> np.ndarray:
+        """Return ``bitmap`` as a boolean mask over catalog rows"""
+        raw = bitmap.to_bytes((self.size + 7) // 8, 'little')
+        bits = np.unpackbits(np.frombuffer(raw, dtype=np.uint8), bitorder='little')
+        return bits[:self.size].astype(bool)
+
+    def rows(self, bitmap: int) -> np.ndarray:
+        """Return the row positions set in ``bitmap``, in catalog order"""
+        if not bitmap:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.mask(bitmap))
+
+    def count(self, bitmap: int) -> int:
+        """Number of rows set in ``bitmap``"""
+        return bin(bitmap).count('1')
@@ -0,0 +1,380 @@
+"""
+Process-wide fashion catalog store.
+
+The custom actions used to parse the catalog CSV on every turn. This module
+loads it once per action-server process, hands every action the same frame
+and transparently reloads it when the file on disk changes. With
+``FASHION_SHARED_CATALOG_DIR`` set, it maps the generation published there
+instead, shared with the other action servers (see ``shared_catalog``).
+
+Print per-column memory use of the raw and the loaded frame with:
+
+    python -m actions.catalog memory-report
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Text, Tuple
+
+from .columnar_catalog import COMPILED_CATALOG_PATH, TEXT_COLUMNS, CompiledCatalog
+from .lazy import lazy_module
+from .metrics import registry
+from .shared_catalog import SHARED_CATALOG_DIR, GenerationCounter, SharedCatalog, generation_path
+
+pd = lazy_module('pandas', 'pd', globals())
+
+logger = logging.getLogger(__name__)
+
+CATALOG_PATH = os.getenv('FASHION_CATALOG_PATH', 'data/fashion_comprehensive_dataset_large.csv')
+
+# How often (in seconds) the file's mtime is checked for changes
+CATALOG_CHECK_INTERVAL = float(os.getenv('FASHION_CATALOG_CHECK_INTERVAL', '5'))
+
+catalog_load_seconds = registry.histogram(
+    'fashion_catalog_load_seconds', "Time to load the catalog, by source format", ('source',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+
+# Explicit column types so every load yields the same frame layout. Ratings
+# and prices need far less than float64 precision.
+CATALOG_DTYPES = {
+    'product_id': 'int32',
+    'price': 'float32',
+    'average_rating': 'float32',
+    'durability_rating': 'float32',
+    'comfort_rating': 'float32',
+    'versatility_rating': 'float32',
+    'ethical_rating': 'float32',
+}
+
+
+def encode_categoricals(frame: pd.DataFrame) -> pd.DataFrame:
+    """Store every string column as categorical codes.
+
+    Categories are sorted, which is also how the compiled format encodes
+    them, so codes mean the same thing whichever loader produced the frame.
+    """
+    for column in frame.columns:
+        if frame[column].dtype == object:
+            categories = sorted(frame[column].dropna().unique())
+            frame[column] = frame[column].astype(pd.CategoricalDtype(categories))
+    return frame
+
+
+def read_catalog_csv(path: Text) -> pd.DataFrame:
+    """Parse the catalog CSV without the free-text columns, in compact dtypes"""
+    frame = pd.read_csv(path, dtype=CATALOG_DTYPES, usecols=lambda column: column not in TEXT_COLUMNS)
+    return encode_categoricals(frame)
+
+
+class CsvTextColumns:
+    """Reads free-text columns from the catalog CSV on first access"""
+
+    def __init__(self, path: Text):
+        self.path = path
+        self._cache = {}
+
+    def text(self, name: Text) -> Optional[pd.Series]:
+        if name not in TEXT_COLUMNS:
+            return None
+        series = self._cache.get(name)
+        if series is None:
+            series = pd.read_csv(self.path, usecols=[name], dtype=object)[name]
+            self._cache[name] = series
+        return series
+
+    def prebuilt(self) -> Dict[Text, Any]:
+        return {}
+
+
+class StaleCatalogVersion(Exception):
+    """The catalog was reloaded past the version a structure was asked for"""
+
+
+class CatalogStore:
+    """Loads the catalog once and reloads it when the file's mtime changes.
+
+    The latest shared generation is mapped when ``shared_dir`` has one. Else
+    the compiled columnar file is opened when it is at least as new as the
+    CSV; otherwise the CSV is parsed. The frame returned by ``get`` is shared
+    by every action in the process and must be treated as read-only: filter
+    it, never modify it in place.
+    """
+
+    def __init__(self, path: Text = CATALOG_PATH, compiled_path: Optional[Text] = COMPILED_CATALOG_PATH,
+                 check_interval: float = CATALOG_CHECK_INTERVAL, shared_dir: Optional[Text] = SHARED_CATALOG_DIR):
+        self.path = path
+        self.compiled_path = compiled_path
+        self.check_interval = check_interval
+        self.shared_dir = shared_dir
+        self._generation_counter = GenerationCounter(shared_dir) if shared_dir else None
+        self._lock = threading.Lock()
+        # Reentrant so a builder can use other derived structures
+        self._build_lock = threading.RLock()
+        # Version the current thread is building derived structures for
+        self._building = threading.local()
+        self._current = (None, 0, None)
+        self._mtime = None
+        self._derived = {}
+        self._listeners = []
+        self._last_check = 0.0
+
+        # Metrics
+        self.source = None
+        self.generation = None
+        self.version = 0
+        self.row_count = 0
+        self.load_seconds = 0.0
+        self.last_reload = None
+        self.reload_count = 0
+        self.last_error = None
+
+    def get(self) -> Optional[pd.DataFrame]:
+        """Return the current catalog frame, or None if it cannot be loaded"""
+        return self.snapshot()[0]
+
+    def snapshot(self) -> Tuple[Optional[pd.DataFrame], int]:
+        """Return the current frame together with the version it was loaded as"""
+        if self._current[0] is None or self._stale():
+            self.refresh()
+        return self._current[:2]
+
+    def _stale(self) -> bool:
+        """Whether to look for a newer catalog: a new shared generation, or time to check the files"""
+        if self._generation_counter is not None and self.generation is not None:
+            return self._generation_counter.value != self.generation
+        return time.monotonic() - self._last_check >= self.check_interval
+
+    def derived(self, name: Text, builder: Callable[[pd.DataFrame], Any], version: Optional[int] = None) -> Any:
+        """Return ``builder(frame)``, built once per catalog version and cached.
+
+        Indexes and other structures computed from the catalog use this so
+        they are rebuilt exactly once after each reload. ``version``, as
+        returned by ``snapshot``, pins the structure to that catalog version;
+        once the catalog has been reloaded past it, ``StaleCatalogVersion`` is
+        raised. A builder's own ``derived`` and ``text`` calls are pinned to
+        the version it builds for. See ``resolve`` for several at once.
+        """
+        if version is None:
+            version = getattr(self._building, 'version', None)
+        if version is None:
+            frame, version = self.snapshot()
+            if frame is None:
+                return None
+        entry = self._derived.get(name)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        with self._build_lock:
+            entry = self._derived.get(name)
+            if entry is not None and entry[0] == version:
+                return entry[1]
+            frame, current = self._current[:2]
+            if current != version:
+                raise StaleCatalogVersion(version)
+            outer = getattr(self._building, 'version', None)
+            self._building.version = version
+            try:
+                structure = builder(frame)
+            finally:
+                self._building.version = outer
+            # A reload meanwhile has made it out of date for everyone else
+            if self._current[1] == version:
+                self._derived[name] = (version, structure)
+        return structure
+
+    def resolve(self, builders: Dict[Text, Callable[[pd.DataFrame], Any]]
+                ) -> Tuple[Optional[pd.DataFrame], int, Dict[Text, Any]]:
+        """Return the current frame, its version and the ``derived`` structure of each of ``builders``.
+
+        All of them belong to the same catalog version, so row positions in
+        one are valid in the others. If the catalog is reloaded while they
+        are resolved, they are resolved again against the new version.
+        """
+        while True:
+            frame, version = self.snapshot()
+            if frame is None:
+                return None, version, {}
+            try:
+                return frame, version, {name: self.derived(name, builder, version)
+                                        for name, builder in builders.items()}
+            except StaleCatalogVersion:
+                continue
+
+    def on_reload(self, listener: Callable[[int], None]) -> None:
+        """Call ``listener(version)`` after every successful (re)load"""
+        self._listeners.append(listener)
+
+    def text(self, name: Text) -> Optional[pd.Series]:
+        """Return a free-text column, decoding it from the compiled file if needed"""
+        frame, version, text_source = self._current
+        building = getattr(self._building, 'version', None)
+        if building is not None and building != version:
+            raise StaleCatalogVersion(building)
+        if frame is None:
+            self.get()
+            frame, _, text_source = self._current
+        if frame is not None and name in frame.columns:
+            return frame[name]
+        return text_source.text(name) if text_source is not None else None
+
+    def _select_source(self) -> Tuple[Text, float]:
+        """Pick the latest shared generation, else the compiled file if it is up to date, else the CSV"""
+        if self._generation_counter is not None:
+            generation = self._generation_counter.value
+            if generation:
+                path = generation_path(self.shared_dir, generation)
+                if os.path.exists(path):
+                    return path, generation
+            if self.generation is not None:
+                # Not published yet, or already pruned: keep the generation being served
+                return self._mtime
+            if self.source is None:
+                logger.warning(f"No catalog published in {self.shared_dir}; loading it in this process")
+        csv_mtime = None
+        try:
+            csv_mtime = os.stat(self.path).st_mtime
+        except OSError:
+            pass
+        if self.compiled_path:
+            try:
+                compiled_mtime = os.stat(self.compiled_path).st_mtime
+                if csv_mtime is None or compiled_mtime >= csv_mtime:
+                    return self.compiled_path, compiled_mtime
+                logger.warning(f"{self.compiled_path} is older than {self.path}; "
+                               f"parsing the CSV until it is recompiled")
+            except OSError:
+                pass
+        if csv_mtime is None:
+            raise FileNotFoundError(f"Catalog not found: {self.path}")
+        return self.path, csv_mtime
+
+    def refresh(self) -> bool:
+        """Reload the catalog if the file changed; return True if it was reloaded"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                source, mtime = self._select_source()
+            except OSError as e:
+                # Keep serving the last good copy if the file disappears
+                self.last_error = str(e)
+                return False
+
+            if self._current[0] is not None and (source, mtime) == self._mtime:
+                return False
+
+            start = time.perf_counter()
+            shared = self.shared_dir is not None and source == generation_path(self.shared_dir, mtime)
+            try:
+                if shared:
+                    text_source = SharedCatalog(source, mtime)
+                    frame = text_source.frame()
+                elif source == self.compiled_path:
+                    text_source = CompiledCatalog(source)
+                    frame = text_source.frame()
+                else:
+                    text_source = CsvTextColumns(source)
+                    frame = read_catalog_csv(source)
+                prebuilt = text_source.prebuilt()
+            except Exception as e:
+                self.last_error = str(e)
+                logger.error(f"Failed to load catalog from {source}: {e}")
+                return False
+
+            # Swap in the new frame in one assignment so readers never see a partial load
+            self.version += 1
+            for name, structure in prebuilt.items():
+                self._derived[name] = (self.version, structure)
+            self._current = (frame, self.version, text_source)
+            self._mtime = (source, mtime)
+            self.source = source
+            self.generation = mtime if shared else None
+            self.row_count = len(frame)
+            self.load_seconds = time.perf_counter() - start
+            catalog_load_seconds.observe(self.load_seconds, source='shared' if shared else
+                                         'compiled' if source == self.compiled_path else 'csv')
+            self.last_reload = datetime.now()
+            self.reload_count += 1
+            self.last_error = None
+
+            logger.info(f"Loaded catalog {source}: {self.row_count} rows "
+                        f"in {self.load_seconds * 1000:.1f} ms (version {self.version})")
+            for listener in self._listeners:
+                try:
+                    listener(self.version)
+                except Exception as e:
+                    logger.error(f"Catalog reload listener {listener!r} failed: {e}")
+            return True
+
+    def stats(self) -> Dict[Text, Any]:
+        """Return load metrics for monitoring"""
+        return {
+            'path': self.path,
+            'source': self.source,
+            'generation': self.generation,
+            'version': self.version,
+            'row_count': self.row_count,
+            'load_seconds': round(self.load_seconds, 4),
+            'last_reload': self.last_reload.isoformat() if self.last_reload else None,
+            'reload_count': self.reload_count,
+            'last_error': self.last_error,
+        }
+
+
+catalog_store = CatalogStore()
+registry.gauge_function('fashion_catalog_version', "Catalog version being served", lambda: catalog_store.version)
+registry.gauge_function('fashion_catalog_generation', "Shared catalog generation being served",
+                        lambda: catalog_store.generation)
+registry.gauge_function('fashion_catalog_rows', "Rows in the catalog being served", lambda: catalog_store.row_count)
+registry.counter_function('fashion_catalog_reloads_total', "Catalog loads and reloads",
+                          lambda: catalog_store.reload_count)
+
+
+def memory_report(store: CatalogStore) -> List[Tuple[Text, int, int, Text]]:
+    """Per-column bytes of the raw CSV frame against the frame the store keeps"""
+    raw = pd.read_csv(store.path).memory_usage(deep=True, index=False)
+    frame = store.get()
+    loaded = frame.memory_usage(deep=True, index=False) if frame is not None else pd.Series(dtype='int64')
+    rows = []
+    for column, before in raw.items():
+        if column in loaded.index:
+            rows.append((column, int(before), int(loaded[column]), str(frame[column].dtype)))
+        else:
+            rows.append((column, int(before), 0, 'lazy text'))
+    return rows
+
+
+def main(argv: Optional[List[Text]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Fashion catalog tools")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    report_parser = subparsers.add_parser('memory-report', help="print per-column memory before and after encoding")
+    report_parser.add_argument('--path', default=CATALOG_PATH, help="catalog CSV")
+    report_parser.add_argument('--compiled-path', default=COMPILED_CATALOG_PATH, help="compiled catalog file")
+    args = parser.parse_args(argv)
+
+    store = CatalogStore(args.path, compiled_path=args.compiled_path)
+    if store.get() is None:
+        print(f"❌ Catalog not found: {args.path}")
+        return 1
+
+    rows = memory_report(store)
+    print(f"📊 Catalog memory report ({store.row_count} rows, loaded from {store.source})")
+    print("=" * 78)
+    print(f"{'column':<30}{'before':>12}{'after':>12}  dtype")
+    for column, before, after, dtype in sorted(rows, key=lambda row: -row[1]):
+        print(f"{column:<30}{before / 1024:>10.1f}KB{after / 1024:>10.1f}KB  {dtype}")
+    print("=" * 78)
+    before_total = sum(row[1] for row in rows)
+    after_total = sum(row[2] for row in rows)
+    print(f"{'total':<30}{before_total / 1024:>10.1f}KB{after_total / 1024:>10.1f}KB"
+          f"  ({before_total / max(after_total, 1):.1f}x smaller)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+"""
+Columnar, memory-mappable catalog format.
+
+The catalog CSV is compiled once into a single binary file:
+
+    magic (8 bytes) | header length (uint64) | JSON header | column blocks
+
+Every block starts on a 64-byte boundary so it can be viewed straight out of
+the memory map. Numeric columns are stored as typed arrays, low-cardinality
+strings as dictionary codes with the vocabulary in the header, and the long
+free-text columns as UTF-8 blobs with an offsets array that is only decoded
+when the column is first requested. Attribute indexes can be stored along
+with the columns, one block of packed row bitmaps per indexed column.
+
+Compile the catalog with:
+
+    python -m actions.columnar_catalog
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+from .lazy import lazy_module
+
+np = lazy_module('numpy', 'np', globals())
+pd = lazy_module('pandas', 'pd', globals())
+
+MAGIC = b'FCAT\x00\x01\x00\x00'
+ALIGNMENT = 64
+
+COMPILED_CATALOG_PATH = os.getenv('FASHION_COMPILED_CATALOG_PATH', 'data/fashion_catalog.fcat')
+
+# Free-text columns the request path never reads; they stay out of the frame
+# and are decoded on first access only
+TEXT_COLUMNS = [
+    'care_instructions',
+    'outfit_suggestions',
+    'accessory_recommendations',
+    'sustainability_score',
+    'care_instructions_detailed',
+    'fit_guide',
+    'body_shape_recommendations',
+    'occasion_specific_advice',
+    'trend_analysis',
+    'price_perception',
+    'quality_indicators',
+    'care_complexity',
+    'styling_versatility',
+    'outfit_coordination',
+    'accessory_pairing',
+    'color_psychology',
+    'seasonal_adaptability',
+    'investment_potential',
+    'ethical_considerations',
+    'sustainability_metrics',
+]
+
+
+def _padding(size: int) -> int:
+    return -size % ALIGNMENT
+
+
+def _code_dtype(cardinality: int) -> np.dtype:
+    """Smallest signed integer type that can hold the codes (and -1 for missing)"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if cardinality < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def _encode_column(series: pd.Series, text_columns: List[Text]) -> Tuple[Dict[Text, Any], List[np.ndarray]]:
+    """Return the header entry and the arrays to write for one column"""
+    name = series.name
+    if name in text_columns:
+        nulls = series.isna().to_numpy()
+        encoded = [b'' if null else str(value).encode('utf-8') for value, null in zip(series, nulls)]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        blob = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return {'name': name, 'kind': 'text'}, [offsets, blob, nulls.astype(np.uint8)]
+
+    if pd.api.types.is_numeric_dtype(series):
+        return {'name': name, 'kind': 'numeric'}, [series.to_numpy()]
+
+    codes, categories = pd.factorize(series, sort=True)
+    entry = {'name': name, 'kind': 'category', 'categories': [str(value) for value in categories]}
+    return entry, [codes.astype(_code_dtype(len(categories)))]
+
+
+def compile_catalog(frame: pd.DataFrame, output: Text, text_columns: List[Text] = TEXT_COLUMNS,
+                    indexes: Optional[Dict[Text, Tuple[List[Text], np.ndarray]]] = None) -> Dict[Text, Any]:
+    """Write ``frame`` to ``output`` in the columnar format and return its header.
+
+    ``indexes`` maps column names to their distinct values and a 2-D uint8
+    array holding one packed row bitmap per value, as produced by
+    ``AttributeIndex.packed``.
+    """
+    blocks = []
+    offset = 0
+
+    def add_part(array: np.ndarray) -> Dict[Text, Any]:
+        nonlocal offset
+        array = np.ascontiguousarray(array)
+        part = {'offset': offset, 'nbytes': array.nbytes, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        blocks.append(array)
+        offset += array.nbytes + _padding(array.nbytes)
+        return part
+
+    columns = []
+    for name in frame.columns:
+        entry, arrays = _encode_column(frame[name], text_columns)
+        entry['parts'] = [add_part(array) for array in arrays]
+        columns.append(entry)
+
+    index_entries = {column: {'values': list(values), 'parts': [add_part(bitmaps)]}
+                     for column, (values, bitmaps) in (indexes or {}).items()}
+
+    header = json.dumps({'rows': len(frame), 'columns': columns, 'indexes': index_entries}).encode('utf-8')
+    header += b' ' * _padding(len(MAGIC) + 8 + len(header))
+
+    tmp_path = f"{output}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for array in blocks:
+            f.write(array.tobytes())
+            f.write(b'\0' * _padding(array.nbytes))
+    # Replace atomically so running action servers never map a half-written file
+    os.replace(tmp_path, output)
+    return json.loads(header)
+
+
+class CompiledCatalog:
+    """Read-only view of a compiled catalog file backed by a memory map"""
+
+    def __init__(self, path: Text):
+        self.path = path
+        self._buffer = np.memmap(path, dtype=np.uint8, mode='r')
+        if bytes(self._buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a compiled fashion catalog")
+        header_length = int(self._buffer[len(MAGIC):len(MAGIC) + 8].view(np.uint64)[0])
+        self._data_start = len(MAGIC) + 8 + header_length
+        header = json.loads(bytes(self._buffer[len(MAGIC) + 8:self._data_start]))
+        self.rows = header['rows']
+        self.columns = {entry['name']: entry for entry in header['columns']}
+        self.index_entries = header.get('indexes', {})
+        self._text_cache = {}
+
+    def _part(self, entry: Dict[Text, Any], position: int) -> np.ndarray:
+        part = entry['parts'][position]
+        start = self._data_start + part['offset']
+        array = self._buffer[start:start + part['nbytes']].view(np.dtype(part['dtype']))
+        return array.reshape(part['shape']) if 'shape' in part else array
+
+    @property
+    def text_columns(self) -> List[Text]:
+        return [name for name, entry in self.columns.items() if entry['kind'] == 'text']
+
+    def frame(self) -> pd.DataFrame:
+        """Build a frame of the numeric and dictionary-encoded columns.
+
+        The columns are read-only views into the memory map, not copies, so
+        processes mapping the same file share one copy of the data.
+        """
+        data = {}
+        for name, entry in self.columns.items():
+            if entry['kind'] == 'numeric':
+                data[name] = self._part(entry, 0)
+            elif entry['kind'] == 'category':
+                data[name] = pd.Categorical.from_codes(self._part(entry, 0), categories=entry['categories'])
+        # Without copy=False pandas consolidates the numeric columns into a new block
+        return pd.DataFrame(data, copy=False)
+
+    def indexes(self) -> Dict[Text, Tuple[List[Text], np.ndarray]]:
+        """Stored attribute indexes: column -> (values, packed row bitmaps), viewed from the map"""
+        return {column: (entry['values'], self._part(entry, 0)) for column, entry in self.index_entries.items()}
+
+    def prebuilt(self) -> Dict[Text, Any]:
+        """Derived structures this source provides ready-made, by ``CatalogStore.derived`` name"""
+        return {}
+
+    def text(self, name: Text) -> Optional[pd.Series]:
+        """Decode a free-text column on first use and cache it"""
+        series = self._text_cache.get(name)
+        if series is None:
+            entry = self.columns.get(name)
+            if entry is None or entry['kind'] != 'text':
+                return None
+            offsets, blob, nulls = (self._part(entry, i) for i in range(3))
+            raw = blob.tobytes()
+            values = [None if nulls[i] else raw[offsets[i]:offsets[i + 1]].decode('utf-8')
+                      for i in range(self.rows)]
+            series = pd.Series(values, name=name, dtype=object)
+            self._text_cache[name] = series
+        return series
+
+
+def main(argv: Optional[List[Text]] = None) -> int:
+    from .catalog import CATALOG_DTYPES, CATALOG_PATH
+
+    parser = argparse.ArgumentParser(description="Compile the fashion catalog CSV into the columnar format")
+    parser.add_argument('--source', default=CATALOG_PATH, help="catalog CSV to compile")
+    parser.add_argument('--output', default=COMPILED_CATALOG_PATH, help="compiled catalog file to write")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.source):
+        print(f"❌ Catalog not found: {args.source}")
+        return 1
+
+    start = time.perf_counter()
+    frame = pd.read_csv(args.source, dtype=CATALOG_DTYPES)
+    csv_ms = (time.perf_counter() - start) * 1000
+
+    header = compile_catalog(frame, args.output)
+
+    start = time.perf_counter()
+    CompiledCatalog(args.output).frame()
+    open_ms = (time.perf_counter() - start) * 1000
+
+    kinds = [entry['kind'] for entry in header['columns']]
+    print(f"✅ Compiled {args.source} -> {args.output}")
+    print(f"   Rows: {header['rows']} | numeric: {kinds.count('numeric')} | "
+          f"dictionary: {kinds.count('category')} | lazy text: {kinds.count('text')}")
+    print(f"   Size: {os.path.getsize(args.source) / 1024:.0f} KB CSV -> "
+          f"{os.path.getsize(args.output) / 1024:.0f} KB compiled")
+    print(f"   Cold load: {csv_ms:.1f} ms CSV parse -> {open_ms:.1f} ms compiled open")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Deferred imports of heavy libraries.
+
+``rasa run actions`` imports every module of this package before the server
+starts answering. With pandas and numpy imported at module level, that cost
+half a second of each cold start, before any action had even run. Modules
+bind those libraries through ``lazy_module`` instead: the library is
+imported the first time one of its attributes is used, typically when the
+catalog is first loaded.
+
+The placeholder then puts the real module in its place in the importing
+module's globals, so code keeps paying a plain global lookup afterwards.
+Modules using it start with ``from __future__ import annotations`` so type
+hints naming the library are not evaluated at import time.
+"""
+
+import importlib
+from types import ModuleType
+from typing import Any, Dict, Text
+
+
+class LazyModule:
+    """Stands in for a module until one of its attributes is first used"""
+
+    def __init__(self, name: Text, alias: Text, namespace: Dict[Text, Any]):
+        self._name = name
+        self._alias = alias
+        self._namespace = namespace
+
+    def _load(self) -> ModuleType:
+        module = importlib.import_module(self._name)
+        if self._namespace.get(self._alias) is self:
+            self._namespace[self._alias] = module
+        return module
+
+    def __getattr__(self, attribute: Text) -> Any:
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> Text:
+        return f"<lazy module {self._name!r}>"
+
+
+def lazy_module(name: Text, alias: Text, namespace: Dict[Text, Any]) -> LazyModule:
+    """Placeholder for ``import name as alias`` in the module whose ``globals()`` is ``namespace``"""
+    return LazyModule(name, alias, namespace)
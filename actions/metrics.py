@@ -0,0 +1,303 @@
+"""
+Prometheus-style metrics without extra dependencies.
+
+Counters and histograms are kept in a process-wide registry and rendered in
+the Prometheus text exposition format. Values that already live elsewhere
+(cache hit counts, queue depths...) are exported through callbacks read at
+scrape time instead of being copied on every change.
+
+The gateway serves the registry on ``GET /metrics``. The action server runs
+under ``rasa run actions``, whose web app has no room for extra routes, so
+``serve`` exposes it on a separate port (``FASHION_METRICS_PORT``), along
+with the JSON admin endpoints registered in ``admin_routes``.
+"""
+
+import hmac
+import json
+import logging
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Text, Tuple
+from urllib.parse import parse_qsl
+
+logger = logging.getLogger(__name__)
+
+# Port of the action server's metrics endpoint; 0 disables it
+METRICS_PORT = int(os.getenv('FASHION_METRICS_PORT', '5056'))
+
+# Interface it listens on. Its GET endpoints need no token, so only local
+# clients reach it unless this is set to e.g. 0.0.0.0
+METRICS_HOST = os.getenv('FASHION_METRICS_HOST', '127.0.0.1')
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Required as a bearer token to change settings through admin endpoints.
+# Without it, changes are only accepted from localhost.
+ADMIN_TOKEN = os.getenv('FASHION_ADMIN_TOKEN')
+
+# Seconds; from sub-millisecond index lookups up to Rasa's read timeout
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+
+def _format_value(value: float) -> Text:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[Text], values: Sequence[Any]) -> Text:
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+class Metric:
+    type = 'untyped'
+
+    def __init__(self, name: Text, documentation: Text, labels: Sequence[Text] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[Text, Any]) -> Tuple:
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"{self.name} takes labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def header(self) -> List[Text]:
+        return [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+
+    def samples(self) -> List[Text]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    """Monotonically increasing count"""
+    type = 'counter'
+
+    def __init__(self, name: Text, documentation: Text, labels: Sequence[Text] = ()):
+        super().__init__(name, documentation, labels)
+        self._values = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Text]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}'
+                for key, value in values]
+
+
+class Histogram(Metric):
+    """Distribution of observed values in cumulative buckets"""
+    type = 'histogram'
+
+    def __init__(self, name: Text, documentation: Text, labels: Sequence[Text] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Label values -> [per-bucket counts, sum, count]
+        self._values = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][position] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """Observe the seconds spent in the ``with`` block, even if it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Text]:
+        with self._lock:
+            values = sorted((key, (list(entry[0]), entry[1], entry[2])) for key, entry in self._values.items())
+        lines = []
+        bucket_labels = self.label_names + ('le',)
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_format_labels(bucket_labels, key + (_format_value(bound),))} '
+                             f'{cumulative}')
+            labels = _format_labels(self.label_names, key)
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class CallbackMetric(Metric):
+    """Gauge or counter whose value is read from ``function`` at scrape time.
+
+    ``function`` returns a number, or a dict of label-value tuples to numbers
+    for labelled metrics. None values are skipped.
+    """
+
+    def __init__(self, name: Text, documentation: Text, function: Callable[[], Any],
+                 labels: Sequence[Text] = (), type: Text = 'gauge'):
+        super().__init__(name, documentation, labels)
+        self.function = function
+        self.type = type
+
+    def samples(self) -> List[Text]:
+        try:
+            value = self.function()
+        except Exception as e:
+            logger.warning(f"Could not read metric {self.name}: {e}")
+            return []
+        values = value.items() if isinstance(value, dict) else [((), value)]
+        return [f'{self.name}{_format_labels(self.label_names, key)} {_format_value(number)}'
+                for key, number in sorted(values) if number is not None]
+
+
+class Registry:
+    """Named metrics of one process, rendered together"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Module reloads re-register the same metric; keep the one holding the data
+                if type(existing) is not type(metric) or existing.label_names != metric.label_names:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                if isinstance(metric, CallbackMetric):
+                    existing.function = metric.function
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: Text, documentation: Text, labels: Sequence[Text] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labels))
+
+    def histogram(self, name: Text, documentation: Text, labels: Sequence[Text] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labels, buckets))
+
+    def gauge_function(self, name: Text, documentation: Text, function: Callable[[], Any],
+                       labels: Sequence[Text] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, function, labels, 'gauge'))
+
+    def counter_function(self, name: Text, documentation: Text, function: Callable[[], Any],
+                         labels: Sequence[Text] = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, documentation, function, labels, 'counter'))
+
+    def render(self) -> Text:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+# Path -> handler(method, body) returning (status, JSON-serializable body); the body of a GET is its query parameters
+admin_routes = {}
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path, _, query = self.path.partition('?')
+        if path == '/metrics':
+            self.reply(200, CONTENT_TYPE, registry.render())
+        elif path in admin_routes:
+            self.admin(path, 'GET', dict(parse_qsl(query)))
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        path = self.path.split('?')[0]
+        if path not in admin_routes:
+            self.send_error(404)
+            return
+        if not self.authorized():
+            self.send_error(403)
+            return
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError:
+            body = None
+        if not isinstance(body, dict):
+            self.reply(400, 'application/json', json.dumps({'status': 'error', 'message': 'Expected a JSON object.'}))
+            return
+        self.admin(path, 'POST', body)
+
+    def authorized(self) -> bool:
+        if ADMIN_TOKEN:
+            return hmac.compare_digest(self.headers.get('Authorization', ''), f'Bearer {ADMIN_TOKEN}')
+        return self.client_address[0] in ('127.0.0.1', '::1')
+
+    def admin(self, path: Text, method: Text, body: Dict[Text, Any]) -> None:
+        status, payload = admin_routes[path](method, body)
+        self.reply(status, 'application/json', json.dumps(payload))
+
+    def reply(self, status: int, content_type: Text, text: Text) -> None:
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def serve(port: int = METRICS_PORT, host: Text = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Serve ``GET /metrics`` on a daemon thread; once per process.
+
+    Returns None when disabled (port 0) or when the port is taken, e.g. by
+    another action-server worker on the same host.
+    """
+    global _server
+    if _server is not None or not port:
+        return _server
+    try:
+        _server = ThreadingHTTPServer((host, port), MetricsHandler)
+    except OSError as e:
+        logger.warning(f"Metrics endpoint not started on port {port}: {e}")
+        return None
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"Serving action metrics on http://{host}:{port}/metrics")
+    return _server
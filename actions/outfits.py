@@ -0,0 +1,212 @@
+"""
+Outfit combination engine.
+
+At catalog load the top, bottom and shoe pools are grouped by *profile*,
+the (color palette, season, occasion) triple that decides whether two
+pieces go together. Compatibility is precomputed between profiles rather
+than items, so the tables stay a few hundred entries wide however large
+the catalog grows. Each profile keeps its items sorted best-first.
+
+A query scores profile pairs (top, bottom) with one matrix operation,
+bounds what a shoe could add to each pair, and only extends the pairs whose
+bound can still beat the best outfit found (branch and bound).
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional, Text, Tuple
+
+from .lazy import lazy_module
+from .ranking import Ranker
+
+np = lazy_module('numpy', 'np', globals())
+pd = lazy_module('pandas', 'pd', globals())
+
+# Catalog categories (lowercased) that make up each outfit piece
+OUTFIT_PIECES = {
+    'top': ('shirts', 'knits'),
+    'bottom': ('bottoms',),
+    'shoes': ('footwear',),
+}
+
+PROFILE_COLUMNS = ('color_palette_compatibility', 'season', 'occasion')
+
+# Palettes that sit well next to anything
+NEUTRAL_PALETTES = ('neutral', 'versatile')
+
+PALETTE_PAIRS = {
+    frozenset(['bold']): 0.4,
+    frozenset(['bold', 'professional']): 0.5,
+    frozenset(['summer', 'warm']): 0.8,
+    frozenset(['bold', 'summer']): 0.7,
+    frozenset(['bold', 'warm']): 0.7,
+}
+
+OCCASION_GROUPS = [
+    ('casual', 'travel', 'beach'),
+    ('formal', 'professional', 'evening'),
+    ('party', 'evening'),
+    ('athletic', 'casual'),
+]
+
+SEASONS = ('spring', 'summer', 'fall', 'winter')
+
+# Weight of pairwise compatibility against the pieces' own ranking scores
+COMPATIBILITY_WEIGHT = 1.0
+
+# Top/bottom pairs extended with shoes per step of the search
+SEARCH_BATCH = 64
+
+
+def palette_compatibility(a: Text, b: Text) -> float:
+    if a in NEUTRAL_PALETTES or b in NEUTRAL_PALETTES:
+        return 1.0
+    return PALETTE_PAIRS.get(frozenset([a, b]), 1.0 if a == b else 0.6)
+
+
+def season_compatibility(a: Text, b: Text) -> float:
+    """1 when the pieces share a season, 0 (never paired) otherwise"""
+    def seasons(value):
+        parts = set(value.split('/'))
+        return set(SEASONS) if 'all' in parts else parts
+    return 1.0 if seasons(a) & seasons(b) else 0.0
+
+
+def occasion_compatibility(a: Text, b: Text) -> float:
+    if a == b:
+        return 1.0
+    if any(a in group and b in group for group in OCCASION_GROUPS):
+        return 0.7
+    return 0.2
+
+
+FEATURE_COMPATIBILITY = {
+    'color_palette_compatibility': palette_compatibility,
+    'season': season_compatibility,
+    'occasion': occasion_compatibility,
+}
+
+
+class _Pool:
+    """Items of one outfit piece grouped by profile, best item first"""
+
+    def __init__(self, positions: np.ndarray, profiles: np.ndarray, scores: np.ndarray):
+        self.profile_ids = np.unique(profiles[positions])
+        local = np.searchsorted(self.profile_ids, profiles[positions])
+        order = np.lexsort((-scores[positions], local))
+        self.items = positions[order]
+        self.starts = np.searchsorted(local[order], np.arange(len(self.profile_ids) + 1))
+
+    def best(self, scores: np.ndarray, allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        """Best allowed item per profile and its score (-inf where none is allowed)"""
+        if allowed is None:
+            first = self.starts[:-1]
+            valid = first < self.starts[1:]
+        else:
+            candidates = np.flatnonzero(allowed[self.items])
+            at = np.searchsorted(candidates, self.starts[:-1])
+            first = candidates[np.minimum(at, len(candidates) - 1)] if len(candidates) else self.starts[:-1]
+            valid = (at < len(candidates)) & (first < self.starts[1:])
+        items = np.where(valid, self.items[np.minimum(first, len(self.items) - 1)], -1)
+        best_scores = np.where(valid, scores[np.maximum(items, 0)], -np.inf)
+        return items, best_scores
+
+
+class OutfitEngine:
+    """Finds the best-scoring compatible top/bottom/shoe combinations"""
+
+    def __init__(self, frame: pd.DataFrame, scores: Optional[np.ndarray] = None):
+        self.size = len(frame)
+        self.scores = Ranker(frame).scores if scores is None else np.asarray(scores, dtype='float64')
+
+        # Encode each row's profile as a single integer
+        feature_codes = []
+        feature_values = []
+        for column in PROFILE_COLUMNS:
+            codes, values = pd.factorize(frame[column].astype(str).str.lower())
+            feature_codes.append(codes)
+            feature_values.append(list(values))
+        shape = tuple(len(values) for values in feature_values)
+        profiles = np.ravel_multi_index(tuple(feature_codes), shape)
+
+        # Profile-by-profile compatibility, with incompatible pairs at -inf
+        tables = [np.array([[FEATURE_COMPATIBILITY[column](a, b) for b in values] for a in values])
+                  for column, values in zip(PROFILE_COLUMNS, feature_values)]
+        self._shape = shape
+        self._tables = tables
+
+        categories = frame['category'].astype(str).str.lower()
+        self.pools = {}
+        for piece, piece_categories in OUTFIT_PIECES.items():
+            positions = np.flatnonzero(categories.isin(piece_categories).to_numpy())
+            self.pools[piece] = _Pool(positions, profiles, self.scores)
+
+        self._compatibility = {
+            pair: self._profile_compatibility(self.pools[pair[0]].profile_ids, self.pools[pair[1]].profile_ids)
+            for pair in (('top', 'bottom'), ('top', 'shoes'), ('bottom', 'shoes'))
+        }
+
+    def _profile_compatibility(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        codes_a = np.unravel_index(a, self._shape)
+        codes_b = np.unravel_index(b, self._shape)
+        parts = [table[np.ix_(ca, cb)] for table, ca, cb in zip(self._tables, codes_a, codes_b)]
+        compatibility = sum(parts) / len(parts)
+        # A season mismatch rules the pair out entirely
+        compatibility[parts[PROFILE_COLUMNS.index('season')] == 0] = -np.inf
+        return COMPATIBILITY_WEIGHT * compatibility
+
+    def best_outfits(self, k: int = 2, allowed: Optional[np.ndarray] = None) -> List[Tuple[int, int, int]]:
+        """Return up to ``k`` (top, bottom, shoes) row position triples, best first.
+
+        ``allowed`` is an optional boolean mask over catalog rows that limits
+        the pieces used. No piece appears in more than one outfit.
+        """
+        allowed = np.ones(self.size, dtype=bool) if allowed is None else allowed.copy()
+        outfits = []
+        for _ in range(k):
+            outfit = self._search(allowed)
+            if outfit is None:
+                break
+            outfits.append(outfit)
+            allowed[list(outfit)] = False
+        return outfits
+
+    def _search(self, allowed: np.ndarray) -> Optional[Tuple[int, int, int]]:
+        top_items, top_scores = self.pools['top'].best(self.scores, allowed)
+        bottom_items, bottom_scores = self.pools['bottom'].best(self.scores, allowed)
+        shoe_items, shoe_scores = self.pools['shoes'].best(self.scores, allowed)
+        if not (np.isfinite(top_scores).any() and np.isfinite(bottom_scores).any()
+                and np.isfinite(shoe_scores).any()):
+            return None
+
+        top_shoes = self._compatibility[('top', 'shoes')]
+        bottom_shoes = self._compatibility[('bottom', 'shoes')]
+        pairs = (self._compatibility[('top', 'bottom')] + top_scores[:, None] + bottom_scores[None, :])
+
+        # Upper bound on what any shoe can add to each pair: the best shoe for
+        # the top plus the best possible match with the bottom
+        top_bound = (top_shoes + shoe_scores[None, :]).max(axis=1)
+        bottom_bound = np.where(np.isfinite(shoe_scores)[None, :], bottom_shoes, -np.inf).max(axis=1)
+        bounds = (pairs + top_bound[:, None] + bottom_bound[None, :]).ravel()
+        pairs = pairs.ravel()
+
+        def evaluate(chosen: np.ndarray) -> Tuple[float, Optional[Tuple[int, int, int]]]:
+            tops, bottoms = np.divmod(chosen, len(bottom_scores))
+            totals = pairs[chosen][:, None] + top_shoes[tops] + bottom_shoes[bottoms] + shoe_scores[None, :]
+            row, shoe = np.unravel_index(np.argmax(totals), totals.shape)
+            outfit = (int(top_items[tops[row]]), int(bottom_items[bottoms[row]]), int(shoe_items[shoe]))
+            return totals[row, shoe], outfit
+
+        # Start from the most promising pair, then only visit pairs whose bound
+        # can still beat the best outfit found, most promising first
+        best_score, best = evaluate(np.array([np.argmax(bounds)]))
+        candidates = np.flatnonzero(bounds > best_score)
+        candidates = candidates[np.argsort(-bounds[candidates], kind='stable')]
+        for start in range(0, len(candidates), SEARCH_BATCH):
+            chunk = candidates[start:start + SEARCH_BATCH]
+            if bounds[chunk[0]] <= best_score:
+                break
+            score, outfit = evaluate(chunk)
+            if score > best_score:
+                best_score, best = score, outfit
+        return best if np.isfinite(best_score) else None
@@ -0,0 +1,59 @@
+"""
+Single-pass phrase matching for the keyword tables actions route messages on.
+
+Every table maps phrases to the value they signal for one feature (dress
+type, category, body type, ...). ``PhraseMatcher`` compiles the phrases of
+all tables into one trie of words. A message is split into words once and
+walked through the trie once, so the cost grows with the length of the
+message, not with the number of phrases.
+
+Phrases match whole words, so ``tall`` is not found in ``install`` and
+``top`` not in ``laptop``; list plural forms as phrases of their own. When
+several values of a feature match, they are returned in table order, so
+the first entries of a table take precedence as an ``if``/``elif`` chain
+over it would.
+"""
+
+import re
+from typing import Dict, List, Text, Tuple
+
+WORD = re.compile(r'\w+')
+
+# Key of a trie node holding what the phrases ending there signal
+END = ''
+
+
+class PhraseMatcher:
+    """Finds the phrases of several keyword tables in a message in one pass"""
+
+    def __init__(self, tables: Dict[Text, Dict[Text, Text]]):
+        self.features = list(tables)
+        self._trie = {}
+        for feature, phrases in tables.items():
+            for rank, (phrase, value) in enumerate(phrases.items()):
+                node = self._trie
+                for word in WORD.findall(phrase.lower()):
+                    node = node.setdefault(word, {})
+                node.setdefault(END, []).append((feature, rank, value))
+
+    def scan(self, text: Text) -> Dict[Text, List[Text]]:
+        """Values of every phrase found in ``text``, by feature, in table order"""
+        words = WORD.findall(text.lower())
+        found: Dict[Text, List[Tuple[int, Text]]] = {}
+        for start, word in enumerate(words):
+            node = self._trie.get(word)
+            position = start
+            while node is not None:
+                for feature, rank, value in node.get(END, ()):
+                    found.setdefault(feature, []).append((rank, value))
+                position += 1
+                node = node.get(words[position]) if position < len(words) else None
+
+        features = {}
+        for feature, matches in found.items():
+            values = []
+            for _, value in sorted(matches):
+                if value not in values:
+                    values.append(value)
+            features[feature] = values
+        return features
@@ -0,0 +1,181 @@
+"""
+Pre-forked pool of action servers sharing one warm catalog.
+
+    python -m actions.prefork --workers 4 --port 5200
+
+publishes the catalog and its attribute indexes to a shared-memory
+directory (``--shared-dir``, see ``shared_catalog``), imports the actions
+once, which maps the catalog and builds the other indexes
+(``FASHION_WARMUP``, on by default here), and then forks one action server
+per worker on consecutive ports. Workers map the same published catalog,
+so it is held in memory once, and the parent publishes a new generation
+whenever the catalog file changes, which every worker switches to without
+restarting. A worker that exits is forked again from the same warm parent
+after a short backoff, so restarts skip the load as well.
+
+``start_chatbot.py --supervisor`` runs this behind its local balancer.
+Needs ``os.fork``, so POSIX only.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import tempfile
+import time
+from typing import Callable, List, Optional, Sequence, Text
+
+logger = logging.getLogger(__name__)
+
+# Delay before forking a replacement for a worker that exited, doubled per exit up to the maximum
+RESTART_DELAY = 0.5
+RESTART_MAX_DELAY = 30.0
+
+# Seconds a worker has to stay up before its earlier exits are forgotten
+STABLE_SECONDS = 30.0
+
+# Seconds between checks for exited workers
+POLL_INTERVAL = 0.5
+
+
+def default_shared_dir(port: int) -> Text:
+    root = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(root, f'fashion-catalog-{port}')
+
+
+def parse_cores(value: Text) -> List[int]:
+    return [int(core) for core in value.split(',') if core.strip()]
+
+
+def run_worker(index: int, port: int, metrics_port: int, cores: Sequence[int]) -> None:
+    """Body of a forked worker: serve the actions until stopped"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cores[index % len(cores)]})
+    if metrics_port:
+        from .metrics import serve
+        serve(metrics_port + index)
+
+    from rasa_sdk.endpoint import run
+    run('actions', port=port + index)
+
+
+class PreforkPool:
+    """Forks the action workers and replaces those that exit"""
+
+    def __init__(self, workers: int, port: int, metrics_port: int = 0, cores: Sequence[int] = (),
+                 on_idle: Optional[Callable[[], None]] = None):
+        self.workers = workers
+        self.port = port
+        self.metrics_port = metrics_port
+        self.cores = list(cores)
+        # Called between checks for exited workers
+        self.on_idle = on_idle
+        # Worker pid -> index
+        self.children = {}
+        self.started_at = {}
+        self.exits = [0] * workers
+        self.stopping = False
+
+    def spawn(self, index: int) -> None:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                run_worker(index, self.port, self.metrics_port, self.cores)
+                code = 0
+            except BaseException:
+                logger.exception(f"Action worker {index} failed")
+            finally:
+                os._exit(code)
+        self.children[pid] = index
+        self.started_at[index] = time.monotonic()
+        logger.info(f"Action worker {index} (pid {pid}) serving on port {self.port + index}")
+
+    def stop(self, signum=None, frame=None) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self) -> int:
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for index in range(self.workers):
+            self.spawn(index)
+
+        # Worker index -> when to fork its replacement
+        restarts = {}
+        while self.children or (restarts and not self.stopping):
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid == 0:
+                now = time.monotonic()
+                for index, due in list(restarts.items()):
+                    if now >= due and not self.stopping:
+                        del restarts[index]
+                        self.spawn(index)
+                if self.on_idle is not None and not self.stopping:
+                    self.on_idle()
+                time.sleep(POLL_INTERVAL)
+                continue
+            index = self.children.pop(pid, None)
+            if index is None or self.stopping:
+                continue
+            if time.monotonic() - self.started_at[index] >= STABLE_SECONDS:
+                self.exits[index] = 0
+            delay = min(RESTART_DELAY * 2 ** self.exits[index], RESTART_MAX_DELAY)
+            self.exits[index] += 1
+            restarts[index] = time.monotonic() + delay
+            logger.warning(f"Action worker {index} (pid {pid}) exited with status {status}; "
+                           f"forking a new one in {delay:.1f}s")
+        return 0
+
+
+def main(argv: Optional[List[Text]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve the custom actions from pre-forked workers")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--port', type=int, default=5055, help="port of the first worker; the others follow")
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help="metrics port of the first worker, the others follow; 0 disables them")
+    parser.add_argument('--cores', type=parse_cores, default=[],
+                        help="comma-separated CPU cores to pin the workers to, one each in turn")
+    parser.add_argument('--shared-dir', default=os.getenv('FASHION_SHARED_CATALOG_DIR'),
+                        help="where to publish the shared catalog (default: $FASHION_SHARED_CATALOG_DIR, "
+                             "else a directory under /dev/shm); an empty value turns sharing off")
+    args = parser.parse_args(argv)
+    if args.shared_dir is None:
+        args.shared_dir = default_shared_dir(args.port)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    # Read when the catalog and actions modules are imported, so set before importing the actions
+    os.environ['FASHION_SHARED_CATALOG_DIR'] = args.shared_dir
+    os.environ.setdefault('FASHION_WARMUP', '1')
+
+    publisher = None
+    if args.shared_dir:
+        from .catalog import CatalogStore
+        from .shared_catalog import CatalogPublisher
+        publisher = CatalogPublisher(CatalogStore(shared_dir=None), args.shared_dir)
+        if not publisher.refresh():
+            logger.warning("Catalog not published; every worker will load its own copy")
+
+    start = time.perf_counter()
+    # Loads the catalog when FASHION_WARMUP is on
+    from . import actions
+    logger.info(f"Actions loaded in {time.perf_counter() - start:.2f}s; forking {args.workers} workers")
+
+    on_idle = publisher.refresh if publisher is not None else None
+    return PreforkPool(args.workers, args.port, args.metrics_port, args.cores, on_idle).run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+"""
+Price range lookups over the catalog.
+
+Prices are sorted once per catalog version, next to the rows they belong
+to. The rows priced within a range are then one contiguous slice of that
+order, found by bisecting the sorted prices, and become a bitmap
+that intersects with the attribute index's (see ``attribute_index``).
+
+``parse_budget`` turns what users say about their budget ("under 200",
+"around $300", "nothing over 500", "mid-range") into such ranges.
+"""
+
+from __future__ import annotations
+
+import math
+import re
+from typing import NamedTuple, Optional, Text, Tuple
+
+from .attribute_index import bitmap_from_mask
+from .lazy import lazy_module
+from .response_cache import LRUCache
+
+np = lazy_module('numpy', 'np', globals())
+pd = lazy_module('pandas', 'pd', globals())
+
+
+class PriceRange(NamedTuple):
+    """Prices from ``low`` to ``high``, both included unless ``exclusive_low``"""
+    low: float
+    high: float
+    exclusive_low: bool = False
+
+
+# Ranges named by budget words, checked in order. Each band starts just above
+# the one before it ends, so a price on a boundary is in one band only.
+BUDGET_BANDS = [
+    (('budget-friendly', 'low', 'cheap', 'affordable', 'inexpensive'), PriceRange(0.0, 150.0)),
+    (('mid-range', 'medium', 'moderate'), PriceRange(150.0, 400.0, exclusive_low=True)),
+    (('premium',), PriceRange(400.0, 800.0, exclusive_low=True)),
+    (('luxury', 'high', 'expensive', 'designer'), PriceRange(800.0, math.inf, exclusive_low=True)),
+]
+
+# How far either side of an amount "around" reaches, as a fraction of it
+AROUND_TOLERANCE = 0.2
+
+# Bitmaps kept per price range
+PRICE_BITMAP_CACHE_SIZE = 256
+
+AMOUNT = r'\$?\s*\d+(?:,\d{3})*(?:\.\d+)?(?:\s*k\b)?(?:\s*(?:dollars|usd|bucks)\b)?'
+CURRENCY = re.compile(r'\$|dollars|usd|bucks')
+
+NEGATION = r'\b(?:not|nothing|no|never)\s+'
+NOT_OVER = re.compile(rf'{NEGATION}(?:over|above|more than|exceeding)\s+({AMOUNT})')
+NOT_UNDER = re.compile(rf'{NEGATION}(?:under|below|less than|cheaper than)\s+({AMOUNT})')
+BETWEEN = re.compile(rf'\b(?:between|from)\s+({AMOUNT})\s*(?:-|to|and)\s*({AMOUNT})')
+SPAN = re.compile(rf'({AMOUNT})\s*(?:-|to)\s*({AMOUNT})')
+UNDER = re.compile(rf'\b(?:under|below|less than|up to|at most|max(?:imum)?|cheaper than|within)\s+({AMOUNT})')
+OVER = re.compile(rf'\b(?:over|above|more than)\s+({AMOUNT})')
+AT_LEAST = re.compile(rf'\b(?:at least|min(?:imum)?|starting at)\s+({AMOUNT})')
+AROUND = re.compile(rf'(?:\b(?:around|about|approximately|roughly|near|close to)\s+|~\s*)({AMOUNT})')
+SINGLE = re.compile(rf'({AMOUNT})')
+BANDS = [(re.compile(r'\b(?:' + '|'.join(re.escape(word) for word in words) + r')\b'), band)
+         for words, band in BUDGET_BANDS]
+
+
+def amount(text: Text) -> float:
+    """The number in an ``AMOUNT`` match, e.g. 1500.0 for "$1.5k" """
+    text = text.lower()
+    number = float(re.search(r'\d+(?:,\d{3})*(?:\.\d+)?', text).group().replace(',', ''))
+    return number * 1000 if re.search(r'\d\s*k\b', text) else number
+
+
+def parse_budget(text: Optional[Text], loose: bool = True) -> Optional[PriceRange]:
+    """Price range ``text`` asks for, or None if it names none.
+
+    Explicit bounds ("under 200", "over $1k", "around 300", "between 100 and
+    250", "$100-250") are always understood, also when negated ("nothing
+    over 500" is "up to 500"). ``loose`` also accepts what only makes sense
+    as a budget, such as a budget slot's value: a bare amount ("200") as the
+    most to spend, a bare span ("100-250") and budget words ("low",
+    "mid-range", "luxury").
+    """
+    if not text:
+        return None
+    text = str(text).lower()
+    match = NOT_OVER.search(text)
+    if match:
+        return PriceRange(0.0, amount(match.group(1)))
+    match = NOT_UNDER.search(text)
+    if match:
+        return PriceRange(amount(match.group(1)), math.inf)
+    match = BETWEEN.search(text)
+    if match:
+        return PriceRange(*sorted((amount(match.group(1)), amount(match.group(2)))))
+    match = UNDER.search(text)
+    if match:
+        return PriceRange(0.0, amount(match.group(1)))
+    match = OVER.search(text)
+    if match:
+        return PriceRange(amount(match.group(1)), math.inf, exclusive_low=True)
+    match = AT_LEAST.search(text)
+    if match:
+        return PriceRange(amount(match.group(1)), math.inf)
+    match = AROUND.search(text)
+    if match:
+        middle = amount(match.group(1))
+        return PriceRange(middle * (1 - AROUND_TOLERANCE), middle * (1 + AROUND_TOLERANCE))
+    # Without a word saying so, only a currency sign tells an amount is a price
+    match = SPAN.search(text)
+    if match and (loose or CURRENCY.search(match.group())):
+        return PriceRange(*sorted((amount(match.group(1)), amount(match.group(2)))))
+    for match in SINGLE.finditer(text):
+        if loose or CURRENCY.search(match.group()):
+            return PriceRange(0.0, amount(match.group(1)))
+    if loose:
+        for pattern, band in BANDS:
+            if pattern.search(text):
+                return band
+    return None
+
+
+def describe_range(price_range: PriceRange) -> Text:
+    """``price_range`` for a reply, e.g. "$150-$400" or "over $800" """
+    low, high, exclusive_low = price_range
+    if math.isinf(high):
+        return f"over ${low:,.0f}" if exclusive_low else f"${low:,.0f} and up"
+    if low <= 0:
+        return f"up to ${high:,.0f}"
+    return f"${low:,.0f}-${high:,.0f}"
+
+
+class PriceIndex:
+    """Catalog rows in price order, answering price range queries by bisection"""
+
+    def __init__(self, frame: pd.DataFrame, column: Text = 'price'):
+        self.size = len(frame)
+        prices = pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=np.float64) \
+            if column in frame.columns else np.full(self.size, np.nan)
+        # Rows without a price are in no range
+        priced = np.flatnonzero(~np.isnan(prices))
+        order = np.argsort(prices[priced], kind='stable')
+        self.prices = prices[priced][order]
+        self.price_rows = priced[order]
+        self._bitmaps = LRUCache(maxsize=PRICE_BITMAP_CACHE_SIZE, ttl=0)
+
+    def span(self, low: float, high: float, exclusive_low: bool = False) -> Tuple[int, int]:
+        """Start and end positions in price order of the rows priced from ``low`` to ``high``,
+        both included unless ``exclusive_low``"""
+        return (int(np.searchsorted(self.prices, low, side='right' if exclusive_low else 'left')),
+                int(np.searchsorted(self.prices, high, side='right')))
+
+    def rows(self, low: float, high: float, exclusive_low: bool = False) -> np.ndarray:
+        """Rows priced from ``low`` to ``high``, cheapest first"""
+        start, end = self.span(low, high, exclusive_low)
+        return self.price_rows[start:end]
+
+    def count(self, low: float, high: float, exclusive_low: bool = False) -> int:
+        start, end = self.span(low, high, exclusive_low)
+        return max(end - start, 0)
+
+    def bitmap(self, low: float, high: float, exclusive_low: bool = False) -> int:
+        """Rows priced from ``low`` to ``high`` as a bitmap"""
+        key = (low, high, exclusive_low)
+        return self._bitmaps.get_or_compute(key, lambda: self._bitmap(*key))
+
+    def _bitmap(self, low: float, high: float, exclusive_low: bool = False) -> int:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.rows(low, high, exclusive_low)] = True
+        return bitmap_from_mask(mask)
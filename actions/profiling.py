@@ -0,0 +1,205 @@
+"""
+Opt-in sampling profiler for the custom actions.
+
+A chosen fraction of action runs (``FASHION_PROFILE_RATE``, e.g. ``0.01``)
+is profiled: while such a run is in progress, a background thread records
+the running thread's stack every ``FASHION_PROFILE_INTERVAL`` seconds.
+Runs that are not picked cost one random number. The sampler thread sleeps
+whenever no run is being profiled. Runs shorter than the interval may finish
+before their first sample; slow runs, the ones worth looking at, will not.
+
+Samples are aggregated per action and slot signature, and written as
+collapsed stacks (one ``frame;frame;frame count`` line per distinct stack)
+under ``FASHION_PROFILE_DIR``. Every stack starts with the action name
+and the slots, so files can be merged and still be told apart. They feed
+straight into ``flamegraph.pl``, speedscope or inferno.
+
+The rate can also be changed at runtime on the actions metrics port:
+
+    curl localhost:5056/profiling                            # current settings and counts
+    curl -X POST localhost:5056/profiling -d '{"rate": 0.05}'
+
+Changing it needs ``Authorization: Bearer $FASHION_ADMIN_TOKEN`` when that
+variable is set, and a request from localhost otherwise.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Text, Tuple
+
+from .metrics import admin_routes, registry
+from .response_cache import slot_key
+
+logger = logging.getLogger(__name__)
+
+# Fraction of action runs profiled; 0 turns profiling off
+PROFILE_RATE = float(os.getenv('FASHION_PROFILE_RATE', '0'))
+
+# Seconds between stack samples of a profiled run
+PROFILE_INTERVAL = float(os.getenv('FASHION_PROFILE_INTERVAL', '0.002'))
+
+PROFILE_DIR = os.getenv('FASHION_PROFILE_DIR', 'profiles')
+
+# Characters with a meaning in the collapsed format
+UNSAFE_FRAME_CHARACTERS = re.compile(r'[;\s]+')
+
+
+def slot_signature(slots: Dict[Text, Any]) -> Text:
+    """Filled slots as ``name=value,...`` in a stable order"""
+    return ','.join(f'{name}={value}' for name, value in slot_key(slots)) or 'no slots'
+
+
+def frame_name(frame) -> Text:
+    code = frame.f_code
+    return f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})'
+
+
+def collapse(frame) -> Text:
+    """One stack as ``root;...;leaf``"""
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SamplingProfiler:
+    """Samples the stacks of a random fraction of action runs"""
+
+    def __init__(self, rate: float = PROFILE_RATE, interval: float = PROFILE_INTERVAL,
+                 directory: Text = PROFILE_DIR):
+        self.rate = rate
+        self.interval = interval
+        self.directory = directory
+        # Thread id -> stack counts of the run being profiled on it
+        self._targets = {}
+        # (action, signature) -> aggregated stack counts
+        self._profiles = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler = None
+
+        # Metrics
+        self.profiled_runs = 0
+        self.samples = 0
+
+    @contextmanager
+    def maybe_profile(self, action: Text, slots: Dict[Text, Any]) -> Iterator[None]:
+        """Profile the ``with`` block if this run is picked"""
+        if self.rate <= 0 or random.random() >= self.rate:
+            yield
+            return
+
+        stacks = Counter()
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._targets[thread_id] = stacks
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_forever, name='profiler', daemon=True)
+                self._sampler.start()
+        self._wake.set()
+        try:
+            yield
+        finally:
+            with self._lock:
+                del self._targets[thread_id]
+            self._record(action, slot_signature(slots), stacks)
+
+    def _sample_forever(self) -> None:
+        while True:
+            self._wake.clear()
+            with self._lock:
+                targets = list(self._targets.items())
+            if not targets:
+                self._wake.wait()
+                continue
+            frames = sys._current_frames()
+            for thread_id, stacks in targets:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    stacks[collapse(frame)] += 1
+            del frames
+            time.sleep(self.interval)
+
+    def _record(self, action: Text, signature: Text, stacks: Counter) -> None:
+        key = (action, signature)
+        # Serialized so an older aggregate never overwrites a newer one
+        with self._write_lock:
+            with self._lock:
+                self.profiled_runs += 1
+                self.samples += sum(stacks.values())
+                profile = self._profiles.setdefault(key, Counter())
+                profile.update(stacks)
+                lines = sorted(profile.items())
+            if not lines:
+                # Finished before the first sample
+                return
+            try:
+                self._write(key, lines)
+            except OSError as e:
+                logger.warning(f"Could not write profile for {action}: {e}")
+
+    def path(self, action: Text, signature: Text) -> Text:
+        digest = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.directory, f'{action}.{digest}.collapsed')
+
+    def _write(self, key: Tuple[Text, Text], lines) -> None:
+        action, signature = key
+        root = f"{action};slots[{UNSAFE_FRAME_CHARACTERS.sub('_', signature)}]"
+        path = self.path(action, signature)
+        os.makedirs(self.directory, exist_ok=True)
+        # Replace the file in one step so readers never see half of it
+        with open(path + '.tmp', 'w') as f:
+            for stack, count in lines:
+                f.write(f'{root};{stack} {count}\n')
+        os.replace(path + '.tmp', path)
+
+    def configure(self, rate: Optional[float] = None, interval: Optional[float] = None) -> None:
+        if rate is not None:
+            if not 0 <= float(rate) <= 1:
+                raise ValueError("rate must be between 0 and 1")
+            self.rate = float(rate)
+        if interval is not None:
+            if float(interval) <= 0:
+                raise ValueError("interval must be positive")
+            self.interval = float(interval)
+        logger.info(f"Profiling {self.rate:.2%} of action runs every {self.interval * 1000:.1f} ms")
+
+    def stats(self) -> Dict[Text, Any]:
+        with self._lock:
+            profiles = [{'action': action, 'slots': signature, 'samples': sum(stacks.values()),
+                         'path': self.path(action, signature)}
+                        for (action, signature), stacks in sorted(self._profiles.items())]
+        return {
+            'rate': self.rate,
+            'interval': self.interval,
+            'directory': self.directory,
+            'profiled_runs': self.profiled_runs,
+            'samples': self.samples,
+            'profiles': profiles,
+        }
+
+    def admin(self, method: Text, body: Dict[Text, Any]) -> Tuple[int, Dict[Text, Any]]:
+        """``GET`` returns the settings and profiles; ``POST {"rate": ..., "interval": ...}`` changes them"""
+        if method == 'POST':
+            try:
+                self.configure(body.get('rate'), body.get('interval'))
+            except (TypeError, ValueError) as e:
+                return 400, {'status': 'error', 'message': str(e)}
+        return 200, self.stats()
+
+
+profiler = SamplingProfiler()
+admin_routes['/profiling'] = profiler.admin
+registry.counter_function('fashion_profiled_runs_total', "Action runs sampled by the profiler",
+                          lambda: profiler.profiled_runs)
+registry.gauge_function('fashion_profile_rate', "Fraction of action runs being profiled", lambda: profiler.rate)
@@ -0,0 +1,128 @@
+"""
+Scored top-k ranking of catalog items.
+
+Each item gets a score from a linear model over its numeric columns,
+computed once per catalog load. Picking the best ``k`` candidates uses a
+partial sort (``np.argpartition``) so cost stays linear in the candidate
+count, and an optional MMR re-rank keeps the picks from all sharing a
+category or color.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from typing import Dict, Iterable, Optional, Text
+
+from .lazy import lazy_module
+
+np = lazy_module('numpy', 'np', globals())
+pd = lazy_module('pandas', 'pd', globals())
+
+# trend_level is a label in the catalog; map it onto the same 0-1 scale as the
+# normalized numeric columns
+TREND_LEVEL_SCORES = {
+    'trendy': 1.0,
+    'seasonal': 0.75,
+    'classic': 0.5,
+    'timeless': 0.5,
+}
+
+DEFAULT_WEIGHTS = {
+    'average_rating': 0.4,
+    'durability_rating': 0.15,
+    'comfort_rating': 0.15,
+    'versatility_rating': 0.1,
+    'trend_level': 0.2,
+}
+
+TRENDING_WEIGHTS = {
+    'trend_level': 0.6,
+    'average_rating': 0.4,
+}
+
+# Weights can be overridden without a deploy, e.g.
+# FASHION_RANKING_WEIGHTS='{"average_rating": 0.7, "comfort_rating": 0.3}'
+RANKING_WEIGHTS = json.loads(os.getenv('FASHION_RANKING_WEIGHTS', 'null')) or DEFAULT_WEIGHTS
+
+DIVERSITY_COLUMNS = ('category', 'color')
+
+# Largest random offset added to scores for a seeded re-rank; enough to
+# reorder near-ties without lifting weak items over strong ones
+SEED_JITTER = 0.05
+
+
+def feature(frame: pd.DataFrame, column: Text) -> np.ndarray:
+    """A column scaled to 0-1, with missing values at the midpoint"""
+    if column == 'trend_level':
+        labels = frame[column].astype(str).str.lower()
+        return labels.map(TREND_LEVEL_SCORES).fillna(0.5).to_numpy(dtype='float64')
+
+    values = pd.to_numeric(frame[column], errors='coerce').astype('float64')
+    low, high = values.min(), values.max()
+    if pd.isna(low) or high == low:
+        return np.full(len(frame), 0.5)
+    return ((values - low) / (high - low)).fillna(0.5).to_numpy()
+
+
+class Ranker:
+    """Linear scoring model over catalog rows with top-k selection"""
+
+    def __init__(self, frame: pd.DataFrame, weights: Optional[Dict[Text, float]] = None,
+                 diversity_columns: Iterable[Text] = DIVERSITY_COLUMNS):
+        self.weights = dict(weights or RANKING_WEIGHTS)
+        self.size = len(frame)
+        self.scores = np.zeros(self.size)
+        for column, weight in self.weights.items():
+            if column in frame.columns:
+                self.scores += weight * feature(frame, column)
+        self._diversity_codes = [pd.factorize(frame[column])[0] for column in diversity_columns
+                                 if column in frame.columns]
+
+    def top_k(self, positions: Optional[Iterable[int]] = None, k: int = 3,
+              diversity: float = 0.0, seed: Optional[int] = None, pool_factor: int = 5) -> np.ndarray:
+        """Return the row positions of the best ``k`` candidates, best first.
+
+        ``positions`` limits the candidates (all rows when None). With
+        ``diversity`` > 0 the best ``k * pool_factor`` candidates are
+        re-ranked with maximal marginal relevance. A ``seed`` adds a small,
+        reproducible jitter so different seeds give different near-tie
+        orders while the same seed always gives the same result.
+        """
+        candidates = np.arange(self.size) if positions is None else np.asarray(positions, dtype=np.int64)
+        if len(candidates) == 0 or k <= 0:
+            return np.empty(0, dtype=np.int64)
+
+        scores = self.scores[candidates]
+        if seed is not None:
+            scores = scores + np.random.default_rng(seed).uniform(0, SEED_JITTER, len(scores))
+
+        pool = k * pool_factor if diversity > 0 else k
+        if len(candidates) > pool:
+            best = np.argpartition(-scores, pool - 1)[:pool]
+        else:
+            best = np.arange(len(candidates))
+        best = best[np.argsort(-scores[best], kind='stable')]
+
+        if diversity > 0:
+            return candidates[best[self._mmr(candidates[best], scores[best], k, diversity)]]
+        return candidates[best[:k]]
+
+    def _mmr(self, candidates: np.ndarray, scores: np.ndarray, k: int, diversity: float) -> np.ndarray:
+        """Greedy maximal-marginal-relevance selection; returns indexes into the pool"""
+        if not self._diversity_codes:
+            return np.arange(min(k, len(candidates)))
+
+        codes = np.stack([column_codes[candidates] for column_codes in self._diversity_codes])
+        selected = []
+        max_similarity = np.zeros(len(candidates))
+        available = np.ones(len(candidates), dtype=bool)
+        for _ in range(min(k, len(candidates))):
+            marginal = (1 - diversity) * scores - diversity * max_similarity
+            marginal[~available] = -np.inf
+            choice = int(np.argmax(marginal))
+            selected.append(choice)
+            available[choice] = False
+            similarity = (codes == codes[:, choice:choice + 1]).mean(axis=0)
+            np.maximum(max_similarity, similarity, out=max_similarity)
+        return np.array(selected, dtype=np.int64)
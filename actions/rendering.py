@@ -0,0 +1,129 @@
+"""
+Response rendering for catalog items.
+
+Scores and display fields are computed as whole-column operations once per
+catalog load (see ``build_card_table``). Rendering a reply then only looks
+up the chosen rows and formats them with a precompiled template.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Sequence, Text, Tuple
+
+from .lazy import lazy_module
+
+pd = lazy_module('pandas', 'pd', globals())
+
+DEFAULT_STYLING_TIP = 'Pair with complementary accessories for a complete look'
+
+RECOMMENDATION_CARD = (
+    "**{product_name}** (#{product_id}) - {category_title}\n"
+    "🎨 **Style:** {pattern} | **Color:** {color}\n"
+    "⭐ **Value Score:** {value_score:.1f}/5.0 | **Rating:** {rating:.1f}/5.0\n"
+    "💰 **Price:** ${price:.2f} | **Brand:** {brand}\n"
+    "🌍 **Perfect for:** {season} | **Occasion:** {occasion}\n"
+    "🧵 **Material:** {material} | **Fit:** {fit_type}\n"
+    "💡 **Styling Tip:** {styling_tips}\n\n"
+)
+
+TRENDING_CARD = (
+    "**{product_name}** - {category_title}\n"
+    "🎨 **Style:** {pattern} | **Color:** {color}\n"
+    "⭐ **Trend Score:** {trend_score:.1f}/5.0 | **Rating:** {rating:.1f}/5.0\n"
+    "💰 **Price:** ${price:.2f} | **Brand:** {brand}\n"
+    "🌍 **Perfect for:** {season} | **Occasion:** {occasion}\n"
+    "💡 **Styling Tip:** {styling_tips}\n\n"
+)
+
+OUTFIT_CARD = (
+    "**Outfit {number}** - Style Score: {outfit_score:.1f}/5.0 ⭐\n"
+    "👕 **Top:** {top[product_name]} ({top[color]})\n"
+    "   Brand: {top[brand]} | Price: ${top[price]:.2f}\n"
+    "👖 **Bottom:** {bottom[product_name]} ({bottom[color]})\n"
+    "   Brand: {bottom[brand]} | Price: ${bottom[price]:.2f}\n"
+    "👟 **Shoes:** {shoes[product_name]} ({shoes[color]})\n"
+    "   Brand: {shoes[brand]} | Price: ${shoes[price]:.2f}\n"
+    "💡 **Styling Tip:** {top[styling_tips]}\n\n"
+)
+
+DISPLAY_COLUMNS = ['product_name', 'pattern', 'color', 'brand', 'season', 'occasion', 'material']
+
+
+def _text_column(frame: pd.DataFrame, column: Text, default: Text = '') -> pd.Series:
+    if column not in frame.columns:
+        return pd.Series(default, index=frame.index)
+    return frame[column].astype(object).fillna(default).astype(str)
+
+
+def _numeric_column(frame: pd.DataFrame, column: Text, default: float) -> pd.Series:
+    if column not in frame.columns:
+        return pd.Series(default, index=frame.index, dtype='float64')
+    return pd.to_numeric(frame[column].astype(object), errors='coerce').fillna(default).astype('float64')
+
+
+def build_card_table(frame: pd.DataFrame) -> pd.DataFrame:
+    """Precompute scores and display strings for every catalog row"""
+    rating = _numeric_column(frame, 'average_rating', 4.0)
+    durability = _numeric_column(frame, 'durability_rating', 3.5)
+    comfort = _numeric_column(frame, 'comfort_rating', 4.0)
+    trend_level = _numeric_column(frame, 'trend_level', 3.5)
+
+    table = pd.DataFrame({column: _text_column(frame, column) for column in DISPLAY_COLUMNS}, index=frame.index)
+    # Users refer back to products by this id, e.g. "more like #2276"
+    table['product_id'] = frame['product_id'].astype('int64') if 'product_id' in frame.columns \
+        else pd.Series(range(len(frame)), index=frame.index)
+    table['category_title'] = _text_column(frame, 'category').str.title()
+    table['fit_type'] = _text_column(frame, 'fit_type', 'Regular')
+    table['styling_tips'] = _text_column(frame, 'styling_tips', DEFAULT_STYLING_TIP)
+    table['price'] = _numeric_column(frame, 'price', 0.0)
+    table['rating'] = rating
+    table['value_score'] = (rating + durability + comfort) / 3
+    table['trend_score'] = (trend_level + rating) / 2
+    return table
+
+
+class CardRenderer:
+    """Renders catalog rows into reply cards.
+
+    Built once per catalog version. Rows are resolved through plain column
+    lists, and each formatted card is memoised, so repeated items cost a
+    dict lookup.
+    """
+
+    def __init__(self, frame: pd.DataFrame):
+        self.table = build_card_table(frame)
+        self._columns = {column: self.table[column].tolist() for column in self.table.columns}
+        self._positions = None if isinstance(frame.index, pd.RangeIndex) and frame.index.start == 0 \
+            and frame.index.step == 1 else {label: i for i, label in enumerate(frame.index)}
+        self._cards = {}
+
+    def record(self, label) -> Dict[Text, Any]:
+        """Display fields and scores for one catalog row label"""
+        position = label if self._positions is None else self._positions[label]
+        return {column: values[position] for column, values in self._columns.items()}
+
+    def render(self, template: Text, labels: Iterable) -> Text:
+        """Format one card per catalog row label and join them"""
+        cards = []
+        for label in labels:
+            key = (template, label)
+            card = self._cards.get(key)
+            if card is None:
+                card = template.format_map(self.record(label))
+                self._cards[key] = card
+            cards.append(card)
+        return ''.join(cards)
+
+    def render_outfits(self, outfits: Sequence[Tuple]) -> Text:
+        """Format outfit cards for (top, bottom, shoes) row label triples"""
+        cards = []
+        for number, (top, bottom, shoes) in enumerate(outfits, start=1):
+            pieces = [self.record(top), self.record(bottom), self.record(shoes)]
+            cards.append(OUTFIT_CARD.format(
+                number=number,
+                outfit_score=sum(piece['rating'] for piece in pieces) / 3,
+                top=pieces[0],
+                bottom=pieces[1],
+                shoes=pieces[2],
+            ))
+        return ''.join(cards)
@@ -0,0 +1,112 @@
+"""
+LRU/TTL cache for per-turn computations in the actions.
+
+Most turns repeat a handful of slot combinations, so the expensive part of
+a reply (filtering and ranking candidates) is cached under a normalized
+slot key. Entries are dropped when the catalog reloads, when they are older
+than the TTL, or when the cache is full (least recently used first).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Text, Tuple
+
+RESPONSE_CACHE_SIZE = int(os.getenv('FASHION_RESPONSE_CACHE_SIZE', '1024'))
+
+# Seconds an entry stays valid; 0 keeps entries until evicted or invalidated
+RESPONSE_CACHE_TTL = float(os.getenv('FASHION_RESPONSE_CACHE_TTL', '600'))
+
+
+def slot_key(slots: Dict[Text, Any]) -> Tuple[Tuple[Text, Text], ...]:
+    """Normalize filled slots into a hashable key.
+
+    Empty slots are left out and values are lowercased with surrounding and
+    repeated whitespace removed, so "Party " and "party" share an entry.
+    """
+    return tuple(sorted(
+        (name, ' '.join(str(value).lower().split()))
+        for name, value in slots.items()
+        if value not in (None, '', [])
+    ))
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache whose entries expire after ``ttl``"""
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for ``key``, or ``default`` on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl > 0 and time.monotonic() >= entry[0]:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Return the cached value for ``key``, computing and storing it on a miss.
+
+        ``compute`` runs outside the lock; two threads missing on the same key
+        at once both compute it and the last one stored wins.
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self, *args: Any) -> None:
+        """Drop every entry. Accepts and ignores arguments so it can be used as a callback."""
+        with self._lock:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[Text, Any]:
+        """Return hit/miss/eviction counters for monitoring"""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
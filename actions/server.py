@@ -0,0 +1,52 @@
+"""
+One action server, warmed up, with its metrics endpoint.
+
+    python -m actions.server --port 5055
+
+Serves the custom actions like ``rasa run actions``, but first loads the
+catalog and builds its indexes (``FASHION_WARMUP``, on by default here) and
+serves ``/metrics`` and the admin endpoints on ``FASHION_METRICS_PORT``.
+Importing the actions package starts neither, so tools and tests that
+import it stay fast and bind no port.
+
+``start_chatbot.py`` runs this; ``python -m actions.prefork`` is the
+multi-worker counterpart.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import List, Optional, Text
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Optional[List[Text]] = None) -> int:
+    from .metrics import METRICS_PORT
+
+    parser = argparse.ArgumentParser(description="Serve the custom actions and their metrics")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help="0 disables the metrics endpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    # Read when the actions module is imported
+    os.environ.setdefault('FASHION_WARMUP', '1')
+
+    start = time.perf_counter()
+    # Registers the admin endpoints, and loads the catalog when FASHION_WARMUP is on
+    from . import actions  # noqa: F401
+    logger.info(f"Actions loaded in {time.perf_counter() - start:.2f}s")
+
+    from .metrics import serve
+    serve(args.metrics_port)
+
+    from rasa_sdk.endpoint import run
+    run('actions', port=args.port)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
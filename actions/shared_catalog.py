@@ -0,0 +1,191 @@
+"""
+Catalog shared between action-server processes through memory-mapped files.
+
+A publisher writes the catalog, with its attribute indexes, as a compiled
+catalog file per generation into ``FASHION_SHARED_CATALOG_DIR``:
+
+    generation              8-byte counter of the latest generation
+    catalog.<N>.fcat        generation N
+
+Point the directory at ``/dev/shm`` (the default of ``actions.prefork``) and
+the files live in shared memory. Every action server started with the same
+directory maps the latest generation read-only: columns and index bitmaps
+are views into the map, so the operating system keeps one copy however many
+workers there are.
+
+Publishing writes the new file in full and only then bumps the counter, so
+workers never map a partial generation. A worker compares the counter with
+the generation it serves on every catalog access and remaps when it moved,
+with no restart. The previous generation is kept for workers still opening
+it; older ones are unlinked, which is safe while mapped.
+
+Publish once, or keep republishing whenever the catalog file changes:
+
+    python -m actions.shared_catalog --dir /dev/shm/fashion-catalog [--watch]
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Any, Dict, List, Optional, Text
+
+from .attribute_index import AttributeIndex
+from .columnar_catalog import TEXT_COLUMNS, CompiledCatalog, compile_catalog
+from .lazy import lazy_module
+
+pd = lazy_module('pandas', 'pd', globals())
+
+logger = logging.getLogger(__name__)
+
+SHARED_CATALOG_DIR = os.getenv('FASHION_SHARED_CATALOG_DIR') or None
+
+COUNTER_FILE = 'generation'
+COUNTER_FORMAT = '<Q'
+
+# Generations kept on disk: the current one and the one before it
+KEEP_GENERATIONS = 2
+
+
+def generation_path(directory: Text, generation: int) -> Text:
+    return os.path.join(directory, f'catalog.{generation}.fcat')
+
+
+class GenerationCounter:
+    """The published generation number, read through a shared memory map"""
+
+    def __init__(self, directory: Text):
+        self.path = os.path.join(directory, COUNTER_FILE)
+        self._map = None
+
+    def _open(self) -> bool:
+        if self._map is None:
+            try:
+                with open(self.path, 'rb') as f:
+                    self._map = mmap.mmap(f.fileno(), struct.calcsize(COUNTER_FORMAT), access=mmap.ACCESS_READ)
+            except (OSError, ValueError):
+                return False
+        return True
+
+    @property
+    def value(self) -> int:
+        """Latest published generation; 0 before the first publish"""
+        if not self._open():
+            return 0
+        return struct.unpack_from(COUNTER_FORMAT, self._map)[0]
+
+    def set(self, generation: int) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            # One aligned 8-byte write, seen at once by every process mapping the file
+            os.pwrite(fd, struct.pack(COUNTER_FORMAT, generation), 0)
+        finally:
+            os.close(fd)
+
+
+class SharedCatalog(CompiledCatalog):
+    """One published generation; also provides the attribute index stored with it"""
+
+    def __init__(self, path: Text, generation: int):
+        super().__init__(path)
+        self.generation = generation
+
+    def prebuilt(self) -> Dict[Text, Any]:
+        if not self.index_entries:
+            return {}
+        return {'attribute_index': AttributeIndex.from_packed(self.rows, self.indexes())}
+
+
+class CatalogPublisher:
+    """Publishes the catalog of ``store`` as a new generation whenever it reloads"""
+
+    def __init__(self, store, directory: Text):
+        self.store = store
+        self.directory = directory
+        self.counter = GenerationCounter(directory)
+        self.published_version = None
+
+        # Metrics
+        self.generation = self.counter.value
+        self.publish_seconds = 0.0
+
+    def refresh(self) -> bool:
+        """Publish if the store loaded a new version since the last publish; True if it did"""
+        frame, version = self.store.snapshot()
+        if frame is None or version == self.published_version:
+            return False
+        self.publish(frame, version)
+        return True
+
+    def publish(self, frame: pd.DataFrame, version: int) -> Text:
+        start = time.perf_counter()
+        # The text columns stay out of the store's frame; workers decode them from the file on first use
+        text = {name: self.store.text(name) for name in TEXT_COLUMNS if name not in frame.columns}
+        full = frame.assign(**{name: series for name, series in text.items() if series is not None})
+        indexes = AttributeIndex(frame).packed()
+
+        generation = max(self.counter.value, self.generation) + 1
+        path = generation_path(self.directory, generation)
+        os.makedirs(self.directory, exist_ok=True)
+        compile_catalog(full, path, indexes=indexes)
+        self.counter.set(generation)
+
+        self.generation = generation
+        self.published_version = version
+        self.publish_seconds = time.perf_counter() - start
+        self._prune(generation)
+        logger.info(f"Published catalog generation {generation} to {path} "
+                    f"in {self.publish_seconds * 1000:.1f} ms")
+        return path
+
+    def _prune(self, generation: int) -> None:
+        for path in glob.glob(os.path.join(self.directory, 'catalog.*.fcat')):
+            try:
+                old = int(os.path.basename(path).split('.')[1])
+            except ValueError:
+                continue
+            if old <= generation - KEEP_GENERATIONS:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning(f"Could not remove old catalog generation {path}: {e}")
+
+
+def main(argv: Optional[List[Text]] = None) -> int:
+    from .catalog import CATALOG_PATH, COMPILED_CATALOG_PATH, CatalogStore
+
+    parser = argparse.ArgumentParser(description="Publish the fashion catalog for action servers to share")
+    parser.add_argument('--dir', default=SHARED_CATALOG_DIR, required=SHARED_CATALOG_DIR is None,
+                        help="shared catalog directory (default: $FASHION_SHARED_CATALOG_DIR)")
+    parser.add_argument('--path', default=CATALOG_PATH, help="catalog CSV")
+    parser.add_argument('--compiled-path', default=COMPILED_CATALOG_PATH, help="compiled catalog file")
+    parser.add_argument('--watch', action='store_true', help="keep publishing whenever the catalog changes")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(name)s %(levelname)s %(message)s')
+    store = CatalogStore(args.path, compiled_path=args.compiled_path, shared_dir=None)
+    publisher = CatalogPublisher(store, args.dir)
+    if not publisher.refresh():
+        print(f"❌ Catalog not found: {args.path}")
+        return 1
+    print(f"✅ Published generation {publisher.generation} to {args.dir}")
+
+    try:
+        while args.watch:
+            time.sleep(store.check_interval)
+            if publisher.refresh():
+                print(f"✅ Published generation {publisher.generation} to {args.dir}")
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+"""
+BM25 full-text search over the catalog's product names and styling text.
+
+The index is built once per catalog version. Each field's distinct texts
+are tokenized once, which matters because most styling text is shared
+between many products, and then spread over the rows holding them. Fields
+are weighted by repeating their terms (``SEARCH_FIELDS``), a simple form of
+BM25F.
+
+Postings are kept in flat numpy arrays rather than per-term Python lists.
+For each term the first row is stored as is and the following rows as gaps
+from the previous one. The gaps go in a uint8, uint16 or uint32 pool,
+whichever is the smallest that fits the term's largest gap, so frequent
+terms, whose gaps are small, take one or two bytes a posting. The BM25
+term-frequency part of each posting's score is computed at build time, so a
+query only decodes the postings of its terms with a cumulative sum and adds
+``idf * impact`` into a score array before a partial sort picks the top k.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Text, Tuple
+
+from .lazy import lazy_module
+from .vocabulary import singular
+
+np = lazy_module('numpy', 'np', globals())
+pd = lazy_module('pandas', 'pd', globals())
+
+# Searched columns and the weight of their terms
+SEARCH_FIELDS = {
+    'product_name': 3.0,
+    'category': 2.0,
+    'color': 1.0,
+    'material': 1.0,
+    'styling_tips': 1.0,
+    'outfit_suggestions': 1.0,
+    'occasion_specific_advice': 1.0,
+}
+
+# BM25 term-frequency saturation and document-length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+WORD = re.compile(r'\w+')
+
+STOP_WORDS = frozenset((
+    'a', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'for', 'from', 'have', 'i', 'in',
+    'is', 'it', 'me', 'my', 'need', 'of', 'on', 'or', 'show', 'some', 'something', 'that', 'the', 'to',
+    'want', 'what', 'with', 'you', 'your',
+))
+
+GAP_DTYPES = ('uint8', 'uint16', 'uint32')
+
+
+def tokenize(text: Text) -> List[Text]:
+    """Lowercased, singular words of ``text`` without stop words"""
+    return [singular(word) for word in WORD.findall(str(text).lower()) if word not in STOP_WORDS]
+
+
+class TextIndex:
+    """Inverted index over weighted text fields of the catalog, scored with BM25"""
+
+    def __init__(self, fields: Dict[Text, Tuple[pd.Series, float]]):
+        self.size = len(next(iter(fields.values()))[0]) if fields else 0
+        self._terms: Dict[Text, int] = {}
+        lengths = np.zeros(self.size, dtype=np.float64)
+        entries = []
+        for series, weight in fields.values():
+            rows, terms, frequencies = self._field_entries(series, weight, lengths)
+            entries.append((rows, terms, frequencies))
+        self._build(entries, lengths)
+
+    @classmethod
+    def from_catalog(cls, frame: pd.DataFrame, text: Callable[[Text], Optional[pd.Series]],
+                     weights: Dict[Text, float] = SEARCH_FIELDS) -> TextIndex:
+        """Index the ``weights`` columns of ``frame``, reading those it lacks through ``text``"""
+        fields = {}
+        for name, weight in weights.items():
+            series = frame[name] if name in frame.columns else text(name)
+            if series is not None:
+                fields[name] = (series, weight)
+        return cls(fields)
+
+    def _field_entries(self, series: pd.Series, weight: float, lengths: np.ndarray):
+        """(row, term, weighted frequency) triples of one field, adding its lengths to ``lengths``"""
+        codes, uniques = pd.factorize(series.fillna('').astype(str))
+        terms, frequencies, bounds = [], [], [0]
+        unique_lengths = np.zeros(len(uniques) + 1, dtype=np.float64)
+        for position, value in enumerate(uniques):
+            words = tokenize(value)
+            unique_lengths[position] = len(words) * weight
+            for word, count in Counter(words).items():
+                terms.append(self._terms.setdefault(word, len(self._terms)))
+                frequencies.append(count * weight)
+            bounds.append(len(terms))
+        bounds = np.asarray(bounds, dtype=np.int64)
+        # Rows without a value (code -1) hold no terms: point them at an empty range
+        codes = np.where(codes < 0, len(uniques), codes)
+        bounds = np.append(bounds, bounds[-1])
+        lengths += unique_lengths[codes]
+
+        per_row = bounds[codes + 1] - bounds[codes]
+        rows = np.repeat(np.arange(self.size, dtype=np.int64), per_row)
+        row_starts = np.cumsum(per_row) - per_row
+        positions = np.arange(len(rows), dtype=np.int64) - np.repeat(row_starts - bounds[codes], per_row)
+        return rows, np.asarray(terms, dtype=np.int64)[positions], np.asarray(frequencies, dtype=np.float64)[positions]
+
+    def _build(self, entries, lengths: np.ndarray) -> None:
+        rows = np.concatenate([entry[0] for entry in entries]) if entries else np.empty(0, dtype=np.int64)
+        terms = np.concatenate([entry[1] for entry in entries]) if entries else np.empty(0, dtype=np.int64)
+        frequencies = np.concatenate([entry[2] for entry in entries]) if entries else np.empty(0)
+
+        # One posting per (term, row), sorted by term then row, summing the fields' frequencies
+        keys = terms * max(self.size, 1) + rows
+        order = np.argsort(keys, kind='stable')
+        keys, frequencies = keys[order], frequencies[order]
+        unique_keys, starts = np.unique(keys, return_index=True)
+        frequencies = np.add.reduceat(frequencies, starts) if len(starts) else frequencies
+        posting_terms = unique_keys // max(self.size, 1)
+        posting_rows = unique_keys % max(self.size, 1)
+
+        term_count = len(self._terms)
+        self._counts = np.bincount(posting_terms, minlength=term_count).astype(np.int64)
+        self._starts = np.concatenate(([0], np.cumsum(self._counts)[:-1])).astype(np.int64)
+        self._idf = np.log1p((self.size - self._counts + 0.5) / (self._counts + 0.5)).astype(np.float32)
+
+        average_length = lengths.mean() if self.size and lengths.mean() > 0 else 1.0
+        norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+        self._impacts = (frequencies * (BM25_K1 + 1) / (frequencies + norms[posting_rows])).astype(np.float32)
+
+        # Gap-encode each term's rows into the smallest pool that fits its gaps
+        gaps = np.diff(posting_rows, prepend=0)
+        firsts = self._starts[self._counts > 0]
+        gaps[firsts] = 0
+        self._first = posting_rows[self._starts].astype(np.uint32) if len(posting_rows) else \
+            np.zeros(term_count, dtype=np.uint32)
+        largest = np.maximum.reduceat(gaps, self._starts) if len(gaps) else np.zeros(term_count, dtype=np.int64)
+        self._pool = np.select([largest < 2 ** 8, largest < 2 ** 16], [0, 1], 2).astype(np.uint8)
+        self._pool_starts = np.zeros(term_count, dtype=np.int64)
+        self._pools = []
+        posting_pool = self._pool[posting_terms]
+        not_first = np.ones(len(gaps), dtype=bool)
+        not_first[firsts] = False
+        for code, dtype in enumerate(GAP_DTYPES):
+            members = self._pool == code
+            stored = np.maximum(self._counts - 1, 0) * members
+            self._pool_starts[members] = (np.cumsum(stored) - stored)[members]
+            self._pools.append(gaps[(posting_pool == code) & not_first].astype(dtype))
+
+    def postings(self, term: Text) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows holding ``term`` (already tokenized), in order, with their BM25 impacts"""
+        term_id = self._terms.get(term)
+        if term_id is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        count = self._counts[term_id]
+        rows = np.empty(count, dtype=np.int64)
+        rows[0] = self._first[term_id]
+        if count > 1:
+            start = self._pool_starts[term_id]
+            gaps = self._pools[self._pool[term_id]][start:start + count - 1]
+            np.cumsum(gaps, dtype=np.int64, out=rows[1:])
+            rows[1:] += rows[0]
+        start = self._starts[term_id]
+        return rows, self._impacts[start:start + count]
+
+    def scores(self, query: Text) -> np.ndarray:
+        """BM25 score of every row for ``query``"""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            term_id = self._terms.get(term)
+            if term_id is None:
+                continue
+            rows, impacts = self.postings(term)
+            scores[rows] += self._idf[term_id] * impacts
+        return scores
+
+    def search(self, query: Text, k: int = 10, mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Best ``k`` rows for ``query`` with their scores, best first; only rows set in ``mask`` if given"""
+        scores = self.scores(query)
+        if mask is not None:
+            scores[~mask] = 0
+        matches = np.flatnonzero(scores > 0)
+        if len(matches) > k:
+            matches = matches[np.argpartition(-scores[matches], k - 1)[:k]]
+        # Best first; equal scores keep catalog order
+        matches = matches[np.lexsort((matches, -scores[matches]))]
+        return matches, scores[matches]
+
+    def terms(self, text: Text) -> List[Text]:
+        """The indexed terms of ``text``"""
+        return [term for term in tokenize(text) if term in self._terms]
+
+    def stats(self) -> Dict[Text, int]:
+        postings = int(self._counts.sum())
+        return {
+            'rows': self.size,
+            'terms': len(self._terms),
+            'postings': postings,
+            'posting_bytes': sum(pool.nbytes for pool in self._pools) + self._first.nbytes,
+            'impact_bytes': self._impacts.nbytes,
+        }
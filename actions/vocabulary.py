@@ -0,0 +1,248 @@
+"""
+Resolves slot text to the catalog's own values.
+
+Slots speak the domain's vocabulary (``tops``, ``women``, ``work``) while the
+catalog has its own (``Shirts``, ``Female``, ``Professional``), so matching
+one as a substring of the other misses often. When the catalog loads, the
+resolver compiles one lookup table per filterable column from:
+
+- the column's distinct values, and the parts of compound ones
+  (``Spring/Summer`` answers to ``spring`` and ``summer``),
+- the synonym groups in ``data/synonyms.yml``: every word of a group
+  resolves to the catalog values any word of the group names,
+- ``SLOT_VALUE_ALIASES`` for domain slot values with no counterpart in
+  either, e.g. ``work`` -> ``Professional``.
+
+Terms are lowercased and reduced to a crude singular, so ``dresses`` and
+``Dress`` meet. Text that is not in the table is tried word by word, then
+against a character-trigram index of the table's terms, scored with
+fuzzywuzzy when it is installed and difflib otherwise, so typos like
+``blak`` still resolve. Filters then select exact values from the
+attribute index instead of scanning every value for a substring.
+"""
+
+from __future__ import annotations
+
+import difflib
+import logging
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Text, Tuple
+
+from .attribute_index import FILTERABLE_COLUMNS, AttributeIndex
+from .lazy import lazy_module
+from .metrics import registry
+from .response_cache import LRUCache
+
+pd = lazy_module('pandas', 'pd', globals())
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_PATH = os.getenv('FASHION_DOMAIN_PATH', 'domain.yml')
+SYNONYMS_PATH = os.getenv('FASHION_SYNONYMS_PATH', 'data/synonyms.yml')
+
+# Lowest fuzzy score (0-100) accepted as a match
+FUZZY_MIN_SCORE = int(os.getenv('FASHION_FUZZY_MIN_SCORE', '80'))
+
+# Terms sharing the most trigrams with the text that get a full fuzzy score
+FUZZY_CANDIDATES = 8
+
+# Resolved texts remembered per resolver
+RESOLUTION_CACHE_SIZE = 4096
+
+# Slots whose values filter a catalog column
+SLOT_COLUMNS = {
+    'clothing_category': 'category',
+    'gender': 'gender',
+    'color': 'color',
+    'occasion': 'occasion',
+    'style_preference': 'style_type',
+    'season': 'season',
+}
+
+# Domain slot values that neither the catalog nor the synonyms connect to a catalog value
+SLOT_VALUE_ALIASES = {
+    'occasion': {
+        'work': ['professional'],
+        'office': ['professional'],
+        'business': ['professional'],
+        'sport': ['athletic'],
+        'gym': ['athletic'],
+    },
+}
+
+COMPOUND_SEPARATORS = re.compile(r'\s*(?:/|,|&|\band\b)\s*')
+NON_WORD = re.compile(r"[^\w\s/&,-]+")
+
+try:
+    from fuzzywuzzy import fuzz
+
+    def similarity(a: Text, b: Text) -> int:
+        return fuzz.ratio(a, b)
+except ImportError:
+    def similarity(a: Text, b: Text) -> int:
+        return round(difflib.SequenceMatcher(None, a, b).ratio() * 100)
+
+resolutions = registry.counter(
+    'fashion_vocabulary_resolutions_total', "Slot texts resolved to catalog values, by how",
+    ('column', 'outcome'))
+
+
+def normalize(text: Text) -> Text:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(NON_WORD.sub(' ', str(text).lower()).split())
+
+
+def singular(word: Text) -> Text:
+    """Crude English singular, applied alike to slot text and catalog values"""
+    if len(word) > 4 and word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith('sses'):
+        return word[:-2]
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'us')):
+        return word[:-1]
+    return word
+
+
+def term(text: Text) -> Text:
+    return ' '.join(singular(word) for word in normalize(text).split())
+
+
+def trigrams(text: Text) -> Set[Text]:
+    padded = f'  {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def load_yaml(path: Text):
+    try:
+        import yaml
+    except ImportError:
+        logger.warning(f"PyYAML is not installed; {path} is not used to resolve slot values")
+        return None
+    try:
+        with open(path) as f:
+            return yaml.safe_load(f)
+    except (OSError, yaml.YAMLError) as e:
+        logger.warning(f"Could not read {path}: {e}")
+        return None
+
+
+def load_synonyms(path: Text = SYNONYMS_PATH) -> List[List[Text]]:
+    """Synonym groups of ``data/synonyms.yml``, each the canonical value followed by its examples"""
+    data = load_yaml(path) or {}
+    groups = []
+    for entry in data.get('synonyms') or []:
+        examples = [line.strip()[1:].strip() for line in str(entry.get('examples', '')).splitlines()
+                    if line.strip().startswith('-')]
+        groups.append([str(entry.get('synonym', ''))] + examples)
+    return groups
+
+
+def load_slot_values(path: Text = DOMAIN_PATH) -> Dict[Text, List[Text]]:
+    """Values of the categorical slots in ``domain.yml``, by catalog column"""
+    data = load_yaml(path) or {}
+    values = {}
+    for slot, column in SLOT_COLUMNS.items():
+        definition = (data.get('slots') or {}).get(slot) or {}
+        values[column] = [str(value) for value in definition.get('values') or []]
+    return values
+
+
+class VocabularyResolver:
+    """Maps slot text to the lowercased catalog values of a column"""
+
+    def __init__(self, frame: pd.DataFrame, columns: Iterable[Text] = FILTERABLE_COLUMNS,
+                 synonyms: Optional[List[List[Text]]] = None, slot_values: Optional[Dict[Text, List[Text]]] = None,
+                 aliases: Dict[Text, Dict[Text, List[Text]]] = SLOT_VALUE_ALIASES):
+        synonyms = load_synonyms() if synonyms is None else synonyms
+        slot_values = load_slot_values() if slot_values is None else slot_values
+        # Column -> term -> catalog values
+        self._tables = {}
+        # Column -> trigram -> terms
+        self._trigrams = {}
+        self._cache = LRUCache(maxsize=RESOLUTION_CACHE_SIZE, ttl=0)
+
+        for column in columns:
+            if column not in frame.columns:
+                continue
+            table = defaultdict(set)
+            for value in pd.unique(frame[column].astype(str).str.lower()):
+                if value == 'nan':
+                    continue
+                table[term(value)].add(value)
+                for part in COMPOUND_SEPARATORS.split(value):
+                    if part:
+                        table[term(part)].add(value)
+
+            for group in synonyms:
+                values = set().union(*(table.get(term(word), ()) for word in group))
+                for word in group if values else ():
+                    table[term(word)] |= values
+
+            for word, targets in aliases.get(column, {}).items():
+                values = set().union(*(table.get(term(target), ()) for target in targets))
+                if values:
+                    table[term(word)] |= values
+
+            self._tables[column] = {key: frozenset(values) for key, values in table.items()}
+            index = defaultdict(set)
+            for key in self._tables[column]:
+                for gram in trigrams(key):
+                    index[gram].add(key)
+            self._trigrams[column] = dict(index)
+
+        unresolved = [f'{column}={value}' for column, values in slot_values.items() for value in values
+                      if column in self._tables and self.resolve(column, value) is None]
+        if unresolved:
+            logger.warning(f"Slot values with no catalog counterpart: {', '.join(unresolved)}")
+
+    def resolve(self, column: Text, text: Text) -> Optional[FrozenSet[Text]]:
+        """Catalog values ``text`` stands for in ``column``, or None if nothing fits"""
+        table = self._tables.get(column)
+        if table is None or not text:
+            return None
+        key = (column, term(text))
+        cached = self._cache.get(key, key)
+        if cached is not key:
+            return cached
+        values, outcome = self._resolve(column, key[1])
+        resolutions.inc(column=column, outcome=outcome)
+        self._cache.put(key, values)
+        return values
+
+    def _resolve(self, column: Text, text: Text) -> Tuple[Optional[FrozenSet[Text]], Text]:
+        table = self._tables[column]
+        values = table.get(text)
+        if values is not None:
+            return values, 'exact'
+
+        words = [table[word] for word in text.split() if word in table]
+        if words:
+            return frozenset().union(*words), 'word'
+
+        shared = Counter(key for gram in trigrams(text) for key in self._trigrams[column].get(gram, ()))
+        scored = [(similarity(text, key), key) for key, _ in shared.most_common(FUZZY_CANDIDATES)]
+        if scored:
+            score, key = max(scored)
+            if score >= FUZZY_MIN_SCORE:
+                return table[key], 'fuzzy'
+        return None, 'unresolved'
+
+    def select(self, index: AttributeIndex, filters: Dict[Text, Optional[Text]], rows: Optional[int] = None) -> int:
+        """Like ``AttributeIndex.select``, but on the catalog values each filter resolves to.
+
+        Text that resolves to nothing keeps the substring match.
+        """
+        bitmap = index.all_rows if rows is None else rows
+        for column, text in filters.items():
+            if not text:
+                continue
+            values = self.resolve(column, text)
+            bitmap &= index.match(column, text) if values is None else index.exact(column, values)
+            if not bitmap:
+                break
+        return bitmap
+
+    def terms(self, column: Text) -> List[Text]:
+        return sorted(self._tables.get(column, {}))
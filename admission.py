@@ -0,0 +1,250 @@
+"""
+Admission control for the gateway.
+
+Two checks stand between a chat message and Rasa:
+
+- a token bucket per sender, so one client cannot flood the bot
+  (``429 Too Many Requests``), and
+- a cap on Rasa calls in flight across the process, with a short, bounded
+  queue in front of it. When the queue is full, or a message waits in it
+  too long, the gateway answers ``503 Service Unavailable`` straight away
+  instead of piling more work onto a slow Rasa.
+
+Both rejections carry a ``Retry-After`` header. Thread (Flask) and asyncio
+(ASGI) callers share the same slots and queue.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional, Text, Tuple
+
+# Sustained messages per second per sender, and how many may arrive at once
+CHAT_RATE_LIMIT = float(os.getenv('CHAT_RATE_LIMIT', '2'))
+CHAT_RATE_BURST = int(os.getenv('CHAT_RATE_BURST', '10'))
+
+# Rasa calls in flight, messages allowed to wait for one, and for how long
+CHAT_MAX_IN_FLIGHT = int(os.getenv('CHAT_MAX_IN_FLIGHT', '64'))
+CHAT_MAX_QUEUE = int(os.getenv('CHAT_MAX_QUEUE', '128'))
+CHAT_QUEUE_TIMEOUT = float(os.getenv('CHAT_QUEUE_TIMEOUT', '2'))
+
+# Senders whose buckets are kept; the least recently seen are forgotten first
+MAX_TRACKED_SENDERS = 100000
+
+# Weight of the newest call in the moving average of Rasa call time
+SERVICE_TIME_SMOOTHING = 0.1
+
+
+class RateLimiter:
+    """Token bucket per sender"""
+
+    def __init__(self, rate: float = CHAT_RATE_LIMIT, burst: int = CHAT_RATE_BURST,
+                 max_senders: int = MAX_TRACKED_SENDERS):
+        self.rate = rate
+        self.burst = burst
+        self.max_senders = max_senders
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def allow(self, sender: Text) -> Tuple[bool, float]:
+        """Take a token for ``sender``; returns (allowed, seconds until the next token)"""
+        allowed, wait = self._take(sender)
+        if not allowed:
+            self.rejected += 1
+        return allowed, wait
+
+    def wait(self, sender: Text, timeout: float) -> Tuple[bool, float]:
+        """Like ``allow``, but waits up to ``timeout`` seconds for the sender's next token"""
+        deadline = time.monotonic() + timeout
+        while True:
+            allowed, wait = self._take(sender)
+            if allowed:
+                return True, 0.0
+            if time.monotonic() + wait > deadline:
+                self.rejected += 1
+                return False, wait
+            time.sleep(wait)
+
+    def _take(self, sender: Text) -> Tuple[bool, float]:
+        if not self.enabled:
+            return True, 0.0
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(sender, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[sender] = (tokens, now)
+            if len(self._buckets) > self.max_senders:
+                self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (1 - tokens) / self.rate
+
+    def stats(self) -> Dict[Text, Any]:
+        return {
+            'rate': self.rate,
+            'burst': self.burst,
+            'tracked_senders': len(self._buckets),
+            'rejected': self.rejected,
+        }
+
+
+class _ThreadWaiter:
+    def __init__(self):
+        self.granted = False
+        self._event = threading.Event()
+
+    def grant(self):
+        self.granted = True
+        self._event.set()
+
+    def wait(self, timeout: Optional[float]):
+        self._event.wait(timeout)
+
+
+class _AsyncWaiter:
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.granted = False
+        self._loop = loop
+        self.future = loop.create_future()
+
+    def grant(self):
+        self.granted = True
+        self._loop.call_soon_threadsafe(self._wake)
+
+    def _wake(self):
+        if not self.future.done():
+            self.future.set_result(None)
+
+
+class ConcurrencyLimiter:
+    """Caps calls in flight; a bounded FIFO queue waits for free slots.
+
+    A released slot is handed directly to the oldest waiter, so a burst of
+    new arrivals cannot overtake messages that are already queued.
+    """
+
+    def __init__(self, max_in_flight: int = CHAT_MAX_IN_FLIGHT, max_queue: int = CHAT_MAX_QUEUE,
+                 queue_timeout: float = CHAT_QUEUE_TIMEOUT):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._waiters = deque()
+
+        # Metrics
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.peak_queued = 0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+        self.wait_seconds = 0.0
+        self.service_seconds = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _enter(self, waiter_factory, bounded: bool):
+        """Take a free slot, or enqueue a waiter. Returns True, False (queue full) or the waiter."""
+        with self._lock:
+            if self.in_flight < self.max_in_flight and not self._waiters:
+                self.in_flight += 1
+                self.admitted += 1
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+                return True
+            if bounded and len(self._waiters) >= self.max_queue:
+                self.rejected_queue_full += 1
+                return False
+            waiter = waiter_factory()
+            self._waiters.append(waiter)
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, len(self._waiters))
+            return waiter
+
+    def _settle(self, waiter, waited: float) -> bool:
+        """After a wait: True if the waiter got a slot, else leave the queue"""
+        with self._lock:
+            self.wait_seconds += waited
+            if waiter.granted:
+                self.admitted += 1
+                return True
+            self._waiters.remove(waiter)
+            self.rejected_timeout += 1
+            return False
+
+    def acquire(self, bounded: bool = True) -> bool:
+        """Block until a slot is free. False when the queue is full or the wait times out.
+
+        ``bounded=False`` waits as long as it takes and is not turned away by a
+        full queue; for callers that are already bounded themselves.
+        """
+        waiter = self._enter(_ThreadWaiter, bounded)
+        if isinstance(waiter, bool):
+            return waiter
+        start = time.monotonic()
+        waiter.wait(self.queue_timeout if bounded else None)
+        return self._settle(waiter, time.monotonic() - start)
+
+    async def acquire_async(self) -> bool:
+        """``acquire`` for coroutines: waits without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        waiter = self._enter(lambda: _AsyncWaiter(loop), True)
+        if isinstance(waiter, bool):
+            return waiter
+        start = time.monotonic()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), self.queue_timeout)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Client went away while queued: give back a slot handed over meanwhile
+            if self._settle(waiter, time.monotonic() - start):
+                self.release()
+            raise
+        return self._settle(waiter, time.monotonic() - start)
+
+    def release(self, service_seconds: Optional[float] = None) -> None:
+        """Free a slot, handing it to the oldest waiter if there is one"""
+        with self._lock:
+            if service_seconds is not None:
+                if self.service_seconds is None:
+                    self.service_seconds = service_seconds
+                else:
+                    self.service_seconds += SERVICE_TIME_SMOOTHING * (service_seconds - self.service_seconds)
+            if self._waiters:
+                self._waiters.popleft().grant()
+            else:
+                self.in_flight -= 1
+
+    def retry_after(self) -> int:
+        """Seconds a shed client should wait: roughly the time to drain the queue"""
+        service = self.service_seconds or 1.0
+        return max(1, math.ceil(service * (self.queue_depth + 1) / self.max_in_flight))
+
+    def stats(self) -> Dict[Text, Any]:
+        return {
+            'max_in_flight': self.max_in_flight,
+            'max_queue': self.max_queue,
+            'queue_timeout': self.queue_timeout,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'peak_in_flight': self.peak_in_flight,
+            'peak_queue_depth': self.peak_queued,
+            'admitted': self.admitted,
+            'queued': self.queued,
+            'rejected_queue_full': self.rejected_queue_full,
+            'rejected_timeout': self.rejected_timeout,
+            'average_wait_ms': round(self.wait_seconds / self.queued * 1000, 1) if self.queued else None,
+            'average_rasa_ms': round(self.service_seconds * 1000, 1) if self.service_seconds else None,
+        }
@@ -1,19 +1,279 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, g, render_template, request, jsonify, stream_with_context
 from flask_cors import CORS
 import requests
 import json
+import math
 import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Imported after load_dotenv so .env settings reach the client configuration
+from actions.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, registry
+from admission import ConcurrencyLimiter, RateLimiter
+from gateway_cache import ChatCache, make_backend
+from rasa_client import RASA_API_URL, RasaClient, RasaStatusError
+
 app = Flask(__name__)
 CORS(app)
 
-# Configuration
-RASA_API_URL = os.getenv('RASA_API_URL', 'http://localhost:5006/webhooks/rest/webhook')
+# One keep-alive connection pool to Rasa shared by every request
+rasa_client = RasaClient()
+
+# Senders handled at once across all /chat/batch requests, and the largest batch accepted
+CHAT_BATCH_WORKERS = int(os.getenv('CHAT_BATCH_WORKERS', '16'))
+CHAT_BATCH_MAX_ITEMS = int(os.getenv('CHAT_BATCH_MAX_ITEMS', '5000'))
+
+# Seconds a batch item waits for its sender's rate limit before it is refused
+CHAT_BATCH_RATE_WAIT = float(os.getenv('CHAT_BATCH_RATE_WAIT', '30'))
+
+# Catalog search is answered by the actions server, which holds the catalog (see actions.actions.search_products)
+SEARCH_URL = os.getenv('FASHION_SEARCH_URL', 'http://localhost:5056/search')
+SEARCH_TIMEOUT = float(os.getenv('FASHION_SEARCH_TIMEOUT', '5'))
+search_session = requests.Session()
+
+batch_executor = ThreadPoolExecutor(max_workers=CHAT_BATCH_WORKERS, thread_name_prefix='chat-batch')
+
+# Replies to stateless turns (greetings, help, size guides...), see gateway_cache.py
+chat_cache = ChatCache(make_backend())
+
+# Asks Rasa's NLU for the intent of new message texts off the request path
+cache_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-cache')
+
+# Per-sender message rate, and the cap on Rasa calls in flight (see admission.py)
+rate_limiter = RateLimiter()
+rasa_limiter = ConcurrencyLimiter()
+
+# Served on /metrics; the Rasa client records its own round trips (rasa_client.py)
+request_seconds = registry.histogram(
+    'gateway_request_seconds', "Time to answer gateway requests; streams until the response starts", ('route',))
+requests_total = registry.counter('gateway_requests_total', "Gateway requests by route and status",
+                                  ('route', 'status'))
+registry.gauge_function('gateway_rasa_in_flight', "Rasa calls in flight", lambda: rasa_limiter.in_flight)
+registry.gauge_function('gateway_rasa_queue_depth', "Messages waiting for a free Rasa call",
+                        lambda: rasa_limiter.queue_depth)
+registry.counter_function('gateway_rejections_total', "Messages refused by admission control", lambda: {
+    ('rate_limited',): rate_limiter.rejected,
+    ('queue_full',): rasa_limiter.rejected_queue_full,
+    ('queue_timeout',): rasa_limiter.rejected_timeout,
+}, labels=('reason',))
+registry.counter_function('gateway_queue_wait_seconds_total', "Time messages spent waiting for a Rasa call",
+                          lambda: rasa_limiter.wait_seconds)
+registry.counter_function('gateway_reply_cache_total', "Reply cache lookups by outcome", lambda: {
+    ('hit',): chat_cache.hits,
+    ('miss',): chat_cache.misses,
+    ('bypass',): chat_cache.bypasses,
+}, labels=('outcome',))
+
+def record_request(route, status, seconds):
+    request_seconds.observe(seconds, route=route)
+    requests_total.inc(route=route, status=status)
+
+def parse_chat_request(data):
+    """Validate a /chat body; return (sender, message, None) or (None, None, error body)"""
+    if not data or not isinstance(data, dict):
+        return None, None, {
+            'status': 'error',
+            'message': 'Invalid JSON data received.'
+        }
+
+    user_message = data.get('message')
+    sender_id = data.get('sender', 'user')
+
+    if isinstance(sender_id, bool) or not isinstance(sender_id, (str, int)):
+        return None, None, {
+            'status': 'error',
+            'message': 'The sender must be text or a number.'
+        }
+    if user_message is not None and not isinstance(user_message, str):
+        return None, None, {
+            'status': 'error',
+            'message': 'The message must be text.'
+        }
+    if not user_message or user_message.strip() == '':
+        return None, None, {
+            'status': 'error',
+            'message': 'Please enter a message.'
+        }
+    return sender_id, user_message.strip(), None
+
+def format_response(bot_response):
+    """Shape one of Rasa's bot responses for the web interface"""
+    return {
+        'text': bot_response.get('text', ''),
+        'image': bot_response.get('image'),
+        'buttons': bot_response.get('buttons', []),
+        'timestamp': datetime.now().strftime('%H:%M')
+    }
+
+def format_responses(bot_responses):
+    """Shape Rasa's bot responses for the web interface"""
+    return {
+        'status': 'success',
+        'responses': [format_response(bot_response) for bot_response in bot_responses]
+    }
+
+# Stop proxies from buffering the event stream
+STREAM_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no'
+}
+
+# Sent as soon as a stream opens so the client sees the first bytes before
+# Rasa has replied
+STREAM_OPENED = ': stream opened\n\n'
+
+def server_sent_event(event, payload):
+    """Encode one server-sent event with a JSON payload"""
+    return f'event: {event}\ndata: {json.dumps(payload)}\n\n'
+
+def stream_summary(start, first_message_at, count):
+    """Final event of a stream: message count, time to first message and total time"""
+    now = time.perf_counter()
+    return {
+        'status': 'success',
+        'messages': count,
+        'first_message_ms': round((first_message_at - start) * 1000, 1) if first_message_at else None,
+        'total_ms': round((now - start) * 1000, 1)
+    }
+
+def chat_error(error):
+    """Error body for an exception raised while talking to Rasa"""
+    if isinstance(error, RasaStatusError):
+        message = f'Rasa server returned status {error.status_code}. Please make sure the Rasa server is running.'
+    elif isinstance(error, requests.exceptions.ConnectionError):
+        message = f'Cannot connect to Rasa server. Please make sure the Rasa server is running on {rasa_client.url}'
+    elif isinstance(error, requests.exceptions.Timeout):
+        message = 'Request timed out. Please try again.'
+    elif isinstance(error, requests.exceptions.RequestException):
+        message = f'Network error: {str(error)}'
+    else:
+        message = f'Something went wrong: {str(error)}'
+    return {
+        'status': 'error',
+        'message': message
+    }
+
+def rate_limit(sender_id, timeout=0):
+    """Take a token from the sender's bucket, waiting up to ``timeout`` seconds for one;
+    returns None, or a (status, body, retry_after) rejection"""
+    allowed, wait = rate_limiter.wait(sender_id, timeout) if timeout > 0 else rate_limiter.allow(sender_id)
+    if allowed:
+        return None
+    return 429, {
+        'status': 'error',
+        'message': 'You are sending messages too quickly. Please wait a moment and try again.'
+    }, max(1, math.ceil(wait))
+
+def overloaded():
+    """Rejection for a message that found no free Rasa slot in time"""
+    return 503, {
+        'status': 'error',
+        'message': 'The chatbot is busy right now. Please try again shortly.'
+    }, rasa_limiter.retry_after()
+
+def refuse(rejection):
+    status, body, retry_after = rejection
+    return jsonify(body), status, {'Retry-After': str(retry_after)}
+
+def send_to_rasa(sender_id, user_message):
+    """Send a message to Rasa in one of the capped in-flight slots; None if none was free in time"""
+    if not rasa_limiter.acquire():
+        return None
+    started = time.perf_counter()
+    try:
+        return rasa_client.send(sender_id, user_message)
+    finally:
+        rasa_limiter.release(time.perf_counter() - started)
+
+def answer_batch_item(item):
+    """Reply to one /chat/batch item the way /chat would; refusals become error bodies"""
+    sender_id, user_message, error = parse_chat_request(item)
+    if error:
+        return error
+    # Items count against their sender's rate limit like /chat messages, but wait for a token
+    rejection = rate_limit(sender_id, CHAT_BATCH_RATE_WAIT)
+    if rejection is None:
+        bot_responses = cached_reply(sender_id, user_message)
+        if bot_responses is not None:
+            return format_responses(bot_responses)
+        bot_responses = send_to_rasa(sender_id, user_message)
+        if bot_responses is not None:
+            remember_reply(sender_id, user_message, bot_responses)
+            return format_responses(bot_responses)
+        rejection = overloaded()
+    _, body, retry_after = rejection
+    return dict(body, retry_after=retry_after)
+
+def run_batch_item(index, item, batch_start):
+    """Answer one /chat/batch item; returns its result with timings"""
+    started = time.perf_counter()
+    try:
+        result = answer_batch_item(item)
+    except Exception as e:
+        result = chat_error(e)
+    finished = time.perf_counter()
+    result.update({
+        'index': index,
+        'sender': item.get('sender', 'user') if isinstance(item, dict) else None,
+        'queued_ms': round((started - batch_start) * 1000, 1),
+        'elapsed_ms': round((finished - started) * 1000, 1)
+    })
+    return result
+
+def batch_sender_key(index, item):
+    """Key grouping a batch item with the other items of its sender; invalid senders are alone"""
+    sender_id = item.get('sender', 'user') if isinstance(item, dict) else None
+    if isinstance(sender_id, bool) or not isinstance(sender_id, (str, int)):
+        return ('invalid', index)
+    return sender_id
+
+def run_sender_items(indexed_items, batch_start):
+    """Send one sender's items in order, each after the previous reply"""
+    return [run_batch_item(index, item, batch_start) for index, item in indexed_items]
+
+def cached_reply(sender_id, text):
+    """Cached bot responses for ``text``, with the slots the turn sets added to the sender's tracker.
+
+    None to ask Rasa, also when the slots could not be set.
+    """
+    bot_responses = chat_cache.get(text)
+    events = chat_cache.slot_events(text) if bot_responses is not None else None
+    if events:
+        try:
+            rasa_client.append_events(sender_id, events)
+        except Exception as e:
+            app.logger.warning(f'Could not set slots of a cached reply, asking Rasa instead: {e}')
+            return None
+    return bot_responses
+
+def learn_reply(sender_id, text, bot_responses):
+    try:
+        chat_cache.learn(text, rasa_client.latest_message(sender_id), bot_responses)
+    except Exception as e:
+        app.logger.warning(f'Could not classify {text!r} for the reply cache: {e}')
+
+def remember_reply(sender_id, text, bot_responses):
+    """Offer a reply that came from Rasa to the cache"""
+    if chat_cache.needs_intent(text):
+        cache_executor.submit(learn_reply, sender_id, text, bot_responses)
+    else:
+        chat_cache.store(text, bot_responses)
+
+@app.before_request
+def start_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_metrics(response):
+    if request.url_rule is not None and request.url_rule.rule != '/metrics':
+        record_request(request.url_rule.rule, response.status_code, time.perf_counter() - g.request_start)
+    return response
 
 @app.route('/')
 def index():
@@ -21,88 +281,144 @@ def index():
 
 @app.route('/chat', methods=['POST'])
 def chat():
+    sender_id, user_message, error = parse_chat_request(request.get_json(silent=True))
+    if error:
+        return jsonify(error), 400
+
+    rejection = rate_limit(sender_id)
+    if rejection:
+        return refuse(rejection)
+
     try:
-        if not request.json:
-            return jsonify({
-                'status': 'error',
-                'message': 'Invalid JSON data received.'
-            }), 400
-            
-        user_message = request.json.get('message')
-        sender_id = request.json.get('sender', 'user')
-        
-        if not user_message or user_message.strip() == '':
-            return jsonify({
-                'status': 'error',
-                'message': 'Please enter a message.'
-            }), 400
-        
-        # Send message to Rasa
-        payload = {
-            'sender': sender_id,
-            'message': user_message.strip()
-        }
-        
-        response = requests.post(RASA_API_URL, json=payload, timeout=15)
-        
-        if response.status_code == 200:
-            bot_responses = response.json()
-            
-            # Format responses
-            formatted_responses = []
-            for bot_response in bot_responses:
-                formatted_response = {
-                    'text': bot_response.get('text', ''),
-                    'image': bot_response.get('image'),
-                    'buttons': bot_response.get('buttons', []),
-                    'timestamp': datetime.now().strftime('%H:%M')
-                }
-                formatted_responses.append(formatted_response)
-            
-            return jsonify({
-                'status': 'success',
-                'responses': formatted_responses
-            })
-        else:
-            return jsonify({
-                'status': 'error',
-                'message': f'Rasa server returned status {response.status_code}. Please make sure the Rasa server is running.'
-            }), 500
-            
-    except requests.exceptions.ConnectionError:
+        # Stateless turns are answered from the cache without calling Rasa
+        bot_responses = cached_reply(sender_id, user_message)
+        if bot_responses is None:
+            bot_responses = send_to_rasa(sender_id, user_message)
+            if bot_responses is None:
+                return refuse(overloaded())
+            remember_reply(sender_id, user_message, bot_responses)
+        return jsonify(format_responses(bot_responses))
+    except Exception as e:
+        return jsonify(chat_error(e)), 500
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Like /chat, but forwards each bot message as a server-sent event as soon as Rasa produces it.
+
+    Events: ``message`` (one formatted bot response), then ``done`` with
+    timings, or ``error`` with the same body /chat would return. Rate limited
+    and overloaded requests are refused with 429/503 before the stream opens.
+    """
+    sender_id, user_message, error = parse_chat_request(request.get_json(silent=True))
+    if error:
+        return jsonify(error), 400
+
+    rejection = rate_limit(sender_id)
+    if rejection:
+        return refuse(rejection)
+    cached = cached_reply(sender_id, user_message)
+    if cached is None and not rasa_limiter.acquire():
+        return refuse(overloaded())
+    start = time.perf_counter()
+
+    def events():
+        first_message_at = None
+        received = []
+        yield STREAM_OPENED
+        try:
+            source = cached if cached is not None else rasa_client.stream(sender_id, user_message)
+            for bot_response in source:
+                if first_message_at is None:
+                    first_message_at = time.perf_counter()
+                received.append(bot_response)
+                yield server_sent_event('message', format_response(bot_response))
+        except Exception as e:
+            yield server_sent_event('error', chat_error(e))
+            return
+        if cached is None:
+            remember_reply(sender_id, user_message, received)
+        yield server_sent_event('done', stream_summary(start, first_message_at, len(received)))
+
+    response = Response(stream_with_context(events()), mimetype='text/event-stream', headers=STREAM_HEADERS)
+    if cached is None:
+        # Runs however the stream ends, including a client that disconnects early
+        response.call_on_close(lambda: rasa_limiter.release(time.perf_counter() - start))
+    return response
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Send many messages in one request, e.g. to replay logged conversations.
+
+    Body: ``{"items": [{"sender": ..., "message": ...}, ...]}``. Messages
+    from the same sender are sent in the order given, each after the reply
+    to the previous one; different senders run concurrently on a bounded
+    worker pool. Results come back in input order with per-item timings.
+
+    Items go through the same admission control and reply cache as /chat.
+    An item waits up to ``CHAT_BATCH_RATE_WAIT`` seconds for its sender's
+    rate limit. Items refused by the rate limit or shed by the Rasa queue,
+    and invalid items, come back as per-item errors.
+    """
+    data = request.get_json(silent=True)
+    items = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
         return jsonify({
-            'status': 'error', 
-            'message': 'Cannot connect to Rasa server. Please make sure the Rasa server is running on http://localhost:5006'
-        }), 500
-    except requests.exceptions.Timeout:
+            'status': 'error',
+            'message': 'Expected a JSON body with a non-empty "items" list.'
+        }), 400
+    if len(items) > CHAT_BATCH_MAX_ITEMS:
         return jsonify({
             'status': 'error',
-            'message': 'Request timed out. Please try again.'
-        }), 500
-    except requests.exceptions.RequestException as e:
+            'message': f'Batch too large: {len(items)} items (limit {CHAT_BATCH_MAX_ITEMS}).'
+        }), 413
+
+    batch_start = time.perf_counter()
+    by_sender = OrderedDict()
+    for index, item in enumerate(items):
+        by_sender.setdefault(batch_sender_key(index, item), []).append((index, item))
+
+    futures = [batch_executor.submit(run_sender_items, sender_items, batch_start)
+               for sender_items in by_sender.values()]
+    results = [None] * len(items)
+    for future in futures:
+        for result in future.result():
+            results[result['index']] = result
+
+    return jsonify({
+        'status': 'success',
+        'count': len(results),
+        'senders': len(by_sender),
+        'errors': sum(result['status'] == 'error' for result in results),
+        'total_ms': round((time.perf_counter() - batch_start) * 1000, 1),
+        'results': results
+    })
+
+@app.route('/search')
+def search():
+    """Full-text product search: ``GET /search?q=linen+shorts+for+a+beach+wedding&k=10``"""
+    query = request.args.get('q', '').strip()
+    if not query:
         return jsonify({
-            'status': 'error', 
-            'message': f'Network error: {str(e)}'
-        }), 500
-    except Exception as e:
+            'status': 'error',
+            'message': 'Expected a "q" query parameter.'
+        }), 400
+    try:
+        response = search_session.get(SEARCH_URL, params={'q': query, 'k': request.args.get('k', '10')},
+                                      timeout=SEARCH_TIMEOUT)
+        return jsonify(response.json()), response.status_code
+    except (requests.exceptions.RequestException, ValueError) as e:
         return jsonify({
             'status': 'error',
-            'message': f'Something went wrong: {str(e)}'
-        }), 500
+            'message': f'Search is unavailable: {str(e)}'
+        }), 502
 
 @app.route('/health')
 def health():
-    try:
-        # Check if Rasa server is running
-        response = requests.get('http://localhost:5006/status', timeout=5)
-        rasa_status = 'connected' if response.status_code == 200 else 'error'
-    except:
-        rasa_status = 'disconnected'
-    
+    # Check if Rasa server is running
     return jsonify({
         'status': 'healthy', 
         'service': 'Fashion Chatbot Web Interface',
-        'rasa_status': rasa_status
+        'rasa_status': rasa_client.status()
     })
 
 @app.route('/status')
@@ -110,12 +426,22 @@ def status():
     return jsonify({
         'status': 'running',
         'service': 'Fashion Chatbot Web Interface',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'cache': chat_cache.stats(),
+        'admission': {
+            'rate_limit': rate_limiter.stats(),
+            'rasa': rasa_limiter.stats()
+        }
     })
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus text format: request, Rasa round-trip, admission and cache metrics"""
+    return Response(registry.render(), content_type=METRICS_CONTENT_TYPE)
+
 if __name__ == '__main__':
     print("🚀 Starting Fashion Chatbot Web Interface...")
     print("📱 Web interface will be available at: http://localhost:5050")
-    print("🤖 Make sure Rasa server is running on: http://localhost:5006")
+    print(f"🤖 Make sure Rasa server is running on: {RASA_API_URL}")
     print("=" * 60)
     app.run(debug=True, host='0.0.0.0', port=5050)
\ No newline at end of file
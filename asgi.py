@@ -0,0 +1,217 @@
+"""
+ASGI entry point for the Fashion Chatbot web interface.
+
+``POST /chat`` and ``POST /chat/stream`` are served natively async: a
+message waiting on Rasa holds no thread, so one process can keep thousands
+of chats in flight. Every other route is handed to the Flask app unchanged.
+
+Run with:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5050
+
+or ``python asgi.py``.
+"""
+
+import asyncio
+import json
+import time
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import (STREAM_HEADERS, STREAM_OPENED, app as flask_app, chat_cache, chat_error, format_response,
+                 format_responses, overloaded, parse_chat_request, rasa_limiter, rate_limit, record_request,
+                 server_sent_event, stream_summary)
+from rasa_client import AsyncRasaClient
+
+
+class GatewayApp:
+    """Async /chat and /chat/stream in front of the WSGI Flask app"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi = WsgiToAsgi(wsgi_app)
+        self.rasa_client = None
+        self._background = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['path'] == '/chat' and scope['method'] == 'POST':
+            await self.timed('/chat', self.chat, receive, send)
+        elif scope['type'] == 'http' and scope['path'] == '/chat/stream' and scope['method'] == 'POST':
+            await self.timed('/chat/stream', self.chat_stream, receive, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def timed(self, route, handler, receive, send):
+        """Run a native route, recording its request metrics when the response starts"""
+        start = time.perf_counter()
+
+        async def send_and_record(message):
+            if message['type'] == 'http.response.start':
+                record_request(route, message['status'], time.perf_counter() - start)
+            await send(message)
+
+        await handler(receive, send_and_record)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self.rasa_client = AsyncRasaClient()
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.rasa_client is not None:
+                    await self.rasa_client.close()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_chat_request(self, receive, send):
+        """Parse a chat body; on a bad request answer 400 and return (None, None)"""
+        body = b''
+        more_body = True
+        while more_body:
+            message = await receive()
+            body += message.get('body', b'')
+            more_body = message.get('more_body', False)
+
+        try:
+            data = json.loads(body) if body else None
+        except ValueError:
+            data = None
+        sender_id, user_message, error = parse_chat_request(data if isinstance(data, dict) else None)
+        if error:
+            await self.respond(send, 400, error)
+            return None, None
+
+        if self.rasa_client is None:
+            # Servers started without lifespan support
+            self.rasa_client = AsyncRasaClient()
+        return sender_id, user_message
+
+    async def cached_reply(self, sender_id, text):
+        """Async ``app.cached_reply``"""
+        bot_responses = chat_cache.get(text)
+        events = chat_cache.slot_events(text) if bot_responses is not None else None
+        if events:
+            try:
+                await self.rasa_client.append_events(sender_id, events)
+            except Exception as e:
+                flask_app.logger.warning(f'Could not set slots of a cached reply, asking Rasa instead: {e}')
+                return None
+        return bot_responses
+
+    async def learn_reply(self, sender_id, text, bot_responses):
+        try:
+            chat_cache.learn(text, await self.rasa_client.latest_message(sender_id), bot_responses)
+        except Exception as e:
+            flask_app.logger.warning(f'Could not classify {text!r} for the reply cache: {e}')
+
+    def remember_reply(self, sender_id, text, bot_responses):
+        """Offer a reply that came from Rasa to the cache"""
+        if chat_cache.needs_intent(text):
+            task = asyncio.ensure_future(self.learn_reply(sender_id, text, bot_responses))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+        else:
+            chat_cache.store(text, bot_responses)
+
+    async def chat(self, receive, send):
+        sender_id, user_message = await self.read_chat_request(receive, send)
+        if sender_id is None:
+            return
+        rejection = rate_limit(sender_id)
+        if rejection:
+            return await self.refuse(send, rejection)
+        try:
+            bot_responses = await self.cached_reply(sender_id, user_message)
+            if bot_responses is None:
+                if not await rasa_limiter.acquire_async():
+                    return await self.refuse(send, overloaded())
+                started = time.perf_counter()
+                try:
+                    bot_responses = await self.rasa_client.send(sender_id, user_message)
+                finally:
+                    rasa_limiter.release(time.perf_counter() - started)
+                self.remember_reply(sender_id, user_message, bot_responses)
+        except Exception as e:
+            return await self.respond(send, 500, chat_error(e))
+        await self.respond(send, 200, format_responses(bot_responses))
+
+    async def chat_stream(self, receive, send):
+        sender_id, user_message = await self.read_chat_request(receive, send)
+        if sender_id is None:
+            return
+        rejection = rate_limit(sender_id)
+        if rejection:
+            return await self.refuse(send, rejection)
+        cached = await self.cached_reply(sender_id, user_message)
+        if cached is None and not await rasa_limiter.acquire_async():
+            return await self.refuse(send, overloaded())
+        start = time.perf_counter()
+        try:
+            await self.stream_events(send, sender_id, user_message, cached, start)
+        finally:
+            if cached is None:
+                rasa_limiter.release(time.perf_counter() - start)
+
+    async def stream_events(self, send, sender_id, user_message, cached, start):
+        headers = [(b'content-type', b'text/event-stream'), (b'access-control-allow-origin', b'*')]
+        headers += [(name.lower().encode('ascii'), value.encode('ascii')) for name, value in STREAM_HEADERS.items()]
+        await send({'type': 'http.response.start', 'status': 200, 'headers': headers})
+
+        async def event(text):
+            await send({'type': 'http.response.body', 'body': text.encode('utf-8'), 'more_body': True})
+
+        first_message_at = None
+        received = []
+        await event(STREAM_OPENED)
+        try:
+            if cached is not None:
+                async def replay():
+                    for bot_response in cached:
+                        yield bot_response
+                source = replay()
+            else:
+                source = self.rasa_client.stream(sender_id, user_message)
+            async for bot_response in source:
+                if first_message_at is None:
+                    first_message_at = time.perf_counter()
+                received.append(bot_response)
+                await event(server_sent_event('message', format_response(bot_response)))
+        except Exception as e:
+            await event(server_sent_event('error', chat_error(e)))
+        else:
+            if cached is None:
+                self.remember_reply(sender_id, user_message, received)
+            await event(server_sent_event('done', stream_summary(start, first_message_at, len(received))))
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def refuse(self, send, rejection):
+        status, body, retry_after = rejection
+        await self.respond(send, status, body, [(b'retry-after', str(retry_after).encode('ascii'))])
+
+    async def respond(self, send, status, payload, extra_headers=()):
+        body = json.dumps(payload).encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode('ascii')),
+                # Same CORS policy as flask_cors applies to the Flask routes
+                (b'access-control-allow-origin', b'*'),
+                *extra_headers,
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+app = GatewayApp(flask_app)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🚀 Starting Fashion Chatbot Web Interface (async mode)...")
+    print("📱 Web interface will be available at: http://localhost:5050")
+    print("=" * 60)
+    uvicorn.run(app, host='0.0.0.0', port=5050)
@@ -0,0 +1,186 @@
+"""
+Local TCP load balancer for the worker processes started by
+``start_chatbot.py --supervisor``.
+
+Each incoming connection goes to the backend with the fewest open
+connections; ties are broken round-robin, so idle pools still spread new
+connections evenly. A backend that refuses a connection is skipped for
+``BACKEND_COOLDOWN`` seconds while the next one is tried, which covers a
+worker being restarted.
+
+Balancing is per connection, not per request: clients that keep connections
+alive (the Rasa server's action calls, browsers) stay on one worker for the
+life of the connection.
+"""
+
+import asyncio
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence, Text, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Seconds a backend that refused a connection is left out
+BACKEND_COOLDOWN = 1.0
+
+# Seconds to wait for a backend to accept a connection
+CONNECT_TIMEOUT = 3.0
+
+BUFFER_SIZE = 64 * 1024
+
+
+class Backend:
+    """One worker behind the balancer, with its load counters"""
+
+    def __init__(self, name: Text, host: Text, port: int):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.down_until = 0.0
+
+        # Metrics
+        self.active = 0
+        self.peak_active = 0
+        self.connections = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.connection_seconds = 0.0
+
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def stats(self) -> Dict[Text, Any]:
+        closed = self.connections - self.active
+        return {
+            'worker': self.name,
+            'address': f'{self.host}:{self.port}',
+            'available': self.available,
+            'active_connections': self.active,
+            'peak_active_connections': self.peak_active,
+            'connections': self.connections,
+            'failed_connects': self.failures,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'average_connection_ms': round(self.connection_seconds / closed * 1000, 1) if closed else None,
+        }
+
+
+class Balancer:
+    """Least-connections TCP proxy in front of a pool of workers"""
+
+    def __init__(self, name: Text, port: int, backends: Sequence[Tuple[Text, int]], host: Text = '0.0.0.0'):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.backends = [Backend(f'{name}-{index}', backend_host, backend_port)
+                         for index, (backend_host, backend_port) in enumerate(backends)]
+        self._turn = itertools.count()
+        self._loop = None
+        self._server = None
+        # The event loop only keeps weak references to connection tasks
+        self._tasks = set()
+        self.rejected = 0
+
+    def choose(self, exclude=()) -> Optional[Backend]:
+        """Backend with the fewest open connections, rotating among equals"""
+        candidates = [backend for backend in self.backends if backend.available and backend not in exclude]
+        if not candidates:
+            # All cooling down: try them anyway rather than refuse outright
+            candidates = [backend for backend in self.backends if backend not in exclude]
+        if not candidates:
+            return None
+        offset = next(self._turn)
+        rotated = candidates[offset % len(candidates):] + candidates[:offset % len(candidates)]
+        return min(rotated, key=lambda backend: backend.active)
+
+    async def _connect(self):
+        tried = []
+        while True:
+            backend = self.choose(tried)
+            if backend is None:
+                return None, None, None
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(backend.host, backend.port),
+                                                        CONNECT_TIMEOUT)
+                return backend, reader, writer
+            except (OSError, asyncio.TimeoutError):
+                backend.failures += 1
+                backend.down_until = time.monotonic() + BACKEND_COOLDOWN
+                tried.append(backend)
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter):
+        task = asyncio.current_task()
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        backend, reader, writer = await self._connect()
+        if backend is None:
+            self.rejected += 1
+            client_writer.close()
+            return
+        backend.active += 1
+        backend.connections += 1
+        backend.peak_active = max(backend.peak_active, backend.active)
+        start = time.monotonic()
+        try:
+            await asyncio.gather(self._pipe(client_reader, writer, backend, 'bytes_in'),
+                                 self._pipe(reader, client_writer, backend, 'bytes_out'))
+        finally:
+            backend.active -= 1
+            backend.connection_seconds += time.monotonic() - start
+            writer.close()
+            client_writer.close()
+
+    @staticmethod
+    async def _pipe(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, backend: Backend, counter: Text):
+        """Copy one direction until its end closes, then pass the half-close on"""
+        try:
+            while True:
+                data = await reader.read(BUFFER_SIZE)
+                if not data:
+                    break
+                setattr(backend, counter, getattr(backend, counter) + len(data))
+                writer.write(data)
+                await writer.drain()
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (OSError, RuntimeError):
+            writer.close()
+
+    def start(self) -> None:
+        """Listen on a daemon thread with its own event loop; returns once listening"""
+        started = threading.Event()
+        failure = []
+
+        def serve():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._server = self._loop.run_until_complete(
+                    asyncio.start_server(self._handle, self.host, self.port, reuse_address=True))
+            except OSError as e:
+                failure.append(e)
+                started.set()
+                return
+            started.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=serve, name=f'{self.name}-balancer', daemon=True).start()
+        started.wait()
+        if failure:
+            raise failure[0]
+        logger.info(f"Balancing {self.name} on port {self.port} across {len(self.backends)} workers")
+
+    def stop(self) -> None:
+        if self._loop is not None and self._server is not None:
+            self._loop.call_soon_threadsafe(self._server.close)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def stats(self) -> Dict[Text, Any]:
+        return {
+            'port': self.port,
+            'rejected': self.rejected,
+            'workers': [backend.stats() for backend in self.backends],
+        }
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Attribute Index Benchmark
+Compares the old copy + str.contains filter chain with bitmap lookups
+on the inverted attribute index.
+
+Usage: python bench/bench_attribute_index.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.attribute_index import AttributeIndex
+from actions.catalog import CatalogStore
+
+QUERIES = [
+    {'category': 'dresses'},
+    {'category': 'dress', 'occasion': 'party'},
+    {'category': 'shirts', 'gender': 'male', 'color': 'blue'},
+    {'category': 'bottoms', 'gender': 'female', 'occasion': 'casual', 'style_type': 'classic', 'season': 'summer'},
+    {'color': 'black', 'season': 'winter'},
+]
+
+
+def filter_chain(df, filters):
+    """The filter chain ActionGiveRecommendation used before the index"""
+    filtered_df = df.copy()
+    for column, text in filters.items():
+        filtered_df = filtered_df[filtered_df[column].str.contains(text, case=False, na=False)]
+    return filtered_df
+
+
+def filter_index(df, index, filters):
+    return df.iloc[index.rows(index.select(filters))]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    df = CatalogStore().get()
+    if df is None:
+        print("❌ Catalog not found. Run from the project root.")
+        return 1
+
+    build_ms, index = timed(lambda: AttributeIndex(df), 5)
+    print(f"📦 Catalog rows: {len(df)} | index build: {build_ms:.2f} ms")
+    print("=" * 72)
+
+    for filters in QUERIES:
+        chain_ms, expected = timed(lambda: filter_chain(df, filters), args.repeat)
+        index_ms, actual = timed(lambda: filter_index(df, index, filters), args.repeat)
+        assert list(expected.index) == list(actual.index), filters
+        print(f"{filters}")
+        print(f"   rows: {len(actual):5d} | chain: {chain_ms:7.3f} ms | index: {index_ms:7.3f} ms"
+              f" | speedup: {chain_ms / index_ms:5.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Chat Load Benchmark
+Measures latency percentiles, throughput and memory of the web gateway and
+of the custom actions at several concurrency levels. Results are saved as
+JSON under bench/results/ so runs can be compared across versions.
+
+  actions: drives ActionGiveRecommendation, ActionTrendingItems and
+           ActionOutfitCombination in-process with the recorded tracker
+           states in bench/tracker_states.json.
+  gateway: starts the gateway (Flask or ASGI) against the fake Rasa webhook
+           in bench/fake_rasa.py and loads /chat over HTTP. With --stream it
+           loads /chat/stream instead and also reports time to first message.
+
+Usage: python bench/bench_load.py actions [--concurrency 1,8,32] [--requests N]
+       python bench/bench_load.py gateway [--server flask|asgi] [--stream] [--rasa-latency-ms N]
+       python bench/bench_load.py ... [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from itertools import cycle, islice
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_rasa import WEBHOOK_PATH, start_fake_rasa
+from bench.harness import REPO_ROOT, compare, print_row, rss_mb, run_load, save_results, summarize
+
+TRACKER_STATES = os.path.join(REPO_ROOT, 'bench', 'tracker_states.json')
+
+GATEWAY_COMMANDS = {
+    'flask': [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--with-threads', '--no-reload'],
+    'asgi': [sys.executable, '-m', 'uvicorn', 'asgi:app', '--log-level', 'warning'],
+}
+
+
+def load_states(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def bench_actions(args, states):
+    from rasa_sdk import Tracker
+    from rasa_sdk.executor import CollectingDispatcher
+
+    from actions import actions
+
+    registry = {cls().name(): cls for cls in (actions.ActionGiveRecommendation,
+                                              actions.ActionTrendingItems,
+                                              actions.ActionOutfitCombination)}
+
+    results = []
+    for name, action_class in registry.items():
+        action = action_class()
+        action_states = [state['tracker'] for state in states if state['action'] == name]
+        if not action_states:
+            continue
+
+        def call(tracker_state):
+            dispatcher = CollectingDispatcher()
+            action.run(dispatcher, Tracker.from_dict(tracker_state), {})
+            if not dispatcher.messages:
+                raise RuntimeError(f"{name} uttered nothing")
+
+        # Warm-up: catalog load, derived indexes and caches
+        run_load(call, action_states, 1)
+        print(f"🎬 {name} ({len(action_states)} recorded states)")
+        for concurrency in args.concurrency:
+            items = list(islice(cycle(action_states), args.requests))
+            latencies, _, errors, wall = run_load(call, items, concurrency)
+            summary = summarize(latencies, wall, errors)
+            summary['rss_mb'] = round(rss_mb(), 1)
+            print_row(name, concurrency, summary)
+            results.append(dict(target=name, concurrency=concurrency, **summary))
+    return results
+
+
+def wait_until_ready(url, process, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"gateway exited with code {process.returncode}")
+        try:
+            if requests.get(url, timeout=1).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"gateway not ready at {url} after {timeout:.0f}s")
+
+
+def bench_gateway(args, states):
+    fake_rasa = None
+    process = None
+    rasa_url = args.rasa_url
+    if rasa_url is None:
+        fake_rasa = start_fake_rasa(latency_ms=args.rasa_latency_ms, replies=args.rasa_replies,
+                                    gap_ms=args.rasa_gap_ms)
+        rasa_url = f"http://127.0.0.1:{fake_rasa.server_address[1]}{WEBHOOK_PATH}"
+
+    gateway_url = args.url
+    pid = args.pid
+    if gateway_url is None:
+        env = dict(os.environ, RASA_API_URL=rasa_url)
+        command = GATEWAY_COMMANDS[args.server] + ['--host', '127.0.0.1', '--port', str(args.port)]
+        process = subprocess.Popen(command, cwd=REPO_ROOT, env=env,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        gateway_url = f"http://127.0.0.1:{args.port}"
+        pid = process.pid
+
+    local = threading.local()
+
+    def call(message):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        response = session.post(f"{gateway_url}/chat", json=message, timeout=60)
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+    def call_stream(message):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        first_message_ms = None
+        with session.post(f"{gateway_url}/chat/stream", json=message, timeout=60, stream=True) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+            for line in response.iter_lines(decode_unicode=True):
+                if line == 'event: message' and first_message_ms is None:
+                    first_message_ms = (time.perf_counter() - start) * 1000
+                elif line == 'event: error':
+                    raise RuntimeError(f"stream error: {next(response.iter_lines(decode_unicode=True))}")
+        return {'first_message_ms': first_message_ms}
+
+    if args.stream:
+        call = call_stream
+
+    results = []
+    try:
+        wait_until_ready(f"{gateway_url}/status", process)
+        messages = [{'sender': state['tracker']['sender_id'], 'message': state['tracker']['latest_message']['text']}
+                    for state in states]
+        run_load(call, messages, 1)
+        target = f"gateway ({args.server})" if args.url is None else 'gateway'
+        if args.stream:
+            target += ' stream'
+        print(f"🌐 {target} at {gateway_url} -> {rasa_url}")
+        for concurrency in args.concurrency:
+            items = list(islice(cycle(messages), args.requests))
+            latencies, extras, errors, wall = run_load(call, items, concurrency)
+            summary = summarize(latencies, wall, errors, extras)
+            rss = rss_mb(pid) if pid else None
+            summary['rss_mb'] = round(rss, 1) if rss is not None else None
+            print_row(target, concurrency, summary)
+            results.append(dict(target=target, concurrency=concurrency, **summary))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        if fake_rasa is not None:
+            fake_rasa.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('target', choices=['actions', 'gateway'])
+    parser.add_argument('--concurrency', default='1,8,32',
+                        type=lambda value: [int(level) for level in value.split(',')],
+                        help="comma-separated concurrency levels")
+    parser.add_argument('--requests', type=int, default=300, help="requests per concurrency level")
+    parser.add_argument('--states', default=TRACKER_STATES, help="recorded tracker states (JSON)")
+    parser.add_argument('--output', help="results file (default: bench/results/<target>-<time>.json)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    gateway = parser.add_argument_group('gateway')
+    gateway.add_argument('--server', choices=sorted(GATEWAY_COMMANDS), default='flask')
+    gateway.add_argument('--port', type=int, default=5051, help="port for the gateway started by the benchmark")
+    gateway.add_argument('--url', help="load an already running gateway instead of starting one")
+    gateway.add_argument('--pid', type=int, help="process id of --url's gateway, for RSS")
+    gateway.add_argument('--rasa-url', help="real Rasa webhook instead of the fake one")
+    gateway.add_argument('--stream', action='store_true', help="load /chat/stream instead of /chat")
+    gateway.add_argument('--rasa-latency-ms', type=float, default=50.0, help="fake Rasa delay before the first message")
+    gateway.add_argument('--rasa-gap-ms', type=float, default=20.0, help="fake Rasa delay between messages")
+    gateway.add_argument('--rasa-replies', type=int, default=2)
+    args = parser.parse_args()
+
+    states = load_states(args.states)
+    print(f"🚀 {args.target} load benchmark: {args.requests} requests per level, "
+          f"concurrency {args.concurrency}")
+    print("=" * 60)
+
+    if args.target == 'actions':
+        results = bench_actions(args, states)
+    else:
+        results = bench_gateway(args, states)
+
+    settings = {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')}
+    path = save_results(f"load-{args.target}", results, settings, args.output)
+    print(f"\n💾 Results saved to {path}")
+    if args.baseline:
+        compare(results, args.baseline)
+    return 0 if all(row['errors'] == 0 for row in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Outfit Engine Benchmark
+Times outfit engine build and best-outfit search on the catalog and on the
+catalog replicated to a larger size.
+
+Usage: python bench/bench_outfits.py [--scale N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.catalog import CatalogStore
+from actions.outfits import OutfitEngine
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scale', type=int, default=10, help="catalog replication factor")
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    df = CatalogStore().get()
+    if df is None:
+        print("❌ Catalog not found. Run from the project root.")
+        return 1
+
+    for scale in (1, args.scale):
+        frame = pd.concat([df] * scale, ignore_index=True) if scale > 1 else df
+        female = (frame['gender'].astype(str) == 'Female').to_numpy()
+
+        build_ms, engine = timed(lambda: OutfitEngine(frame), 3)
+        one_ms, _ = timed(lambda: engine.best_outfits(1), args.repeat)
+        two_ms, outfits = timed(lambda: engine.best_outfits(2), args.repeat)
+        masked_ms, _ = timed(lambda: engine.best_outfits(2, female), args.repeat)
+        pools = {piece: len(pool.items) for piece, pool in engine.pools.items()}
+        print(f"📦 {len(frame)} rows (x{scale}) | pools: {pools} | build: {build_ms:.1f} ms")
+        print(f"   1 outfit: {one_ms:.3f} ms | 2 outfits: {two_ms:.3f} ms | "
+              f"2 outfits, female only: {masked_ms:.3f} ms")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Phrase Matcher Benchmark
+Compares checking every keyword phrase against a message in turn with one
+pass of the compiled phrase matcher, as the keyword tables grow.
+
+Usage: python bench/bench_phrases.py [--repeat N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('FASHION_WARMUP', '0')
+os.environ.setdefault('FASHION_METRICS_PORT', '0')
+
+from actions.actions import MESSAGE_PHRASES
+from actions.phrases import PhraseMatcher
+
+MESSAGES = [
+    "hi",
+    "show me party dresses",
+    "I'm petite and a student, what should I wear for a casual weekend?",
+    "I need an outfit for my sister's wedding next month, something elegant but comfortable for dancing all night",
+]
+
+
+def scaled(tables, factor):
+    """The tables with ``factor`` times as many (made-up) phrases"""
+    return {feature: {f'{phrase} {copy}' if copy else phrase: value
+                      for copy in range(factor) for phrase, value in phrases.items()}
+            for feature, phrases in tables.items()}
+
+
+def phrase_by_phrase(tables):
+    """One whole-word search per phrase, the way keyword chains check a message"""
+    patterns = [(feature, value, re.compile(rf'\b{re.escape(phrase)}\b'))
+                for feature, phrases in tables.items() for phrase, value in phrases.items()]
+
+    def scan(text):
+        text = text.lower()
+        found = {}
+        for feature, value, pattern in patterns:
+            if pattern.search(text):
+                found.setdefault(feature, []).append(value)
+        return found
+    return scan
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    for factor in (1, 10, 100):
+        tables = scaled(MESSAGE_PHRASES, factor)
+        phrases = sum(len(table) for table in tables.values())
+        start = time.perf_counter()
+        matcher = PhraseMatcher(tables)
+        build_ms = (time.perf_counter() - start) * 1000
+        baseline = phrase_by_phrase(tables)
+        print(f"📚 {phrases} phrases | matcher build: {build_ms:.2f} ms")
+        for message in MESSAGES:
+            assert {feature: sorted(values) for feature, values in matcher.scan(message).items()} == \
+                   {feature: sorted(set(values)) for feature, values in baseline(message).items()}, message
+            per_phrase_us = timed(lambda: baseline(message), args.repeat)
+            matcher_us = timed(lambda: matcher.scan(message), args.repeat)
+            print(f"   {len(message):4d} chars | per phrase: {per_phrase_us:8.1f} µs | matcher: {matcher_us:6.1f} µs"
+                  f" | speedup: {per_phrase_us / matcher_us:6.1f}x")
+        print("=" * 72)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
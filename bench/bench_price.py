@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Price Range Benchmark
+Times the budget filter the recommendation action used to build per turn
+(to_numeric, fixed band masks, a str.contains fallback) against bisecting
+the price index, on the catalog repeated up to 100 times.
+
+Usage: python bench/bench_price.py [--scales 1,10,100] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from actions.attribute_index import bitmap_from_mask
+from actions.catalog import CatalogStore
+from actions.price_index import PriceIndex, parse_budget
+
+BUDGETS = ['low', 'mid-range', 'luxury', 'under 200', 'around 300', 'between 100 and 250']
+
+# Budget words the fixed band masks understood
+BANDS = ['low', 'mid-range', 'premium', 'luxury']
+
+
+def band_masks(frame, budget):
+    """The budget filter as the recommendation action built it before the price index"""
+    price_series = pd.to_numeric(frame['price'], errors='coerce')
+    if 'budget-friendly' in budget.lower() or 'low' in budget.lower():
+        budget_mask = price_series <= 150
+    elif 'mid-range' in budget.lower() or 'medium' in budget.lower():
+        budget_mask = (price_series > 150) & (price_series <= 400)
+    elif 'premium' in budget.lower():
+        budget_mask = (price_series > 400) & (price_series <= 800)
+    elif 'luxury' in budget.lower() or 'high' in budget.lower():
+        budget_mask = price_series > 800
+    else:
+        budget_mask = frame['price'].astype(str).str.contains(budget, case=False, na=False)
+    return bitmap_from_mask(budget_mask.to_numpy())
+
+
+def check_bands(frame):
+    """Every band must select the rows its fixed mask did, including products priced on a boundary"""
+    boundaries = pd.DataFrame({'price': [0.0, 150.0, 150.01, 400.0, 400.01, 800.0, 800.01]})
+    frame = pd.concat([frame[['price']], boundaries], ignore_index=True)
+    prices = PriceIndex(frame)
+    for band in BANDS:
+        assert prices.bitmap(*parse_budget(band)) == band_masks(frame, band), band
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='1,10,100', help="comma-separated catalog size multiples")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    df = CatalogStore().get()
+    if df is None:
+        print("❌ Catalog not found. Run from the project root.")
+        return 1
+    check_bands(df)
+
+    for scale in (int(value) for value in args.scales.split(',')):
+        frame = pd.concat([df] * scale, ignore_index=True)
+        build_ms, prices = timed(lambda: PriceIndex(frame), 1)
+        print(f"📦 {len(frame)} rows | price index build: {build_ms:.1f} ms")
+        for budget in BUDGETS:
+            price_range = parse_budget(budget)
+            old_ms, old_rows = timed(lambda: band_masks(frame, budget), max(1, args.repeat // 10))
+            # Bisection alone, then as the action uses it: a bitmap, cached per range
+            span_ms, _ = timed(lambda: prices.rows(*price_range), args.repeat)
+            bitmap_ms, _ = timed(lambda: prices._bitmap(*price_range), args.repeat)
+            cached_ms, rows = timed(lambda: prices.bitmap(*price_range), args.repeat)
+            print(f"   {budget!r:24} masks: {old_ms:7.2f} ms ({bin(old_rows).count('1'):6d} rows) | "
+                  f"bisect: {span_ms * 1000:5.0f} µs | bitmap: {bitmap_ms:6.2f} ms | cached: {cached_ms * 1000:4.0f} µs "
+                  f"({prices.count(*price_range):6d} rows)")
+        print("=" * 72)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Response Rendering Benchmark
+Compares per-response cost of the old iterrows + string concatenation loop
+with the precomputed card table and templates in actions/rendering.py.
+The new path is timed both cold (first render of each row) and warm.
+
+Usage: python bench/bench_rendering.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.catalog import CatalogStore
+from actions.rendering import RECOMMENDATION_CARD, TRENDING_CARD, CardRenderer
+
+
+def render_recommendations_iterrows(recommendations):
+    """The recommendation card loop the actions used before the rendering layer"""
+    response = ""
+    for idx, item in recommendations.iterrows():
+        rating = float(item.get('average_rating', 4.0))
+        durability = float(item.get('durability_rating', 3.5))
+        comfort = float(item.get('comfort_rating', 4.0))
+        value_score = (rating + durability + comfort) / 3
+
+        response += f"**{item['product_name']}** - {item['category'].title()}\n"
+        response += f"🎨 **Style:** {item['pattern']} | **Color:** {item['color']}\n"
+        response += f"⭐ **Value Score:** {value_score:.1f}/5.0 | **Rating:** {rating:.1f}/5.0\n"
+        response += f"💰 **Price:** ${item['price']:.2f} | **Brand:** {item['brand']}\n"
+        response += f"🌍 **Perfect for:** {item['season']} | **Occasion:** {item['occasion']}\n"
+        response += f"🧵 **Material:** {item['material']} | **Fit:** {item.get('fit_type', 'Regular')}\n"
+        response += f"💡 **Styling Tip:** {item.get('styling_tips', 'Pair with complementary accessories for a complete look')}\n\n"
+    return response
+
+
+def render_trending_iterrows(trending_items):
+    """The trending card loop the actions used before the rendering layer"""
+    response = ""
+    for idx, item in trending_items.iterrows():
+        try:
+            trend_score = float(item.get('trend_level', 3.5))
+        except (ValueError, TypeError):
+            trend_score = 3.5
+        try:
+            rating = float(item.get('average_rating', 4.0))
+        except (ValueError, TypeError):
+            rating = 4.0
+        overall_score = (trend_score + rating) / 2
+
+        response += f"**{item['product_name']}** - {item['category'].title()}\n"
+        response += f"🎨 **Style:** {item['pattern']} | **Color:** {item['color']}\n"
+        response += f"⭐ **Trend Score:** {overall_score:.1f}/5.0 | **Rating:** {rating:.1f}/5.0\n"
+        response += f"💰 **Price:** ${item['price']:.2f} | **Brand:** {item['brand']}\n"
+        response += f"🌍 **Perfect for:** {item['season']} | **Occasion:** {item['occasion']}\n"
+        response += f"💡 **Styling Tip:** {item.get('styling_tips', 'Pair with complementary accessories for a complete look')}\n\n"
+    return response
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    df = CatalogStore().get()
+    if df is None:
+        print("❌ Catalog not found. Run from the project root.")
+        return 1
+
+    build_ms, cards = timed(lambda: CardRenderer(df), 5)
+    print(f"📦 Catalog rows: {len(df)} | card renderer build (once per load): {build_ms:.2f} ms")
+    print("=" * 72)
+
+    cases = [
+        ('recommendation x3', RECOMMENDATION_CARD, render_recommendations_iterrows, 3),
+        ('trending x5', TRENDING_CARD, render_trending_iterrows, 5),
+    ]
+    for label, template, old_render, count in cases:
+        picked = df.sample(count, random_state=0)
+        old_ms, expected = timed(lambda: old_render(picked), args.repeat)
+
+        def render_cold():
+            # Drop memoised cards so every call formats from scratch
+            cards._cards.clear()
+            return cards.render(template, picked.index)
+
+        cold_ms, actual = timed(render_cold, args.repeat)
+        warm_ms, actual = timed(lambda: cards.render(template, picked.index), args.repeat)
+        assert expected == actual, label
+        print(f"{label:<20} iterrows: {old_ms:7.3f} ms | cold: {cold_ms:7.3f} ms | warm: {warm_ms:7.3f} ms"
+              f" | speedup: {old_ms / cold_ms:5.1f}x / {old_ms / warm_ms:5.1f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Text Search Benchmark
+Builds the BM25 text index over the catalog repeated up to 100 times and
+times top-k queries against a str.contains scan of the same fields.
+
+Usage: python bench/bench_search.py [--scales 1,10,100] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from actions.catalog import CatalogStore
+from actions.text_search import SEARCH_FIELDS, TextIndex, tokenize
+
+QUERIES = [
+    "linen shorts for a beach wedding",
+    "black leather jacket",
+    "pair with sneakers and casual tops",
+    "evening",
+]
+
+
+def scan(fields, query):
+    """Rows whose fields contain every query term, the way a str.contains filter would find them"""
+    mask = None
+    for term in tokenize(query):
+        matches = None
+        for series, _ in fields.values():
+            found = series.str.contains(term, case=False, na=False, regex=False)
+            matches = found if matches is None else matches | found
+        mask = matches if mask is None else mask & matches
+    return mask
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='1,10,100', help="comma-separated catalog size multiples")
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    store = CatalogStore()
+    df = store.get()
+    if df is None:
+        print("❌ Catalog not found. Run from the project root.")
+        return 1
+    base = {name: (df[name] if name in df.columns else store.text(name), weight)
+            for name, weight in SEARCH_FIELDS.items()}
+    base = {name: (series.astype(str), weight) for name, (series, weight) in base.items() if series is not None}
+
+    for scale in (int(value) for value in args.scales.split(',')):
+        fields = {name: (pd.concat([series] * scale, ignore_index=True), weight)
+                  for name, (series, weight) in base.items()}
+        build_ms, index = timed(lambda: TextIndex(fields), 1)
+        stats = index.stats()
+        print(f"📦 {stats['rows']} rows | build: {build_ms:.0f} ms | {stats['terms']} terms, "
+              f"{stats['postings']} postings in {stats['posting_bytes'] / 1e6:.2f} MB "
+              f"(+{stats['impact_bytes'] / 1e6:.2f} MB impacts)")
+        for query in QUERIES:
+            search_ms, (rows, _) = timed(lambda: index.search(query, args.k), args.repeat)
+            scan_ms, mask = timed(lambda: scan(fields, query), max(1, args.repeat // 10))
+            print(f"   {query!r:40} top-{args.k}: {search_ms:7.2f} ms | str.contains scan: {scan_ms:8.1f} ms"
+                  f" ({int(mask.sum())} rows with every term)")
+        print("=" * 72)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Similar Items Benchmark
+Builds the similar-items index over the catalog repeated up to 100 times,
+times saving, loading and queries, and measures how many of the exact
+nearest products (by cosine similarity over every row) each query finds.
+
+Usage: python bench/bench_similarity.py [--scales 1,10,100] [--queries N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from actions.catalog import CatalogStore
+from actions.similarity import SimilarityIndex
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def exact_similar(index, row, k):
+    """Cosine similarities of the ``k`` rows most like ``row``, comparing it with every row"""
+    similarities = (index.features @ index.features[row].T).toarray().ravel()
+    similarities[row] = -np.inf
+    return np.sort(similarities)[::-1][:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', default='1,10,100', help="comma-separated catalog size multiples")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    df = CatalogStore().get()
+    if df is None:
+        print("❌ Catalog not found. Run from the project root.")
+        return 1
+
+    for scale in (int(value) for value in args.scales.split(',')):
+        frame = pd.concat([df] * scale, ignore_index=True)
+        # Distinct ids, and prices nudged so copies are near rather than identical
+        frame['product_id'] = np.arange(len(frame))
+        frame['price'] = frame['price'] * (1 + np.random.default_rng(0).uniform(-0.2, 0.2, len(frame)))
+
+        build_ms, index = timed(lambda: SimilarityIndex.build(frame), 1)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'similarity_index.joblib')
+            save_ms, _ = timed(lambda: index.save(path), 1)
+            load_ms, _ = timed(lambda: SimilarityIndex.load(path), 1)
+            size = os.path.getsize(path)
+        print(f"📦 {len(frame)} rows | build: {build_ms:.0f} ms | save: {save_ms:.0f} ms | "
+              f"load: {load_ms:.0f} ms ({size / 1e6:.1f} MB)")
+
+        rows = np.random.default_rng(1).choice(len(frame), min(args.queries, len(frame)), replace=False)
+        query_ms, _ = timed(lambda: [index.similar_rows(row, args.k) for row in rows], 1)
+        exact_ms, _ = timed(lambda: [exact_similar(index, row, args.k) for row in rows], 1)
+        found = quality = 0.0
+        for row in rows:
+            _, similarities = index.similar_rows(row, args.k)
+            best = exact_similar(index, row, args.k)
+            # Ties at the k-th similarity make "which rows" ambiguous, so compare similarities
+            found += np.sum(similarities >= best[-1] - 1e-6) / args.k
+            quality += similarities.sum() / best.sum()
+        print(f"   top-{args.k}: {query_ms / len(rows) * 1000:7.0f} µs | exact scan: "
+              f"{exact_ms / len(rows) * 1000:7.0f} µs | recall: {found / len(rows):.3f} | "
+              f"similarity vs exact: {quality / len(rows):.4f}")
+        print("=" * 72)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
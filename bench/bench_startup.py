@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Actions Startup Benchmark
+Measures how long a fresh action-server process takes before it can answer:
+importing the actions package (what ``rasa run actions`` does before it
+serves), then the first run of each action on a recorded tracker state, and
+the process memory at that point. Every run is a new interpreter, so nothing
+is cached between runs.
+
+  fast:    FASHION_WARMUP=0, heavy libraries and the catalog load on the
+           first action
+  warm-up: FASHION_WARMUP=1, the catalog and its indexes load during import
+
+--max-import-ms fails the run (exit code 1) when the median fast-start import
+exceeds the budget, so it can guard against heavy imports creeping back in.
+
+Usage: python bench/bench_startup.py [--runs N] [--max-import-ms MS] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.harness import REPO_ROOT, save_results
+
+TRACKER_STATES = os.path.join(REPO_ROOT, 'bench', 'tracker_states.json')
+
+MODES = {'fast': '0', 'warm-up': '1'}
+
+# Libraries whose presence after import shows the lazy loading regressed
+HEAVY_MODULES = ('pandas', 'numpy', 'requests')
+
+# Runs in a fresh interpreter and prints its timings as JSON
+CHILD = r'''
+import json, sys, time
+start = time.perf_counter()
+import actions.actions as actions
+import_ms = (time.perf_counter() - start) * 1000
+loaded = [name for name in json.loads(sys.argv[2]) if name in sys.modules]
+
+from rasa_sdk import Tracker
+from rasa_sdk.executor import CollectingDispatcher
+from bench.harness import rss_mb
+
+with open(sys.argv[1]) as f:
+    states = json.load(f)
+classes = {cls().name(): cls for cls in (actions.ActionGiveRecommendation, actions.ActionTrendingItems,
+                                         actions.ActionOutfitCombination)}
+first_action_ms = {}
+for state in states:
+    name = state['action']
+    if name in classes and name not in first_action_ms:
+        start = time.perf_counter()
+        classes[name]().run(CollectingDispatcher(), Tracker.from_dict(state['tracker']), {})
+        first_action_ms[name] = (time.perf_counter() - start) * 1000
+print(json.dumps({'import_ms': import_ms, 'first_action_ms': first_action_ms,
+                  'heavy_modules_on_import': loaded, 'rss_mb': rss_mb()}))
+'''
+
+
+def run_once(mode, states_path):
+    env = dict(os.environ, FASHION_WARMUP=MODES[mode], FASHION_METRICS_PORT='0', PYTHONPATH=REPO_ROOT)
+    output = subprocess.check_output([sys.executable, '-c', CHILD, states_path, json.dumps(HEAVY_MODULES)],
+                                     cwd=REPO_ROOT, env=env, text=True)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def top_imports(limit):
+    """Slowest modules (cumulative microseconds) of one fast-start import, from ``-X importtime``"""
+    env = dict(os.environ, FASHION_WARMUP='0', FASHION_METRICS_PORT='0', PYTHONPATH=REPO_ROOT)
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import actions.actions'],
+                               cwd=REPO_ROOT, env=env, capture_output=True, text=True)
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len('import time:'):].split('|'))
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def summarize_mode(mode, runs):
+    first_action = {name: round(statistics.median(run['first_action_ms'][name] for run in runs), 1)
+                    for name in runs[0]['first_action_ms']}
+    return {
+        'target': mode,
+        'runs': len(runs),
+        'import_ms': round(statistics.median(run['import_ms'] for run in runs), 1),
+        'first_action_ms': first_action,
+        'ready_ms': round(statistics.median(run['import_ms'] + sum(run['first_action_ms'].values())
+                                            for run in runs), 1),
+        'rss_mb': round(statistics.median(run['rss_mb'] for run in runs), 1),
+        'heavy_modules_on_import': runs[-1]['heavy_modules_on_import'],
+    }
+
+
+def print_summary(row):
+    print(f"   {row['target']:<8} import {row['import_ms']:>8.1f} ms | first actions "
+          f"{sum(row['first_action_ms'].values()):>8.1f} ms | RSS {row['rss_mb']:.0f} MB")
+    for name, milliseconds in row['first_action_ms'].items():
+        print(f"      {name:<34} {milliseconds:>8.1f} ms")
+    if row['heavy_modules_on_import']:
+        print(f"      imported at startup: {', '.join(row['heavy_modules_on_import'])}")
+
+
+def compare_startup(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {row['target']: row for row in json.load(f)['results']}
+    print(f"\n📈 Compared with {baseline_path}")
+    for row in results:
+        old = baseline.get(row['target'])
+        if not old:
+            continue
+        for key in ('import_ms', 'ready_ms'):
+            change = (row[key] / old[key] - 1) * 100 if old[key] else 0.0
+            print(f"   {row['target']:<8} {key:<10} {old[key]:>8.1f} -> {row[key]:>8.1f} ms ({change:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help="fresh processes per mode")
+    parser.add_argument('--modes', default='fast,warm-up', type=lambda value: value.split(','))
+    parser.add_argument('--states', default=TRACKER_STATES, help="recorded tracker states (JSON)")
+    parser.add_argument('--top-imports', type=int, default=10, help="slowest imports to list, 0 to skip")
+    parser.add_argument('--max-import-ms', type=float, help="fail when the median fast-start import is slower")
+    parser.add_argument('--output', help="results file (default: bench/results/startup-<time>.json)")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    unknown = set(args.modes) - set(MODES)
+    if unknown:
+        parser.error(f"unknown modes: {', '.join(sorted(unknown))}")
+
+    print(f"🚀 Actions startup benchmark: {args.runs} fresh processes per mode")
+    print("=" * 60)
+    results = []
+    for mode in args.modes:
+        row = summarize_mode(mode, [run_once(mode, args.states) for _ in range(args.runs)])
+        print_summary(row)
+        results.append(row)
+
+    if args.top_imports:
+        print(f"\n🐢 Slowest imports (fast start, cumulative)")
+        for microseconds, name in top_imports(args.top_imports):
+            print(f"   {name:<40} {microseconds / 1000:>8.1f} ms")
+
+    settings = {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')}
+    path = save_results('startup', results, settings, args.output)
+    print(f"\n💾 Results saved to {path}")
+    if args.baseline:
+        compare_startup(results, args.baseline)
+
+    fast = next((row for row in results if row['target'] == 'fast'), None)
+    if args.max_import_ms is not None and fast is not None and fast['import_ms'] > args.max_import_ms:
+        print(f"❌ Fast-start import took {fast['import_ms']:.1f} ms, over the {args.max_import_ms:.0f} ms budget")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
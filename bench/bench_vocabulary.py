@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Vocabulary Resolver Benchmark
+Compares substring matching of slot text against the catalog values with
+the compiled vocabulary resolver: how many slot values find rows, and how
+long a lookup takes.
+
+Usage: python bench/bench_vocabulary.py [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actions.attribute_index import AttributeIndex
+from actions.catalog import CatalogStore
+from actions.vocabulary import VocabularyResolver, load_slot_values
+
+# Misspelt and free-form slot text as users type it
+TYPOS = [
+    ('category', 'dreses'),
+    ('category', 'tshirt'),
+    ('category', 'sneakers'),
+    ('color', 'blak'),
+    ('color', 'navy blue'),
+    ('gender', 'woman'),
+    ('occasion', 'fromal'),
+    ('occasion', 'office'),
+    ('style_type', 'bohemain'),
+    ('season', 'wintr'),
+]
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat * 1000, result
+
+
+def report(title, queries, index, resolver, repeat):
+    print(title)
+    hits = {'substring': 0, 'resolver': 0}
+    for column, text in queries:
+        substring_ms, substring = timed(lambda: index.match(column, text), repeat)
+        resolver_ms, resolved = timed(lambda: resolver.select(index, {column: text}), repeat)
+        hits['substring'] += substring != 0
+        hits['resolver'] += resolved != 0
+        values = resolver.resolve(column, text)
+        print(f"   {column:>10}={text:<12} substring: {index.count(substring):5d} rows {substring_ms * 1000:6.1f} µs"
+              f" | resolver: {index.count(resolved):5d} rows {resolver_ms * 1000:6.1f} µs"
+              f" -> {', '.join(sorted(values)) if values else '-'}")
+    print(f"   matched: substring {hits['substring']}/{len(queries)} | resolver {hits['resolver']}/{len(queries)}")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    df = CatalogStore().get()
+    if df is None:
+        print("❌ Catalog not found. Run from the project root.")
+        return 1
+
+    index = AttributeIndex(df)
+    build_ms, resolver = timed(lambda: VocabularyResolver(df), 3)
+    print(f"📦 Catalog rows: {len(df)} | resolver build: {build_ms:.2f} ms")
+    print("=" * 72)
+
+    slot_values = [(column, value) for column, values in load_slot_values().items() for value in values]
+    report("Domain slot values", slot_values, index, resolver, args.repeat)
+    report("Typos and free text", TYPOS, index, resolver, args.repeat)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Reply Cache Slot Check
+Checks that a turn answered from the gateway's reply cache still leaves the
+slots it sets in the sender's tracker: a size guide for women, served from
+cache, followed by a recommendation must only recommend women's (or unisex)
+products. Runs the Flask gateway in-process against bench/fake_rasa.py and
+the recommendation action on the tracker the fake server kept.
+
+Exits with code 1 when the check fails.
+
+Usage: python bench/check_chat_cache.py
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_rasa import WEBHOOK_PATH, start_fake_rasa
+
+SIZE_GUIDE = "size guide for women"
+RECOMMENDATION = "tops under 200"
+
+# Catalog genders a recommendation for women may show
+WOMENS_GENDERS = {'female', 'unisex'}
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def main():
+    argparse.ArgumentParser(description=__doc__.strip().splitlines()[0]).parse_args()
+
+    fake_rasa = start_fake_rasa(latency_ms=5, gap_ms=1)
+    rasa_root = f"http://127.0.0.1:{fake_rasa.server_address[1]}"
+    os.environ['RASA_API_URL'] = rasa_root + WEBHOOK_PATH
+    os.environ['CHAT_CACHE_BACKEND'] = 'memory'
+
+    import app
+    from rasa_sdk import Tracker
+    from rasa_sdk.executor import CollectingDispatcher
+
+    from actions.actions import ActionGiveRecommendation
+    from actions.catalog import catalog_store
+
+    client = app.app.test_client()
+    failures = []
+
+    print(f"🧪 {SIZE_GUIDE!r} from a first sender, then from a second one")
+    client.post('/chat', json={'sender': 'first', 'message': SIZE_GUIDE})
+    if not wait_for(lambda: not app.chat_cache.needs_intent(SIZE_GUIDE)):
+        failures.append("the size guide reply was never classified")
+    hits = app.chat_cache.hits
+    client.post('/chat', json={'sender': 'second', 'message': SIZE_GUIDE})
+    if app.chat_cache.hits != hits + 1:
+        failures.append("the second size guide was not answered from cache")
+
+    tracker = requests.get(f"{rasa_root}/conversations/second/tracker", timeout=5).json()
+    gender = tracker['slots'].get('gender')
+    print(f"   gender slot of the second sender: {gender!r}")
+    if gender != 'women':
+        failures.append(f"cached size guide left gender={gender!r} instead of 'women'")
+
+    print(f"🧪 {RECOMMENDATION!r} from the second sender")
+    dispatcher = CollectingDispatcher()
+    ActionGiveRecommendation().run(dispatcher, Tracker.from_dict({
+        'sender_id': 'second', 'slots': tracker['slots'], 'events': [], 'paused': False,
+        'followup_action': None, 'active_form': {}, 'latest_action_name': 'action_listen',
+        'latest_message': {'text': RECOMMENDATION, 'intent': {}, 'entities': []},
+    }), {})
+    text = '\n'.join(message.get('text') or '' for message in dispatcher.messages)
+    product_ids = [int(product_id) for product_id in re.findall(r'#(\d+)', text)]
+    frame = catalog_store.get()
+    genders = frame.loc[frame['product_id'].isin(product_ids), 'gender'].astype(str).str.lower()
+    print(f"   recommended {len(product_ids)} products, genders: {sorted(set(genders))}")
+    if not product_ids:
+        failures.append("the recommendation showed no products")
+    elif not set(genders) <= WOMENS_GENDERS:
+        failures.append(f"the recommendation included {sorted(set(genders) - WOMENS_GENDERS)} products")
+
+    fake_rasa.shutdown()
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ Cached turns keep the slots they set")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
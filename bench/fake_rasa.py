@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Fake Rasa Server
+Stands in for the Rasa REST webhook so the gateway can be load-tested
+without a trained model. Replies with canned recommendation-sized bot
+messages: the first after a fixed delay, each further one after a gap.
+With ``?stream=true`` the messages are written as JSON lines as they are
+"produced", like Rasa's streaming REST mode. Each sender's tracker holds
+their latest message, classified by a few keywords, and the slots its
+entities and any appended slot events set, so the gateway's reply cache can
+be exercised.
+
+Usage: python bench/fake_rasa.py [--port N] [--latency-ms N] [--gap-ms N] [--replies N]
+"""
+
+import argparse
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+WEBHOOK_PATH = '/webhooks/rest/webhook'
+TRACKER_PATH = re.compile(r'^/conversations/([^/]+)/tracker(/events)?$')
+
+# Keyword -> intent of a message, first match wins
+PARSE_KEYWORDS = [
+    (('hello', 'hi', 'hey'), 'greet'),
+    (('bye', 'goodbye'), 'goodbye'),
+    (('help',), 'ask_help'),
+    (('size',), 'ask_size_guide'),
+    (('trend',), 'ask_trending'),
+    (('outfit',), 'ask_outfit_combination'),
+]
+
+
+def parse(text):
+    lowered = text.lower()
+    words = lowered.replace('?', ' ').replace('!', ' ').split()
+    # Whole words for short keywords, substrings ("trending") for longer ones
+    intent = next((name for keywords, name in PARSE_KEYWORDS
+                   if any(keyword in words or (len(keyword) > 3 and keyword in lowered) for keyword in keywords)),
+                  'ask_recommendation')
+    entities = [{'entity': 'gender', 'value': word} for word in words if word in ('women', 'men')]
+    return {'text': text, 'intent': {'name': intent, 'confidence': 0.95}, 'entities': entities}
+
+# Roughly the size of one recommendation card reply
+REPLY_TEXT = ("**Elegant Maxi** - Dresses\n🎨 **Style:** Striped | **Color:** Red\n"
+              "⭐ **Value Score:** 4.2/5.0 | **Rating:** 4.9/5.0\n" * 6)
+
+
+def make_handler(latency_ms, replies, gap_ms):
+    # Sender -> their latest message, parsed, and their slots
+    latest_messages = {}
+    slots = {}
+
+    def tracker(sender):
+        return {'sender_id': sender, 'latest_message': latest_messages.get(sender, {}),
+                'slots': slots.get(sender, {})}
+
+    class FakeRasaHandler(BaseHTTPRequestHandler):
+        # Keep-alive, like Rasa's Sanic server
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes; without this, Nagle's
+        # algorithm and delayed ACKs add ~40 ms to every reply
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/status':
+                self.send_json(200, {'model_file': 'fake', 'num_active_training_jobs': 0})
+            elif TRACKER_PATH.match(self.path.partition('?')[0]):
+                sender = unquote(TRACKER_PATH.match(self.path.partition('?')[0]).group(1))
+                self.send_json(200, tracker(sender))
+            else:
+                self.send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length', 0))
+            try:
+                payload = json.loads(self.rfile.read(length))
+            except ValueError:
+                self.send_json(400, {'error': 'invalid json'})
+                return
+            events = TRACKER_PATH.match(self.path.partition('?')[0])
+            if events and events.group(2):
+                sender = unquote(events.group(1))
+                for event in payload if isinstance(payload, list) else [payload]:
+                    if event.get('event') == 'slot':
+                        slots.setdefault(sender, {})[event['name']] = event.get('value')
+                self.send_json(200, tracker(sender))
+                return
+            if self.path.partition('?')[0] != WEBHOOK_PATH:
+                self.send_json(404, {'error': 'not found'})
+                return
+
+            sender = str(payload.get('sender', 'default'))
+            latest_messages[sender] = parse(payload.get('message', ''))
+            # Entities fill the slots of the same name, as the domain's slot mappings do
+            for entity in latest_messages[sender]['entities']:
+                slots.setdefault(sender, {})[entity['entity']] = entity['value']
+            messages = [{'recipient_id': sender, 'text': f"{payload.get('message', '')}\n\n{REPLY_TEXT}"}
+                        for _ in range(replies)]
+            if 'stream=true' not in self.path.partition('?')[2]:
+                time.sleep((latency_ms + gap_ms * (replies - 1)) / 1000)
+                self.send_json(200, messages)
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for number, message in enumerate(messages):
+                time.sleep((gap_ms if number else latency_ms) / 1000)
+                line = (json.dumps(message) + '\n').encode('utf-8')
+                self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+            self.wfile.write(b'0\r\n\r\n')
+
+    return FakeRasaHandler
+
+
+def start_fake_rasa(port=0, latency_ms=50.0, replies=2, gap_ms=20.0):
+    """Serve the fake webhook on a background thread; returns the server"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(latency_ms, replies, gap_ms))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=5006)
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="delay before the first bot message")
+    parser.add_argument('--gap-ms', type=float, default=20.0, help="delay before each further bot message")
+    parser.add_argument('--replies', type=int, default=2, help="bot messages per reply")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.latency_ms, args.replies, args.gap_ms))
+    server.daemon_threads = True
+    print(f"🤖 Fake Rasa webhook on http://127.0.0.1:{args.port}{WEBHOOK_PATH} "
+          f"({args.latency_ms:.0f} ms, {args.replies} replies)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
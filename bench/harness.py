@@ -0,0 +1,151 @@
+"""
+Shared helpers for the load benchmarks: a thread-pool load generator,
+latency summaries and process memory readings.
+"""
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_ROOT, 'bench', 'results')
+
+
+def rss_mb(pid=None):
+    """Resident set size of ``pid`` (this process by default) in MB"""
+    try:
+        with open(f"/proc/{pid or 'self'}/status") as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss / 1024 ** 2
+    except Exception:
+        if pid is None:
+            # Peak rather than current RSS; kilobytes on Linux, bytes on macOS
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+        return None
+
+
+def run_load(call, items, concurrency):
+    """Run ``call(item)`` for every item on ``concurrency`` threads.
+
+    ``call`` returns a dict of extra timings (or None) and raises on failure.
+    Returns (latencies_ms, extras, errors, wall_seconds).
+    """
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            extra = call(item)
+        except Exception as e:
+            return (time.perf_counter() - start) * 1000, None, repr(e)
+        return (time.perf_counter() - start) * 1000, extra, None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(timed, items))
+    wall = time.perf_counter() - start
+
+    latencies = [latency for latency, _, error in outcomes if error is None]
+    extras = [extra for _, extra, error in outcomes if error is None and extra]
+    errors = [error for _, _, error in outcomes if error is not None]
+    return latencies, extras, errors, wall
+
+
+def summarize(latencies, wall, errors=(), extras=()):
+    """Latency percentiles and throughput for one run.
+
+    Every timing in ``extras`` (dicts from ``run_load``) gets its own
+    ``<name>_p50`` / ``<name>_p95`` / ``<name>_p99`` entries.
+    """
+    summary = {
+        'requests': len(latencies) + len(errors),
+        'errors': len(errors),
+        'rps': round(len(latencies) / wall, 1) if wall else None,
+    }
+    if latencies:
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        summary.update({
+            'mean_ms': round(float(np.mean(latencies)), 3),
+            'p50_ms': round(float(p50), 3),
+            'p95_ms': round(float(p95), 3),
+            'p99_ms': round(float(p99), 3),
+            'max_ms': round(float(np.max(latencies)), 3),
+        })
+    for name in sorted({name for extra in extras for name in extra}):
+        values = [extra[name] for extra in extras if extra.get(name) is not None]
+        if values:
+            for percentile, value in zip((50, 95, 99), np.percentile(values, [50, 95, 99])):
+                summary[f'{name}_p{percentile}'] = round(float(value), 3)
+    if errors:
+        summary['first_error'] = errors[0]
+    return summary
+
+
+def print_row(target, concurrency, summary):
+    line = (f"   {target:<28} c={concurrency:<4} {summary.get('rps') or 0:>9.1f} req/s | "
+            f"p50 {summary.get('p50_ms', 0):>8.2f} ms | p95 {summary.get('p95_ms', 0):>8.2f} ms | "
+            f"p99 {summary.get('p99_ms', 0):>8.2f} ms")
+    if 'first_message_ms_p50' in summary:
+        line += (f" | first message p50 {summary['first_message_ms_p50']:.2f} ms"
+                 f" p95 {summary['first_message_ms_p95']:.2f} ms")
+    if summary.get('rss_mb') is not None:
+        line += f" | RSS {summary['rss_mb']:.0f} MB"
+    if summary.get('errors'):
+        line += f" | ❌ {summary['errors']} errors"
+    print(line)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(kind, results, settings, output=None):
+    """Write a run's results as JSON; returns the path written"""
+    timestamp = datetime.now()
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{kind}-{timestamp:%Y%m%d-%H%M%S}.json")
+    report = {
+        'benchmark': kind,
+        'timestamp': timestamp.isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'settings': settings,
+        'results': results,
+    }
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    return output
+
+
+def compare(results, baseline_path):
+    """Print p95 and throughput changes against a saved run"""
+    with open(baseline_path) as f:
+        baseline = {(row['target'], row['concurrency']): row for row in json.load(f)['results']}
+    print(f"\n📈 Compared with {baseline_path}")
+    for row in results:
+        old = baseline.get((row['target'], row['concurrency']))
+        if not old or 'p95_ms' not in row or 'p95_ms' not in old:
+            continue
+        p95_change = (row['p95_ms'] / old['p95_ms'] - 1) * 100 if old['p95_ms'] else 0.0
+        rps_change = (row['rps'] / old['rps'] - 1) * 100 if old.get('rps') else 0.0
+        print(f"   {row['target']:<28} c={row['concurrency']:<4} "
+              f"p95 {p95_change:+6.1f}% | req/s {rps_change:+6.1f}%")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Conversation Replay
+Replays logged (sender, message) pairs against the gateway through
+/chat/batch and writes every reply with its timings, for regression checks
+and offline evaluation.
+
+Input is JSON lines, one {"sender": ..., "message": ...} object per line,
+in conversation order.
+
+Usage: python bench/replay.py conversations.jsonl [--url URL] [--batch-size N] [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import requests
+
+
+def read_items(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('input', help="conversation log (JSON lines)")
+    parser.add_argument('--url', default='http://localhost:5050', help="gateway base URL")
+    parser.add_argument('--batch-size', type=int, default=1000,
+                        help="items per request; a sender's messages may span batches and stay in order")
+    parser.add_argument('--output', help="replies as JSON lines (default: <input>.replies.jsonl)")
+    args = parser.parse_args()
+
+    items = read_items(args.input)
+    output = args.output or f"{os.path.splitext(args.input)[0]}.replies.jsonl"
+    print(f"🔁 Replaying {len(items)} messages against {args.url} in batches of {args.batch_size}")
+
+    start = time.perf_counter()
+    elapsed = []
+    errors = 0
+    session = requests.Session()
+    with open(output, 'w') as out:
+        for offset in range(0, len(items), args.batch_size):
+            batch = items[offset:offset + args.batch_size]
+            response = session.post(f"{args.url}/chat/batch", json={'items': batch}, timeout=3600)
+            if response.status_code != 200:
+                print(f"❌ Batch at {offset} failed with HTTP {response.status_code}: {response.text[:200]}")
+                return 1
+            body = response.json()
+            for result in body['results']:
+                result['index'] += offset
+                out.write(json.dumps(result) + '\n')
+                elapsed.append(result['elapsed_ms'])
+            errors += body['errors']
+            print(f"   {offset + len(batch)}/{len(items)} | {body['senders']} senders | {body['total_ms'] / 1000:.1f}s")
+
+    wall = time.perf_counter() - start
+    p50, p95 = np.percentile(elapsed, [50, 95]) if elapsed else (0, 0)
+    print("=" * 60)
+    print(f"✅ {len(items)} messages in {wall:.1f}s ({len(items) / wall:.1f} msg/s) | "
+          f"per message p50 {p50:.0f} ms, p95 {p95:.0f} ms | {errors} errors")
+    print(f"💾 Replies saved to {output}")
+    return 0 if errors == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
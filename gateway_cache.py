@@ -0,0 +1,291 @@
+"""
+Reply cache for stateless chat turns.
+
+Greetings, help and size guides get the same reply whatever the
+conversation so far, yet each one still costs a Rasa turn and usually an
+action-server call. The gateway keeps those replies, keyed on normalized
+message text plus the entities that change the reply, and answers repeats
+without calling Rasa.
+
+Whether a message is cacheable is decided by its intent. The gateway only
+learns the intent after the first reply, from the sender's tracker, which
+holds how Rasa understood the message it just handled; this costs no extra
+NLU work and happens once per distinct message text. Messages whose intent
+is not allowlisted are remembered as uncacheable and always go to Rasa.
+
+Served from cache, a turn bypasses Rasa's tracker: it is not added to the
+conversation. The slots its entities fill are the exception: for the
+entities in ``CONTEXT_ENTITIES`` the gateway sets the slot of the same name
+in the sender's tracker before answering ("size guide for women" still
+leaves ``gender`` set for the next recommendation), and a message with any
+other entity is not cached. Only allowlist intents whose turns the rest of
+the conversation does not otherwise depend on, and whose replies do not
+vary (fallbacks pick a random reply, so caching one would pin it for
+everyone).
+
+Backends (``CHAT_CACHE_BACKEND``):
+
+- ``memory``: in-process LRU (default)
+- ``disk``: SQLite file shared by the workers on one host
+- ``redis``: shared across hosts; needs the ``redis`` package. Eviction is
+  left to the server's ``maxmemory-policy``.
+- ``off``: no caching
+"""
+
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Text, Tuple
+
+from actions.response_cache import LRUCache
+
+CHAT_CACHE_BACKEND = os.getenv('CHAT_CACHE_BACKEND', 'memory')
+CHAT_CACHE_SIZE = int(os.getenv('CHAT_CACHE_SIZE', '2048'))
+
+# Seconds a cached reply stays valid; 0 keeps it until evicted
+CHAT_CACHE_TTL = float(os.getenv('CHAT_CACHE_TTL', '3600'))
+
+CHAT_CACHE_PATH = os.getenv('CHAT_CACHE_PATH', 'data/chat_cache.sqlite')
+CHAT_CACHE_URL = os.getenv('CHAT_CACHE_URL', 'redis://localhost:6379/0')
+
+# Most keys counted for the size of a Redis store on /status
+REDIS_COUNT_LIMIT = 10000
+
+DEFAULT_CACHEABLE_INTENTS = 'greet,goodbye,ask_help,ask_size_guide'
+CACHEABLE_INTENTS = [intent.strip() for intent in
+                     os.getenv('CHAT_CACHE_INTENTS', DEFAULT_CACHEABLE_INTENTS).split(',') if intent.strip()]
+
+# Entities an intent's reply depends on, each filling the slot of the same
+# name. The entity has to be in the message itself: if it might come from an
+# earlier turn instead, the reply depends on conversation state the gateway
+# cannot see and the turn is not cached. Replies served from cache set these
+# slots in the sender's tracker; messages with other entities are not cached.
+CONTEXT_ENTITIES = {
+    'ask_size_guide': ('gender',),
+}
+
+# Below this NLU confidence the intent is not trusted for caching
+MIN_CONFIDENCE = 0.6
+
+# Marks a message text learned to be uncacheable; cacheable ones map to (reply key, slots)
+UNCACHEABLE = ()
+
+
+def normalize_text(text: Text) -> Text:
+    """Lowercase, drop surrounding punctuation and collapse whitespace"""
+    return ' '.join(text.lower().split()).strip(' .!?,')
+
+
+class MemoryBackend(LRUCache):
+    """In-process LRU reply store"""
+    name = 'memory'
+
+
+class SqliteBackend:
+    """LRU reply store in a SQLite file, shared by processes on one host"""
+    name = 'disk'
+
+    def __init__(self, path: Text = CHAT_CACHE_PATH, maxsize: int = CHAT_CACHE_SIZE, ttl: float = CHAT_CACHE_TTL):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.evictions = 0
+        self._local = threading.local()
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS replies "
+                               "(key TEXT PRIMARY KEY, value TEXT, stored REAL, used REAL)")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = sqlite3.connect(self.path, timeout=5)
+        return connection
+
+    def get(self, key: Text) -> Optional[Any]:
+        now = time.time()
+        with self._connection() as connection:
+            row = connection.execute("SELECT value, stored FROM replies WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if self.ttl > 0 and now - row[1] >= self.ttl:
+                connection.execute("DELETE FROM replies WHERE key = ?", (key,))
+                return None
+            connection.execute("UPDATE replies SET used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: Text, value: Any) -> None:
+        now = time.time()
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO replies VALUES (?, ?, ?, ?)",
+                               (key, json.dumps(value), now, now))
+            excess = connection.execute("SELECT COUNT(*) FROM replies").fetchone()[0] - self.maxsize
+            if excess > 0:
+                connection.execute("DELETE FROM replies WHERE key IN "
+                                   "(SELECT key FROM replies ORDER BY used LIMIT ?)", (excess,))
+                self.evictions += excess
+
+    def clear(self) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM replies")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM replies").fetchone()[0]
+
+
+class RedisBackend:
+    """Reply store shared across hosts; entries expire after ``ttl``"""
+    name = 'redis'
+
+    def __init__(self, url: Text = CHAT_CACHE_URL, ttl: float = CHAT_CACHE_TTL, prefix: Text = 'chat-cache:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.evictions = None
+
+    def get(self, key: Text) -> Optional[Any]:
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def put(self, key: Text, value: Any) -> None:
+        self.client.set(self.prefix + key, json.dumps(value), ex=int(self.ttl) if self.ttl > 0 else None)
+
+    def clear(self) -> None:
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+    def __len__(self) -> int:
+        """Cached replies, counted up to ``REDIS_COUNT_LIMIT`` so a large keyspace is not scanned through"""
+        keys = self.client.scan_iter(self.prefix + '*', count=1000)
+        return sum(1 for _ in itertools.islice(keys, REDIS_COUNT_LIMIT))
+
+
+def make_backend(name: Text = CHAT_CACHE_BACKEND):
+    if name == 'off':
+        return None
+    if name == 'memory':
+        return MemoryBackend(CHAT_CACHE_SIZE, CHAT_CACHE_TTL)
+    if name == 'disk':
+        return SqliteBackend()
+    if name == 'redis':
+        return RedisBackend()
+    raise ValueError(f"Unknown CHAT_CACHE_BACKEND {name!r}; expected memory, disk, redis or off")
+
+
+class ChatCache:
+    """Caches Rasa's replies for turns whose intent is on the allowlist"""
+
+    def __init__(self, backend=None, intents: List[Text] = CACHEABLE_INTENTS,
+                 context_entities: Dict[Text, Tuple[Text, ...]] = CONTEXT_ENTITIES):
+        self.backend = backend
+        self.intents = set(intents)
+        self.context_entities = context_entities
+        # Normalized text -> reply cache key, or UNCACHEABLE
+        self._keys = LRUCache(maxsize=CHAT_CACHE_SIZE * 8, ttl=0)
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.stores = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.backend is not None
+
+    def get(self, text: Text) -> Optional[List[Dict[Text, Any]]]:
+        """Return the cached bot responses for ``text``, or None to ask Rasa.
+
+        Before using them, set the turn's ``slot_events`` in the sender's tracker.
+        """
+        if not self.enabled:
+            return None
+        learned = self._keys.get(normalize_text(text))
+        if learned == UNCACHEABLE:
+            self.bypasses += 1
+            return None
+        replies = self.backend.get(learned[0]) if learned is not None else None
+        if replies is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return replies
+
+    def slot_events(self, text: Text) -> List[Dict[Text, Any]]:
+        """Tracker events setting the slots Rasa would have filled from ``text``'s entities"""
+        learned = self._keys.get(normalize_text(text))
+        if not learned:
+            return []
+        return [{'event': 'slot', 'name': name, 'value': value} for name, value in learned[1]]
+
+    def needs_intent(self, text: Text) -> bool:
+        """True until the text's intent is known; see ``learn``"""
+        return self.enabled and self._keys.get(normalize_text(text)) is None
+
+    def learn(self, text: Text, parse: Dict[Text, Any], replies: List[Dict[Text, Any]]) -> bool:
+        """Record a reply together with Rasa's NLU parse of ``text``.
+
+        ``parse`` is the tracker's latest message; if the sender has moved on
+        to another message since, nothing is learned. Stores the reply when
+        the intent is cacheable; remembers the text as uncacheable otherwise.
+        Returns True if the reply was stored.
+        """
+        normalized = normalize_text(text)
+        if normalize_text(parse.get('text') or '') != normalized:
+            return False
+        learned = self._learned(normalized, parse)
+        self._keys.put(normalized, learned)
+        if learned == UNCACHEABLE or not replies:
+            return False
+        self.backend.put(learned[0], replies)
+        self.stores += 1
+        return True
+
+    def store(self, text: Text, replies: List[Dict[Text, Any]]) -> bool:
+        """Store a fresh reply for a text already known to be cacheable"""
+        learned = self._keys.get(normalize_text(text))
+        if not self.enabled or not learned or not replies:
+            return False
+        self.backend.put(learned[0], replies)
+        self.stores += 1
+        return True
+
+    def _learned(self, normalized: Text, parse: Dict[Text, Any]):
+        """(reply key, slots the turn sets) for a cacheable parse, else UNCACHEABLE"""
+        intent = parse.get('intent') or {}
+        if intent.get('name') not in self.intents or (intent.get('confidence') or 0) < MIN_CONFIDENCE:
+            return UNCACHEABLE
+        entities = {entity.get('entity'): entity.get('value') for entity in parse.get('entities', [])}
+        names = self.context_entities.get(intent['name'], ())
+        if any(entities.get(name) is None for name in names) or set(entities) - set(names):
+            return UNCACHEABLE
+        slots = tuple((name, entities[name]) for name in names)
+        context = [f"{name}={str(value).lower()}" for name, value in slots]
+        return '|'.join([intent['name'], normalized] + context), slots
+
+    def clear(self) -> None:
+        self._keys.clear()
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self) -> Dict[Text, Any]:
+        """Return cache metrics for /status"""
+        if not self.enabled:
+            return {'backend': 'off'}
+        lookups = self.hits + self.misses
+        return {
+            'backend': self.backend.name,
+            'intents': sorted(self.intents),
+            'size': len(self.backend),
+            'known_texts': len(self._keys),
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypasses': self.bypasses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'stores': self.stores,
+            'evictions': self.backend.evictions,
+        }
@@ -0,0 +1,330 @@
+"""
+Pooled HTTP clients for the gateway's calls to the Rasa server.
+
+Both clients keep connections to Rasa alive between messages instead of
+opening one per request, bound connect and read time separately, and retry
+failures that are safe to repeat with jittered exponential backoff: those
+before a connection was made, and the statuses in ``RETRY_STATUSES``. Once
+the message may have reached Rasa (a dropped connection, a read timeout) the
+error is raised instead, so a message is never handled twice.
+
+``RasaClient`` is used by the Flask app (one shared session for every worker
+thread); ``AsyncRasaClient`` by the ASGI entry point in ``asgi.py``.
+
+``stream`` uses the REST channel's ``?stream=true`` mode, in which Rasa
+writes each bot message as a line of JSON as soon as it is produced.
+
+Every call's round trip, retries and errors are recorded in the metrics
+registry the gateway serves on ``/metrics``.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, List, Text
+from urllib.parse import quote, urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+from actions.metrics import registry
+
+RASA_API_URL = os.getenv('RASA_API_URL', 'http://localhost:5006/webhooks/rest/webhook')
+RASA_STATUS_URL = os.getenv('RASA_STATUS_URL', urljoin(RASA_API_URL, '/status'))
+RASA_TRACKER_URL = os.getenv('RASA_TRACKER_URL', urljoin(RASA_API_URL, '/conversations/{sender}/tracker'))
+
+# Keep-alive connections held open to Rasa
+RASA_POOL_SIZE = int(os.getenv('RASA_POOL_SIZE', '32'))
+
+# Upper bound on simultaneous connections in async mode; requests beyond it
+# wait for a free connection instead of failing
+RASA_MAX_CONNECTIONS = int(os.getenv('RASA_MAX_CONNECTIONS', '1000'))
+
+RASA_CONNECT_TIMEOUT = float(os.getenv('RASA_CONNECT_TIMEOUT', '3.05'))
+RASA_READ_TIMEOUT = float(os.getenv('RASA_READ_TIMEOUT', '15'))
+
+# Extra attempts after the first, and the base delay between them in seconds
+RASA_RETRIES = int(os.getenv('RASA_RETRIES', '2'))
+RASA_RETRY_BACKOFF = float(os.getenv('RASA_RETRY_BACKOFF', '0.2'))
+RASA_RETRY_BACKOFF_MAX = 2.0
+
+# Statuses returned before Rasa processed the message, so a retry cannot
+# deliver it twice
+RETRY_STATUSES = (502, 503, 504)
+
+# The tracker's state without its event history, which can be long
+TRACKER_PARAMS = {'include_events': 'NONE'}
+
+rasa_seconds = registry.histogram('gateway_rasa_seconds', "Round trip of calls to Rasa, retries included", ('call',))
+rasa_first_message_seconds = registry.histogram(
+    'gateway_rasa_first_message_seconds', "Time until Rasa streams its first bot message")
+rasa_errors = registry.counter('gateway_rasa_errors_total', "Failed calls to Rasa", ('call', 'error'))
+rasa_retries = registry.counter('gateway_rasa_retries_total', "Retried attempts to post a message to Rasa")
+
+
+class RasaStatusError(requests.exceptions.RequestException):
+    """Rasa answered with a non-200 status"""
+
+    def __init__(self, status_code: int):
+        super().__init__(f"Rasa server returned status {status_code}")
+        self.status_code = status_code
+
+
+@contextmanager
+def rasa_call(call: Text) -> Iterator[None]:
+    """Time a call to Rasa and count it as failed if it raises"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        rasa_errors.inc(call=call, error=type(e).__name__)
+        raise
+    finally:
+        rasa_seconds.observe(time.perf_counter() - start, call=call)
+
+
+def connect_failed(error: requests.exceptions.ConnectionError) -> bool:
+    """True if ``error`` happened while connecting, before any of the request was sent"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, (NewConnectionError, ConnectTimeoutError))
+
+
+def tracker_url(template: Text, sender: Text) -> Text:
+    return template.format(sender=quote(str(sender), safe=''))
+
+
+def backoff_delay(attempt: int, base: float = RASA_RETRY_BACKOFF) -> float:
+    """Delay before retry ``attempt`` (0-based): exponential with full jitter"""
+    return random.uniform(0, min(RASA_RETRY_BACKOFF_MAX, base * 2 ** attempt))
+
+
+class RasaClient:
+    """Blocking client sharing one keep-alive connection pool across threads.
+
+    Failures to connect and 502/503/504 answers are retried. Dropped
+    connections and read timeouts are not: by then Rasa may already have
+    handled the message.
+    """
+
+    def __init__(self, url: Text = RASA_API_URL, status_url: Text = RASA_STATUS_URL,
+                 pool_size: int = RASA_POOL_SIZE, connect_timeout: float = RASA_CONNECT_TIMEOUT,
+                 read_timeout: float = RASA_READ_TIMEOUT, retries: int = RASA_RETRIES,
+                 tracker_url: Text = RASA_TRACKER_URL):
+        self.url = url
+        self.status_url = status_url
+        self.tracker_url = tracker_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def _post(self, sender: Text, message: Text, stream: bool = False) -> requests.Response:
+        """Post a user message, retrying what is safe to retry; returns a 200 response"""
+        payload = {'sender': sender, 'message': message}
+        params = {'stream': 'true'} if stream else None
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                response = self.session.post(self.url, params=params, json=payload,
+                                             timeout=self.timeout, stream=stream)
+            except requests.exceptions.ConnectionError as e:
+                if last_attempt or not connect_failed(e):
+                    raise
+            else:
+                if response.status_code == 200:
+                    return response
+                response.close()
+                if last_attempt or response.status_code not in RETRY_STATUSES:
+                    raise RasaStatusError(response.status_code)
+            rasa_retries.inc()
+            time.sleep(backoff_delay(attempt))
+
+    def send(self, sender: Text, message: Text) -> List[Dict[Text, Any]]:
+        """Post a user message and return Rasa's bot responses"""
+        with rasa_call('send'):
+            return self._post(sender, message).json()
+
+    def stream(self, sender: Text, message: Text) -> Iterator[Dict[Text, Any]]:
+        """Post a user message and yield Rasa's bot responses as they are produced"""
+        start = time.perf_counter()
+        received = False
+        with rasa_call('stream'), self._post(sender, message, stream=True) as response:
+            for line in response.iter_lines():
+                if line.strip():
+                    if not received:
+                        received = True
+                        rasa_first_message_seconds.observe(time.perf_counter() - start)
+                    yield json.loads(line)
+
+    def latest_message(self, sender: Text) -> Dict[Text, Any]:
+        """The sender's last user message as Rasa understood it: text, intent and entities"""
+        with rasa_call('tracker'):
+            response = self.session.get(tracker_url(self.tracker_url, sender), params=TRACKER_PARAMS,
+                                        timeout=self.timeout)
+            if response.status_code != 200:
+                raise RasaStatusError(response.status_code)
+            return response.json().get('latest_message') or {}
+
+    def append_events(self, sender: Text, events: List[Dict[Text, Any]]) -> None:
+        """Add ``events`` (e.g. slots set) to the sender's tracker without running a turn"""
+        with rasa_call('events'):
+            response = self.session.post(tracker_url(self.tracker_url, sender) + '/events', params=TRACKER_PARAMS,
+                                         json=events, timeout=self.timeout)
+            response.close()
+            if response.status_code != 200:
+                raise RasaStatusError(response.status_code)
+
+    def status(self) -> Text:
+        """'connected', 'error' or 'disconnected'"""
+        try:
+            response = self.session.get(self.status_url, timeout=(self.timeout[0], 5))
+            return 'connected' if response.status_code == 200 else 'error'
+        except requests.exceptions.RequestException:
+            return 'disconnected'
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class AsyncRasaClient:
+    """Non-blocking counterpart of ``RasaClient`` built on httpx.
+
+    Errors are raised as the matching ``requests`` exceptions so callers
+    handle both clients the same way.
+    """
+
+    def __init__(self, url: Text = RASA_API_URL, status_url: Text = RASA_STATUS_URL,
+                 pool_size: int = RASA_POOL_SIZE, max_connections: int = RASA_MAX_CONNECTIONS,
+                 connect_timeout: float = RASA_CONNECT_TIMEOUT, read_timeout: float = RASA_READ_TIMEOUT,
+                 retries: int = RASA_RETRIES, tracker_url: Text = RASA_TRACKER_URL):
+        import httpx
+
+        self.url = url
+        self.status_url = status_url
+        self.tracker_url = tracker_url
+        self.retries = retries
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=pool_size),
+            # No pool timeout: a request waiting for a free connection is queued, not failed
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout, pool=None),
+        )
+
+    async def _post(self, sender: Text, message: Text, stream: bool = False):
+        """Post a user message, retrying what is safe to retry; returns a 200 response.
+
+        The body is not read yet: the caller reads it and closes the response.
+        """
+        import httpx
+
+        payload = {'sender': sender, 'message': message}
+        params = {'stream': 'true'} if stream else None
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                request = self.client.build_request('POST', self.url, params=params, json=payload)
+                response = await self.client.send(request, stream=True)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if last_attempt:
+                    raise _as_requests_error(e) from e
+            except httpx.HTTPError as e:
+                raise _as_requests_error(e) from e
+            else:
+                if response.status_code == 200:
+                    return response
+                await response.aclose()
+                if last_attempt or response.status_code not in RETRY_STATUSES:
+                    raise RasaStatusError(response.status_code)
+            rasa_retries.inc()
+            await asyncio.sleep(backoff_delay(attempt))
+
+    async def send(self, sender: Text, message: Text) -> List[Dict[Text, Any]]:
+        """Post a user message and return Rasa's bot responses"""
+        import httpx
+
+        with rasa_call('send'):
+            response = await self._post(sender, message)
+            try:
+                return json.loads(await response.aread())
+            except httpx.HTTPError as e:
+                raise _as_requests_error(e) from e
+            finally:
+                await response.aclose()
+
+    async def stream(self, sender: Text, message: Text) -> AsyncIterator[Dict[Text, Any]]:
+        """Post a user message and yield Rasa's bot responses as they are produced"""
+        import httpx
+
+        start = time.perf_counter()
+        received = False
+        with rasa_call('stream'):
+            response = await self._post(sender, message, stream=True)
+            try:
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        if not received:
+                            received = True
+                            rasa_first_message_seconds.observe(time.perf_counter() - start)
+                        yield json.loads(line)
+            except httpx.HTTPError as e:
+                raise _as_requests_error(e) from e
+            finally:
+                await response.aclose()
+
+    async def latest_message(self, sender: Text) -> Dict[Text, Any]:
+        """The sender's last user message as Rasa understood it: text, intent and entities"""
+        import httpx
+
+        with rasa_call('tracker'):
+            try:
+                response = await self.client.get(tracker_url(self.tracker_url, sender), params=TRACKER_PARAMS)
+            except httpx.HTTPError as e:
+                raise _as_requests_error(e) from e
+            if response.status_code != 200:
+                raise RasaStatusError(response.status_code)
+            return response.json().get('latest_message') or {}
+
+    async def append_events(self, sender: Text, events: List[Dict[Text, Any]]) -> None:
+        """Add ``events`` (e.g. slots set) to the sender's tracker without running a turn"""
+        import httpx
+
+        with rasa_call('events'):
+            try:
+                response = await self.client.post(tracker_url(self.tracker_url, sender) + '/events',
+                                                  params=TRACKER_PARAMS, json=events)
+            except httpx.HTTPError as e:
+                raise _as_requests_error(e) from e
+            if response.status_code != 200:
+                raise RasaStatusError(response.status_code)
+
+    async def status(self) -> Text:
+        """'connected', 'error' or 'disconnected'"""
+        import httpx
+
+        try:
+            response = await self.client.get(self.status_url, timeout=5)
+            return 'connected' if response.status_code == 200 else 'error'
+        except httpx.HTTPError:
+            return 'disconnected'
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def _as_requests_error(error: Exception) -> requests.exceptions.RequestException:
+    import httpx
+
+    if isinstance(error, httpx.ConnectTimeout):
+        return requests.exceptions.ConnectTimeout(str(error))
+    if isinstance(error, (httpx.ConnectError, httpx.RemoteProtocolError)):
+        return requests.exceptions.ConnectionError(str(error))
+    if isinstance(error, httpx.TimeoutException):
+        return requests.exceptions.ReadTimeout(str(error))
+    return requests.exceptions.RequestException(str(error))
@@ -1,183 +1,399 @@
 #!/usr/bin/env python3
 """
 Fashion Chatbot Startup Script
-This script starts both the Rasa server and the web interface.
+This script starts the Rasa actions server, the Rasa server and the web
+interface together, waits until each one answers its readiness probe, and
+restarts any of them that crashes afterwards.
+
+With --supervisor it runs several web interface and action server workers
+instead, each pinned to a CPU core, behind local least-connections
+balancers on the usual ports. Per-worker load is served as JSON on
+http://localhost:5058/workers and as Prometheus metrics on /metrics.
 """
 
+import argparse
 import subprocess
 import time
 import sys
 import os
 import signal
 import requests
-from threading import Thread
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, Thread
 
-class ChatbotStarter:
-    def __init__(self):
-        self.rasa_process = None
-        self.web_process = None
-        self.running = True
-        
-    def start_rasa_server(self):
-        """Start the Rasa server"""
-        print("🤖 Starting Rasa server...")
+from actions.metrics import admin_routes, registry, serve as serve_metrics
+from balancer import Balancer
+
+# Seconds each service may take to answer its readiness probe; Rasa loads its model first
+READY_TIMEOUT = float(os.getenv('STARTUP_READY_TIMEOUT', '180'))
+
+# Readiness probes back off from the first to the longest delay, in seconds
+PROBE_DELAY = 0.1
+PROBE_MAX_DELAY = 2.0
+PROBE_TIMEOUT = 2.0
+
+# Delay before restarting a crashed service, doubled after every crash up to the maximum
+RESTART_DELAY = 1.0
+RESTART_MAX_DELAY = 60.0
+# Seconds a restarted service has to stay up before its crashes are forgotten
+STABLE_SECONDS = 30.0
+
+# Seconds between checks that the services are still running
+MONITOR_INTERVAL = 0.5
+
+# Seconds a service gets to exit after SIGTERM before it is killed
+STOP_TIMEOUT = 10.0
+
+# Supervisor mode: public ports stay the same, workers listen from these ports up
+GATEWAY_PORT = 5050
+ACTIONS_PORT = 5055
+GATEWAY_WORKER_PORT = 5100
+ACTION_WORKER_PORT = 5200
+ACTION_WORKER_METRICS_PORT = 5300
+REPORT_PORT = 5058
+
+CLOCK_TICKS = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+
+print_lock = Lock()
+
+
+def log(message):
+    with print_lock:
+        print(message, flush=True)
+
+
+def available_cores():
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def process_usage(pid):
+    """(CPU seconds, RSS in MB) of a process and its children, from /proc; None where unavailable"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            children = [int(child) for child in f.read().split()]
+    except (OSError, ValueError):
+        return None
+    # utime and stime, then RSS in pages
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+    rss_mb = int(fields[21]) * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+    for child in children:
+        usage = process_usage(child)
+        if usage is not None:
+            cpu_seconds += usage[0]
+            rss_mb += usage[1]
+    return cpu_seconds, rss_mb
+
+
+class Service:
+    """A child process the starter keeps running"""
+
+    def __init__(self, name, label, command, ready_urls, env=None, cores=None):
+        self.name = name
+        self.label = label
+        self.command = command
+        self.ready_urls = ready_urls
+        self.env = env
+        self.cores = cores
+        self.process = None
+        self.started_at = None
+        self.ready_seconds = None
+        self.crashes = 0
+        self.restarts = 0
+        self.restart_at = None
+
+    def start(self):
+        """Start the process and stream its output; False if it could not be started"""
+        env = dict(os.environ, PYTHONUNBUFFERED='1', **(self.env or {}))
         try:
-            # Start Rasa server with actions
-            self.rasa_process = subprocess.Popen([
-                'rasa', 'run', '--enable-api', '--cors', '*', '--port', '5005'
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Wait a bit for Rasa to start
-            time.sleep(5)
-            
-            # Check if Rasa is running
-            try:
-                response = requests.get('http://localhost:5005/status', timeout=5)
-                if response.status_code == 200:
-                    print("✅ Rasa server is running on http://localhost:5005")
-                    return True
-                else:
-                    print("❌ Rasa server failed to start properly")
-                    return False
-            except:
-                print("❌ Rasa server failed to start")
-                return False
-                
-        except Exception as e:
-            print(f"❌ Error starting Rasa server: {e}")
+            self.process = subprocess.Popen(
+                self.command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+                env=env, text=True, bufsize=1, errors='replace',
+                # Own process group, so stopping it also stops the children it spawns
+                start_new_session=(os.name == 'posix'))
+        except OSError as e:
+            log(f"❌ Could not start {self.label}: {e}")
+            self.process = None
+            return False
+        self.started_at = time.monotonic()
+        self.restart_at = None
+        if self.cores and hasattr(os, 'sched_setaffinity'):
+            os.sched_setaffinity(self.process.pid, self.cores)
+        Thread(target=self.stream_output, args=(self.process,), name=f'{self.name}-log', daemon=True).start()
+        return True
+
+    def stream_output(self, process):
+        """Echo the child's output line by line, so a full pipe never blocks it"""
+        for line in process.stdout:
+            log(f"[{self.name}] {line.rstrip()}")
+        process.stdout.close()
+
+    @property
+    def running(self):
+        return self.process is not None and self.process.poll() is None
+
+    def probe(self):
+        try:
+            return all(requests.get(url, timeout=PROBE_TIMEOUT).status_code == 200 for url in self.ready_urls)
+        except requests.exceptions.RequestException:
             return False
-    
-    def start_web_interface(self):
-        """Start the web interface"""
-        print("🌐 Starting web interface...")
+
+    def wait_until_ready(self, timeout=READY_TIMEOUT):
+        """Probe with exponential backoff until the service answers, exits or runs out of time"""
+        deadline = time.monotonic() + timeout
+        delay = PROBE_DELAY
+        while time.monotonic() < deadline:
+            if not self.running:
+                code = self.process.returncode if self.process else None
+                log(f"❌ {self.label} exited before it was ready (exit code {code})")
+                return False
+            if self.probe():
+                self.ready_seconds = time.monotonic() - self.started_at
+                log(f"✅ {self.label} is ready on {', '.join(self.ready_urls)} after {self.ready_seconds:.1f}s")
+                return True
+            time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(delay * 2, PROBE_MAX_DELAY)
+        log(f"❌ {self.label} not ready after {timeout:.0f}s")
+        return False
+
+    def supervise(self, now):
+        """Restart the service with backoff if it has crashed"""
+        if self.running:
+            if self.crashes and now - self.started_at >= STABLE_SECONDS:
+                self.crashes = 0
+            return
+        if self.restart_at is None:
+            delay = min(RESTART_DELAY * 2 ** self.crashes, RESTART_MAX_DELAY)
+            self.crashes += 1
+            self.restart_at = now + delay
+            code = self.process.returncode if self.process else None
+            log(f"⚠️ {self.label} stopped (exit code {code}); restarting in {delay:.0f}s")
+        elif now >= self.restart_at:
+            log(f"🔄 Restarting {self.label}...")
+            self.restarts += 1
+            if not self.start():
+                self.restart_at = None
+
+    def stats(self):
+        usage = process_usage(self.process.pid) if self.running else None
+        return {
+            'pid': self.process.pid if self.running else None,
+            'cores': sorted(self.cores) if self.cores else None,
+            'running': self.running,
+            'restarts': self.restarts,
+            'ready_seconds': round(self.ready_seconds, 2) if self.ready_seconds is not None else None,
+            'cpu_seconds': round(usage[0], 2) if usage else None,
+            'rss_mb': round(usage[1], 1) if usage else None,
+        }
+
+    def stop(self):
+        if not self.running:
+            return
+        log(f"🛑 Stopping {self.label}...")
+        self.signal(signal.SIGTERM)
+        try:
+            self.process.wait(STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            self.signal(signal.SIGKILL if os.name == 'posix' else signal.SIGTERM)
+            self.process.wait()
+
+    def signal(self, signum):
         try:
-            # Start Flask web interface
-            self.web_process = subprocess.Popen([
-                sys.executable, 'app.py'
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            
-            # Wait a bit for web interface to start
-            time.sleep(3)
-            
-            # Check if web interface is running
+            if os.name == 'posix':
+                os.killpg(self.process.pid, signum)
+            else:
+                self.process.terminate()
+        except ProcessLookupError:
+            pass
+
+
+def flask_command(port):
+    # Without the debug reloader, which would run the app in a second process
+    return [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--host', '0.0.0.0', '--port', str(port),
+            '--with-threads', '--no-reload']
+
+
+RASA_COMMAND = ['rasa', 'run', '--enable-api', '--cors', '*', '--port', '5005']
+
+
+class ChatbotStarter:
+    def __init__(self, supervisor=False, gateway_workers=1, action_workers=1, pin_cores=True):
+        self.supervisor = supervisor
+        self.balancers = []
+        if supervisor:
+            self.services, self.balancers = self.worker_services(gateway_workers, action_workers, pin_cores)
+        else:
+            self.services = [
+                Service('actions', 'Rasa actions server', [sys.executable, '-m', 'actions.server'],
+                        ['http://localhost:5055/health']),
+                Service('rasa', 'Rasa server', RASA_COMMAND, ['http://localhost:5005/status']),
+                Service('web', 'Web interface', flask_command(GATEWAY_PORT), ['http://localhost:5050/status']),
+            ]
+        self.running = True
+
+    def worker_services(self, gateway_workers, action_workers, pin_cores):
+        """Worker processes and the balancers in front of them, for supervisor mode"""
+        cores = available_cores() if pin_cores else []
+        gateway_ports = [GATEWAY_WORKER_PORT + index for index in range(gateway_workers)]
+        action_ports = [ACTION_WORKER_PORT + index for index in range(action_workers)]
+        # Gateway workers take the first cores, action workers the next ones
+        assigned = [cores[index % len(cores)] for index in range(gateway_workers + action_workers)] if cores else []
+        gateway_cores = [{core} for core in assigned[:gateway_workers]] or [None] * gateway_workers
+        action_cores = assigned[gateway_workers:]
+
+        services = [Service('actions', f'Rasa actions server ({action_workers} workers)',
+                            [sys.executable, '-m', 'actions.prefork', '--workers', str(action_workers),
+                             '--port', str(ACTION_WORKER_PORT), '--metrics-port', str(ACTION_WORKER_METRICS_PORT),
+                             '--cores', ','.join(map(str, action_cores))],
+                            [f'http://localhost:{port}/health' for port in action_ports]),
+                    Service('rasa', 'Rasa server', RASA_COMMAND, ['http://localhost:5005/status'])]
+        # Gateway workers search through the first action worker's metrics port
+        search_env = {'FASHION_SEARCH_URL': f'http://localhost:{ACTION_WORKER_METRICS_PORT}/search'}
+        services += [Service(f'web-{index}', f'Web interface worker {index}', flask_command(port),
+                             [f'http://localhost:{port}/status'], env=search_env, cores=gateway_cores[index])
+                     for index, port in enumerate(gateway_ports)]
+        balancers = [Balancer('gateway', GATEWAY_PORT, [('127.0.0.1', port) for port in gateway_ports]),
+                     Balancer('actions', ACTIONS_PORT, [('127.0.0.1', port) for port in action_ports])]
+        return services, balancers
+
+    def worker_report(self):
+        """Load per worker: connections from the balancers, CPU and memory per process"""
+        services = {service.name: service for service in self.services}
+        gateway, actions = (balancer.stats() for balancer in self.balancers)
+        for index, worker in enumerate(gateway['workers']):
+            worker.update(services[f'web-{index}'].stats())
+        actions['pool'] = services['actions'].stats()
+        return {'gateway': gateway, 'actions': actions, 'rasa': services['rasa'].stats()}
+
+    def serve_report(self):
+        admin_routes['/workers'] = lambda method, body: (200, self.worker_report())
+
+        def per_worker(key):
+            def read():
+                report = self.worker_report()
+                return {(pool, worker['worker']): worker.get(key)
+                        for pool in ('gateway', 'actions') for worker in report[pool]['workers']}
+            return read
+
+        def per_process(key):
+            def read():
+                return {(service.name,): service.stats()[key] for service in self.services}
+            return read
+
+        registry.gauge_function('supervisor_worker_active_connections', "Open connections per worker",
+                                per_worker('active_connections'), labels=('pool', 'worker'))
+        registry.counter_function('supervisor_worker_connections_total', "Connections balanced to each worker",
+                                  per_worker('connections'), labels=('pool', 'worker'))
+        registry.counter_function('supervisor_worker_failed_connects_total',
+                                  "Connections a worker refused or did not accept in time",
+                                  per_worker('failed_connects'), labels=('pool', 'worker'))
+        registry.counter_function('supervisor_process_cpu_seconds_total',
+                                  "CPU time of each supervised process, with its children",
+                                  per_process('cpu_seconds'), labels=('service',))
+        registry.gauge_function('supervisor_process_rss_mb',
+                                "Resident memory of each supervised process, with its children",
+                                per_process('rss_mb'), labels=('service',))
+        registry.counter_function('supervisor_process_restarts_total', "Restarts of each supervised process",
+                                  per_process('restarts'), labels=('service',))
+        serve_metrics(REPORT_PORT)
+
+    def start_services(self):
+        """Start every service at once and wait for all of them to be ready"""
+        print("⚡ Starting the actions server, the Rasa server and the web interface...")
+        for balancer in self.balancers:
             try:
-                response = requests.get('http://localhost:5050/status', timeout=5)
-                if response.status_code == 200:
-                    print("✅ Web interface is running on http://localhost:5050")
-                    return True
-                else:
-                    print("❌ Web interface failed to start properly")
-                    return False
-            except:
-                print("❌ Web interface failed to start")
+                balancer.start()
+            except OSError as e:
+                print(f"❌ Could not listen on port {balancer.port}: {e}")
                 return False
-                
-        except Exception as e:
-            print(f"❌ Error starting web interface: {e}")
+        if not all([service.start() for service in self.services]):
             return False
-    
-    def start_actions_server(self):
-        """Start the Rasa actions server in a separate thread"""
-        def run_actions():
-            print("⚡ Starting Rasa actions server...")
-            try:
-                subprocess.run(['rasa', 'run', 'actions'], check=True)
-            except subprocess.CalledProcessError as e:
-                print(f"❌ Actions server error: {e}")
-            except KeyboardInterrupt:
-                print("🛑 Actions server stopped")
-        
-        actions_thread = Thread(target=run_actions, daemon=True)
-        actions_thread.start()
-        time.sleep(2)  # Give actions server time to start
-    
-    def wait_for_services(self):
-        """Wait for both services to be ready"""
         print("⏳ Waiting for services to be ready...")
-        
-        # Wait for Rasa
-        for i in range(30):  # Wait up to 30 seconds
-            try:
-                response = requests.get('http://localhost:5005/status', timeout=2)
-                if response.status_code == 200:
-                    break
-            except:
-                pass
-            time.sleep(1)
-        
-        # Wait for web interface
-        for i in range(30):  # Wait up to 30 seconds
-            try:
-                response = requests.get('http://localhost:5050/status', timeout=2)
-                if response.status_code == 200:
-                    break
-            except:
-                pass
-            time.sleep(1)
-    
+        with ThreadPoolExecutor(max_workers=len(self.services)) as pool:
+            return all(pool.map(lambda service: service.wait_until_ready(), self.services))
+
+    def supervise(self):
+        """Keep the services running until asked to stop"""
+        while self.running:
+            now = time.monotonic()
+            for service in self.services:
+                service.supervise(now)
+            time.sleep(MONITOR_INTERVAL)
+
     def signal_handler(self, signum, frame):
         """Handle shutdown signals"""
         print("\n🛑 Shutting down services...")
         self.running = False
         self.cleanup()
         sys.exit(0)
-    
+
     def cleanup(self):
         """Clean up processes"""
-        if self.rasa_process:
-            print("🛑 Stopping Rasa server...")
-            self.rasa_process.terminate()
-            self.rasa_process.wait()
-        
-        if self.web_process:
-            print("🛑 Stopping web interface...")
-            self.web_process.terminate()
-            self.web_process.wait()
-    
+        for balancer in self.balancers:
+            balancer.stop()
+        for service in reversed(self.services):
+            service.stop()
+
     def run(self):
         """Main run method"""
         # Set up signal handlers
         signal.signal(signal.SIGINT, self.signal_handler)
         signal.signal(signal.SIGTERM, self.signal_handler)
-        
+
         print("🚀 Fashion Chatbot Startup")
         print("=" * 50)
-        
-        # Start actions server first
-        self.start_actions_server()
-        
-        # Start Rasa server
-        if not self.start_rasa_server():
-            print("❌ Failed to start Rasa server. Exiting.")
-            return
-        
-        # Start web interface
-        if not self.start_web_interface():
-            print("❌ Failed to start web interface. Exiting.")
-            return
-        
-        # Wait for services to be ready
-        self.wait_for_services()
-        
-        print("\n🎉 Fashion Chatbot is ready!")
-        print("=" * 50)
-        print("📱 Web Interface: http://localhost:5050")
-        print("🤖 Rasa Server: http://localhost:5005")
-        print("⚡ Actions Server: http://localhost:5055")
-        print("=" * 50)
-        print("💡 Try asking: 'I need fashion advice' or 'What should I wear?'")
-        print("🛑 Press Ctrl+C to stop all services")
-        print("=" * 50)
-        
-        # Keep running
+
+        start = time.monotonic()
         try:
-            while self.running:
-                time.sleep(1)
+            if not self.start_services():
+                print("❌ Failed to start the chatbot. Exiting.")
+                return 1
+
+            print(f"\n🎉 Fashion Chatbot is ready in {time.monotonic() - start:.1f}s!")
+            print("=" * 50)
+            print("📱 Web Interface: http://localhost:5050")
+            print("🤖 Rasa Server: http://localhost:5005")
+            print("⚡ Actions Server: http://localhost:5055")
+            if self.supervisor:
+                self.serve_report()
+                gateway_workers = len(self.balancers[0].backends)
+                action_workers = len(self.balancers[1].backends)
+                print(f"👷 Workers: {gateway_workers} web interface, {action_workers} actions server")
+                print(f"📊 Per-worker load: http://localhost:{REPORT_PORT}/workers")
+            print("=" * 50)
+            print("💡 Try asking: 'I need fashion advice' or 'What should I wear?'")
+            print("🛑 Press Ctrl+C to stop all services")
+            print("=" * 50)
+
+            self.supervise()
         except KeyboardInterrupt:
             print("\n🛑 Received interrupt signal")
         finally:
             self.cleanup()
+        return 0
+
+
+def main():
+    cores = len(available_cores())
+    parser = argparse.ArgumentParser(description="Start the Fashion Chatbot services")
+    parser.add_argument('--supervisor', action='store_true',
+                        help="run several web interface and actions server workers behind local balancers")
+    parser.add_argument('--gateway-workers', type=int, default=max(1, cores // 2),
+                        help="web interface workers in supervisor mode (default: half the cores)")
+    parser.add_argument('--action-workers', type=int, default=max(1, cores // 4),
+                        help="actions server workers in supervisor mode (default: a quarter of the cores)")
+    parser.add_argument('--no-pin', dest='pin_cores', action='store_false',
+                        help="let the OS schedule workers instead of pinning each to a core")
+    args = parser.parse_args()
+    if args.gateway_workers < 1 or args.action_workers < 1:
+        parser.error("worker counts must be at least 1")
+
+    starter = ChatbotStarter(args.supervisor, args.gateway_workers, args.action_workers, args.pin_cores)
+    return starter.run()
+
 
 if __name__ == "__main__":
-    starter = ChatbotStarter()
-    starter.run() 
\ No newline at end of file
+    sys.exit(main())